@@ -0,0 +1,25 @@
+"""
+URLconf for ASGI requests: config.urls with the async read views swapped in.
+Selected by core_apps.common.asgi.AsyncViewsMiddleware.
+"""
+from core_apps.accounts import async_views as account_async_views
+from core_apps.accounts import views as account_views
+from core_apps.comments import async_views as comment_async_views
+from core_apps.comments import views as comment_views
+from core_apps.common.asgi import with_async_views
+from core_apps.posts import async_views as post_async_views
+from core_apps.posts import views as post_views
+
+from . import urls
+
+ASYNC_VIEWS = {
+    post_views.home: post_async_views.home,
+    post_views.post_detail: post_async_views.post_detail,
+    post_views.PostListCreateView: post_async_views.post_list_api,
+    post_views.search_posts: post_async_views.search_posts,
+    comment_views.CommentListCreateView: comment_async_views.comment_list_api,
+    comment_views.load_comments_page: comment_async_views.load_comments_page,
+    account_views.export_view: account_async_views.export_view,
+}
+
+urlpatterns = with_async_views(urls.urlpatterns, ASYNC_VIEWS)
@@ -0,0 +1,16 @@
+"""
+Celery application for background work (avatar processing).
+
+Start a worker with `celery -A config worker`. Settings prefixed CELERY_
+in Django settings configure it; with CELERY_TASK_ALWAYS_EAGER tasks run
+inline, which the test runner turns on.
+"""
+import os
+
+from celery import Celery
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings.local')
+
+app = Celery('config')
+app.config_from_object('django.conf:settings', namespace='CELERY')
+app.autodiscover_tasks()
@@ -1,5 +1,6 @@
 from pathlib import Path
 from os import getenv, path
+from django.core.exceptions import ImproperlyConfigured
 from dotenv import load_dotenv
 import shutil
 
@@ -35,27 +36,36 @@ LOCAL_APPS = [
     "core_apps.posts",
     "core_apps.accounts",
     "core_apps.comments",
+    "core_apps.common",
 ]
 
 INSTALLED_APPS = DJANGO_APPS + THIRD_PARTY_APPS + LOCAL_APPS
 
 
 MIDDLEWARE = [
+    'core_apps.common.metrics.MetricsMiddleware',
+    'core_apps.common.profiling.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'core_apps.common.query_budget.QueryBudgetMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core_apps.common.asgi.AsyncViewsMiddleware',
 ]
 
 ROOT_URLCONF = 'config.urls'
+# Used for requests served over ASGI; empty to serve the sync views there too.
+ASYNC_ROOT_URLCONF = getenv('ASYNC_ROOT_URLCONF', 'config.asgi_urls')
 
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates that records render times, see core_apps/common/templates.py
+        'BACKEND': 'core_apps.common.templates.DjangoTemplates',
         'DIRS': [  'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -78,9 +88,80 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            # Transactions take the write lock when they begin. A deferred
+            # transaction that reads and then writes fails with "database is
+            # locked" straight away, without waiting, if another connection
+            # wrote in between.
+            'transaction_mode': 'IMMEDIATE',
+        },
+        'TEST': {
+            # A file instead of the shared in-memory database, so concurrent
+            # test threads wait on locks instead of failing straight away.
+            'NAME': BASE_DIR / 'test_db.sqlite3',
+        },
     }
 }
 
+# Applied to every new SQLite connection by core_apps.common.db.configure_sqlite.
+SQLITE_PRAGMAS = {
+    # Readers no longer block the writer, nor the writer readers. Stored in
+    # the database file, next to which the -wal and -shm files appear.
+    'journal_mode': 'wal',
+    # In WAL mode a commit is still atomic and durable against crashes of
+    # the process; only a power loss can drop the latest commits.
+    'synchronous': 'normal',
+    # Milliseconds a writer waits for the lock before "database is locked".
+    'busy_timeout': 20_000,
+    # Reads go through a memory map of the file instead of read() calls.
+    'mmap_size': 256 * 1024 * 1024,
+    # Page cache per connection, in KiB when negative.
+    'cache_size': -32_000,
+    'temp_store': 'memory',
+}
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+CACHES = {
+    'default': {
+        # LocMemCache counting hits and misses, see core_apps/common/cache.py
+        'BACKEND': 'core_apps.common.cache.LocMemCache',
+        'LOCATION': 'blogapp',
+        'METRICS_NAME': 'default',
+    },
+    # Sessions get their own cache so feed pages cannot evict them.
+    'sessions': {
+        'BACKEND': 'core_apps.common.cache.LocMemCache',
+        'LOCATION': 'blogapp-sessions',
+        'METRICS_NAME': 'sessions',
+    },
+}
+
+
+# Sessions
+# DJANGO_SESSION_STORE picks where sessions live:
+#   db         django_session only: a SELECT on every authenticated request
+#   cached_db  reads from the 'sessions' cache, writes through to the table
+#   cache      the 'sessions' cache only: no table traffic, but sessions are
+#              lost when the cache evicts them or restarts
+# Both cache modes need a cache shared by all workers; production.py uses
+# Redis (SESSION_REDIS_URL) for it. `manage.py purge_sessions` removes
+# expired rows in batches; `manage.py bench_sessions` compares the modes.
+SESSION_ENGINES = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'cache': 'django.contrib.sessions.backends.cache',
+}
+SESSION_STORE = getenv('DJANGO_SESSION_STORE', 'db')
+if SESSION_STORE not in SESSION_ENGINES:
+    raise ImproperlyConfigured(
+        f"DJANGO_SESSION_STORE={SESSION_STORE!r} is not one of {', '.join(sorted(SESSION_ENGINES))}"
+    )
+SESSION_ENGINE = SESSION_ENGINES[SESSION_STORE]
+SESSION_CACHE_ALIAS = 'sessions'
+
 
 # REST Framework settings
 REST_FRAMEWORK = {
@@ -95,6 +176,33 @@ REST_FRAMEWORK = {
 }
 
 
+# Query budgets, see core_apps/common/query_budget.py. Views declare theirs
+# with @query_budget; this maps URL names of views that cannot be decorated.
+# Counting is a development and test aid: off unless local settings or the
+# test runner turn it on.
+QUERY_BUDGET_MODE = getenv('QUERY_BUDGET_MODE', 'off')
+QUERY_BUDGETS = {
+    'admin:posts_post_changelist': 10,
+    'admin:comments_comment_changelist': 10,
+}
+
+# Budget violations fail the test that caused them.
+TEST_RUNNER = 'core_apps.common.test_runner.QueryBudgetTestRunner'
+
+
+# Prometheus metrics at /metrics, see core_apps/common/metrics.py. Scrapers
+# must send "Authorization: Bearer <token>"; unset, /metrics is a 404 unless
+# DEBUG is on.
+METRICS_TOKEN = getenv('METRICS_TOKEN')
+
+
+# Sampled request profiling, see core_apps/common/profiling.py. Profiles
+# are listed under <ADMIN_URL>profiles/.
+PROFILING_SAMPLE_RATE = float(getenv('PROFILING_SAMPLE_RATE', '0'))
+PROFILING_DIR = Path(getenv('PROFILING_DIR', BASE_DIR / 'profiles'))
+PROFILING_MAX_PROFILES = 50
+
+
 # Authentication
 LOGIN_URL = 'accounts:login'
 LOGIN_REDIRECT_URL = '/'
@@ -149,10 +257,34 @@ STATIC_URL = '/static/'
 STATICFILES_DIRS = [BASE_DIR / "static"]
 STATIC_ROOT = str(BASE_DIR/ "staticfiles")
 
+# collectstatic writes content-hashed copies of every file plus gzip and
+# brotli variants; {% static %} resolves the hashed names through the
+# manifest, and WhiteNoise serves those with a far-future immutable
+# Cache-Control (unhashed names get WHITENOISE_MAX_AGE).
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage',
+    },
+}
+WHITENOISE_MAX_AGE = 60 * 60
+
 # Media files
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Celery (celery -A config worker); the avatar pipeline runs there.
+CELERY_BROKER_URL = getenv('CELERY_BROKER_URL', 'redis://localhost:6379/0')
+CELERY_TASK_ALWAYS_EAGER = getenv('CELERY_TASK_ALWAYS_EAGER', 'False') == 'True'
+CELERY_TASK_IGNORE_RESULT = True
+CELERY_TASK_ACKS_LATE = True
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+
+# Uploads larger than this are refused before they are queued for processing.
+AVATAR_MAX_UPLOAD_SIZE = 10 * 1024 * 1024
+
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
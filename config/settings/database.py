@@ -0,0 +1,66 @@
+"""
+The production database, from the environment.
+
+POSTGRES_DB (with POSTGRES_USER, POSTGRES_PASSWORD, POSTGRES_HOST,
+POSTGRES_PORT, POSTGRES_SSLMODE) selects PostgreSQL. Connections come from a
+psycopg 3 pool kept by each worker process, so requests check out an open
+connection instead of paying the TCP/TLS/auth setup every time; the pool
+checks a connection is alive before handing it out. With DJANGO_DB_POOL=0
+(e.g. behind PgBouncer, which pools by itself) connections are persistent
+per thread instead, for DJANGO_DB_CONN_MAX_AGE seconds, with health checks.
+"""
+from os import environ
+
+# Pool sizes are per worker process. Under ASGI or threaded WSGI every
+# thread running queries holds a connection: keep MAX_SIZE above the
+# threads per process, and MAX_SIZE * processes below max_connections.
+POOL_DEFAULTS = {
+    "min_size": ("DJANGO_DB_POOL_MIN_SIZE", 2, int),
+    "max_size": ("DJANGO_DB_POOL_MAX_SIZE", 10, int),
+    # Seconds a request waits for a free connection before failing.
+    "timeout": ("DJANGO_DB_POOL_TIMEOUT", 10.0, float),
+    # Idle connections above min_size are closed after this many seconds...
+    "max_idle": ("DJANGO_DB_POOL_MAX_IDLE", 300.0, float),
+    # ...and every connection is replaced after this many, so server-side
+    # memory growth and failovers do not stick.
+    "max_lifetime": ("DJANGO_DB_POOL_MAX_LIFETIME", 1800.0, float),
+}
+
+
+def _flag(value):
+    return value.strip().lower() not in ("0", "false", "no", "off", "")
+
+
+def postgres_database(env=environ):
+    """The DATABASES["default"] entry described by `env`, or None without POSTGRES_DB"""
+    if not env.get("POSTGRES_DB"):
+        return None
+
+    options = {
+        # Seconds to wait for the server when opening a connection.
+        "connect_timeout": int(env.get("DJANGO_DB_CONNECT_TIMEOUT", 5)),
+    }
+    if env.get("POSTGRES_SSLMODE"):
+        options["sslmode"] = env["POSTGRES_SSLMODE"]
+
+    database = {
+        "ENGINE": "django.db.backends.postgresql",
+        "NAME": env["POSTGRES_DB"],
+        "USER": env.get("POSTGRES_USER", ""),
+        "PASSWORD": env.get("POSTGRES_PASSWORD", ""),
+        "HOST": env.get("POSTGRES_HOST", "localhost"),
+        "PORT": env.get("POSTGRES_PORT", "5432"),
+        # With a pool: check connections on checkout. Without: check
+        # persistent connections at the start of each request.
+        "CONN_HEALTH_CHECKS": True,
+        "OPTIONS": options,
+    }
+    if _flag(env.get("DJANGO_DB_POOL", "1")):
+        # Pooled connections go back to the pool after each request.
+        database["CONN_MAX_AGE"] = 0
+        options["pool"] = {
+            name: cast(env.get(variable, default)) for name, (variable, default, cast) in POOL_DEFAULTS.items()
+        }
+    else:
+        database["CONN_MAX_AGE"] = int(env.get("DJANGO_DB_CONN_MAX_AGE", 60))
+    return database
@@ -26,6 +26,14 @@ ADMIN_URL = getenv("ADMIN_URL")
 #Only for production purpose
 DOMAIN = getenv("DOMAIN")
 
+# Celery tasks (avatar processing) run inside the request, so a development
+# setup needs no broker or worker. Set CELERY_TASK_ALWAYS_EAGER=False to send
+# them to `celery -A config worker` through CELERY_BROKER_URL instead.
+CELERY_TASK_ALWAYS_EAGER = getenv("CELERY_TASK_ALWAYS_EAGER", "True") == "True"
+
+# Warn about views that run more queries than their budget, or N+1 patterns.
+QUERY_BUDGET_MODE = getenv("QUERY_BUDGET_MODE", "log")
+
 #----------------------Logging purpose-------------------
 # 1. DEBUG   : Low level system information
 # 2. INFO    : General level system information
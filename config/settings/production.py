@@ -1,10 +1,12 @@
 from os import getenv, path
 
+from django.core.exceptions import ImproperlyConfigured
 from dotenv import load_dotenv
 
 from .base import * #noqa
 
 from .base import BASE_DIR
+from .database import postgres_database
 
 local_env_file = path.join(BASE_DIR, ".envs", ".env.local")
 
@@ -22,4 +24,39 @@ ALLOWED_HOSTS = []
 ADMIN_URL = getenv("DJANGO_ADMIN_URL")
 
 #Only for production purpose
-DOMAIN = getenv("DOMAIN")
\ No newline at end of file
+DOMAIN = getenv("DOMAIN")
+
+# PostgreSQL with pooled connections when POSTGRES_DB is set (see database.py);
+# small installs without it keep the SQLite database of base.py.
+postgres = postgres_database()
+
+if postgres:
+    DATABASES = {"default": postgres}
+
+# Shared cache for all workers (feed pages, feed version), e.g. redis://localhost:6379/1
+REDIS_URL = getenv("REDIS_URL")
+
+if REDIS_URL:
+    CACHES["default"] = {
+        "BACKEND": "core_apps.common.cache.RedisCache",
+        "LOCATION": REDIS_URL,
+        "KEY_PREFIX": "blogapp",
+        "METRICS_NAME": "default",
+    }
+
+# Sessions in the "cached_db" and "cache" stores, e.g. redis://localhost:6379/2.
+# In "cache" mode an evicted key logs its user out: give Redis the memory.
+SESSION_REDIS_URL = getenv("SESSION_REDIS_URL", REDIS_URL)
+
+if SESSION_REDIS_URL:
+    CACHES["sessions"] = {
+        "BACKEND": "core_apps.common.cache.RedisCache",
+        "LOCATION": SESSION_REDIS_URL,
+        "KEY_PREFIX": "blogapp-sessions",
+        "METRICS_NAME": "sessions",
+    }
+elif SESSION_STORE != "db":
+    raise ImproperlyConfigured(
+        f"DJANGO_SESSION_STORE={SESSION_STORE} needs SESSION_REDIS_URL or REDIS_URL: "
+        "a per-process cache would log users out whenever another worker serves them"
+    )
@@ -3,15 +3,20 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 
+from core_apps.accounts.views import serve_media
+from core_apps.common.metrics import metrics_view
+
 urlpatterns = [
+    path(f'{settings.ADMIN_URL}profiles/', include('core_apps.common.urls')),
     path(settings.ADMIN_URL, admin.site.urls),
     path("", include("core_apps.posts.urls")),
     path('accounts/', include('core_apps.accounts.urls')),
     path('api/', include('core_apps.posts.urls')),
     path('', include('core_apps.comments.urls')),
     path('api/', include('core_apps.comments.urls')),
+    path('metrics', metrics_view, name='metrics'),
 ]
 
 if settings.DEBUG:
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
+    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT, view=serve_media)
\ No newline at end of file
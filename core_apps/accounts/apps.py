@@ -4,4 +4,7 @@ from django.utils.translation import gettext_lazy as _
 class AccountsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "core_apps.accounts"
-    verbose_name = _("Accounts")
\ No newline at end of file
+    verbose_name = _("Accounts")
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,14 @@
+"""
+Async variants of account views, served under ASGI.
+See core_apps/posts/async_views.py.
+"""
+from django.contrib.auth.decorators import login_required
+
+from .export import aexport_records, agzip_blocks, andjson_blocks
+from .views import export_response
+
+
+@login_required
+async def export_view(request):
+    """export_view streaming from async generators: a sync iterator would be read whole first under ASGI"""
+    return export_response(request, andjson_blocks(aexport_records(request.user)), agzip_blocks)
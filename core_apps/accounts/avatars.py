@@ -0,0 +1,94 @@
+"""
+Avatar processing.
+
+An upload is stored as-is in `UserProfile.avatar_upload` and the request
+returns; the `process_avatar` task then decodes it with Pillow, applies the
+EXIF orientation, crops it square and writes WebP and JPEG variants in
+AVATAR_SIZES. The variants are encoded from bare pixel data, so EXIF, XMP,
+ICC and other metadata never reach them. Each variant is stored under the
+hash of its bytes in AVATAR_VARIANT_DIR: a name never changes content, so
+those files can be served with immutable cache headers, and identical
+images share files. The original upload is deleted once processed.
+"""
+import hashlib
+import io
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+# Square edge lengths in pixels. Pages show avatars at up to 120 CSS pixels,
+# so the larger size covers 2x screens.
+AVATAR_SIZES = (128, 256)
+AVATAR_FORMATS = {
+    # format key: (Pillow format, extension, save options)
+    'webp': ('WEBP', 'webp', {'quality': 80, 'method': 6}),
+    'jpeg': ('JPEG', 'jpg', {'quality': 85, 'optimize': True, 'progressive': True}),
+}
+AVATAR_VARIANT_DIR = 'avatars/v/'
+# Larger images are refused before their pixels are decoded.
+AVATAR_MAX_PIXELS = 40_000_000
+
+
+class InvalidAvatar(ValueError):
+    pass
+
+
+def open_avatar(fileobj):
+    """Decode an upload into an upright RGB or RGBA image no larger than needed"""
+    try:
+        image = Image.open(fileobj)
+        if image.width * image.height > AVATAR_MAX_PIXELS:
+            raise InvalidAvatar(f'{image.width}x{image.height} image is too large')
+        # JPEGs can be decoded at a fraction of their size, much faster
+        # than decoding everything and scaling down afterwards.
+        edge = max(AVATAR_SIZES) * 2
+        image.draft('RGB', (edge, edge))
+        image = ImageOps.exif_transpose(image)
+        has_alpha = image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in image.info
+        return image.convert('RGBA' if has_alpha else 'RGB')
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError, SyntaxError) as exc:
+        raise InvalidAvatar(str(exc)) from exc
+
+
+def render_variants(fileobj):
+    """{(format key, size): encoded bytes} for every avatar variant of the upload"""
+    image = open_avatar(fileobj)
+    variants = {}
+    for size in AVATAR_SIZES:
+        square = ImageOps.fit(image, (size, size), Image.Resampling.LANCZOS)
+        flat = square
+        if square.mode == 'RGBA':
+            # JPEG has no alpha channel: flatten onto white.
+            flat = Image.new('RGB', square.size, 'white')
+            flat.paste(square, mask=square.getchannel('A'))
+        for key, (fmt, _, options) in AVATAR_FORMATS.items():
+            out = io.BytesIO()
+            (square if fmt == 'WEBP' else flat).save(out, fmt, **options)
+            variants[key, size] = out.getvalue()
+    return variants
+
+
+def store_variants(variants, storage=default_storage):
+    """Save rendered variants under content-hashed names; returns {format key: {size: name}}"""
+    names = {}
+    for (key, size), data in variants.items():
+        extension = AVATAR_FORMATS[key][1]
+        name = f'{AVATAR_VARIANT_DIR}{hashlib.sha256(data).hexdigest()[:32]}.{extension}'
+        if not storage.exists(name):
+            name = storage.save(name, ContentFile(data))
+        names.setdefault(key, {})[str(size)] = name
+    return names
+
+
+def variant_url(variants, key, size, storage=default_storage):
+    name = variants.get(key, {}).get(str(size))
+    return storage.url(name) if name else None
+
+
+def srcset(variants, key, storage=default_storage):
+    return ', '.join(
+        f'{storage.url(name)} {size}w' for size, name in sorted(
+            variants.get(key, {}).items(), key=lambda item: int(item[0])
+        )
+    )
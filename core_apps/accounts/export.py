@@ -0,0 +1,125 @@
+"""
+Streaming export of a user's own data as NDJSON.
+
+One JSON object per line, each with a `type`: the user first, then their
+posts, comments and likes. Rows come from values() querysets read with
+iterator(chunk_size=EXPORT_CHUNK_SIZE), so no model instances are built and
+at most one chunk of rows is held in memory whatever the size of the export.
+Lines are joined into blocks of about EXPORT_BLOCK_SIZE bytes before they are
+handed to the server, and gzip compression is applied block by block.
+
+The a-prefixed functions are async generators doing the same through the
+async ORM, for the ASGI view: Django reads a sync iterator of a streaming
+response into a list before sending it under ASGI.
+"""
+import json
+import zlib
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from core_apps.comments.models import Comment
+from core_apps.posts.models import Post
+
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_BLOCK_SIZE = 64 * 1024
+
+USER_FIELDS = ('id', 'username', 'first_name', 'last_name', 'email', 'date_joined')
+POST_FIELDS = ('id', 'title', 'content', 'created_at', 'updated_at', 'like_count', 'comment_count')
+COMMENT_FIELDS = ('id', 'post_id', 'text', 'created_at', 'updated_at')
+
+encoder = DjangoJSONEncoder(ensure_ascii=False)
+
+
+def _user_record(user):
+    return {'type': 'user', **{field: getattr(user, field) for field in USER_FIELDS}}
+
+
+def _querysets(user):
+    """(record type, values queryset) for each kind of row, in export order"""
+    return [
+        ('post', Post.objects.filter(author=user).order_by('pk').values(*POST_FIELDS)),
+        ('comment', Comment.objects.filter(author=user).order_by('pk').values(*COMMENT_FIELDS)),
+        ('like', Post.likes.through.objects.filter(user=user).order_by('pk').values('post_id')),
+    ]
+
+
+def export_records(user):
+    yield _user_record(user)
+    for kind, rows in _querysets(user):
+        for row in rows.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+            yield {'type': kind, **row}
+
+
+async def aexport_records(user):
+    yield _user_record(user)
+    for kind, rows in _querysets(user):
+        async for row in rows.aiterator(chunk_size=EXPORT_CHUNK_SIZE):
+            yield {'type': kind, **row}
+
+
+class _BlockBuffer:
+    """Collects NDJSON lines until they make a block of block_size bytes"""
+
+    def __init__(self, block_size):
+        self.block_size = block_size
+        self.lines, self.size = [], 0
+
+    def add(self, record):
+        """Append the record's line; returns a full block or None"""
+        line = (encoder.encode(record) + '\n').encode('utf-8')
+        self.lines.append(line)
+        self.size += len(line)
+        if self.size >= self.block_size:
+            return self.flush()
+        return None
+
+    def flush(self):
+        block = b''.join(self.lines)
+        self.lines, self.size = [], 0
+        return block
+
+
+def ndjson_blocks(records, block_size=EXPORT_BLOCK_SIZE):
+    """UTF-8 NDJSON of the records, in blocks of roughly block_size bytes"""
+    buffer = _BlockBuffer(block_size)
+    for record in records:
+        block = buffer.add(record)
+        if block:
+            yield block
+    block = buffer.flush()
+    if block:
+        yield block
+
+
+async def andjson_blocks(records, block_size=EXPORT_BLOCK_SIZE):
+    buffer = _BlockBuffer(block_size)
+    async for record in records:
+        block = buffer.add(record)
+        if block:
+            yield block
+    block = buffer.flush()
+    if block:
+        yield block
+
+
+def _compressor(level):
+    # wbits=31 writes a gzip header and trailer around the deflate stream.
+    return zlib.compressobj(level, zlib.DEFLATED, 31)
+
+
+def gzip_blocks(blocks, level=6):
+    compressor = _compressor(level)
+    for block in blocks:
+        compressed = compressor.compress(block)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+async def agzip_blocks(blocks, level=6):
+    compressor = _compressor(level)
+    async for block in blocks:
+        compressed = compressor.compress(block)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
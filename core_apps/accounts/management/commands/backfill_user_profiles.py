@@ -0,0 +1,36 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+
+from core_apps.accounts.models import UserProfile
+
+
+class Command(BaseCommand):
+    help = "Create the missing UserProfile of users created before the post_save signal or without it"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Number of users checked per batch (default: 1000)')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        created = 0
+        last_pk = 0
+
+        while True:
+            batch = list(
+                User.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:batch_size]
+            )
+            if not batch:
+                break
+            last_pk = batch[-1]
+            existing = set(
+                UserProfile.objects.filter(user_id__in=batch).values_list('user_id', flat=True)
+            )
+            missing = [UserProfile(user_id=pk) for pk in batch if pk not in existing]
+            # A profile created meanwhile by the signal wins.
+            UserProfile.objects.bulk_create(missing, ignore_conflicts=True)
+            created += len(missing)
+            if options['verbosity'] > 1:
+                self.stdout.write(f"Checked users up to id {last_pk}, {created} profiles created")
+
+        self.stdout.write(self.style.SUCCESS(f"Created {created} missing profiles."))
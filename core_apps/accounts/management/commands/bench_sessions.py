@@ -0,0 +1,166 @@
+import json
+import statistics
+import time
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.auth import HASH_SESSION_KEY, SESSION_KEY
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, reset_queries
+from django.db.backends.signals import connection_created
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from core_apps.common.cache import fakeredis_cache
+from core_apps.posts.management.commands.bench import percentiles
+from core_apps.posts.management.commands.bench_concurrency import SimulatedLatency
+from core_apps.posts.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the session stores of settings.SESSION_ENGINES: the cost of loading, "
+        "modifying and creating a session, and the latency and session-table queries "
+        "of authenticated requests. Cache-backed stores use --redis-url, or an "
+        "in-process fakeredis (no network round trips) when it is not given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--store', action='append', default=[], choices=sorted(settings.SESSION_ENGINES),
+                            help='Session store to run; repeatable (default: all)')
+        parser.add_argument('--iterations', type=int, default=200,
+                            help='Timed operations per store and scenario (default: 200)')
+        parser.add_argument('--db-latency', type=float, default=0.0,
+                            help='Milliseconds added to every query, to stand in for a networked '
+                                 'database (default: 0)')
+        parser.add_argument('--redis-url', help='Redis for the cache-backed stores, e.g. redis://localhost:6379/9')
+        parser.add_argument('--output', help='Write the results to this JSON file')
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 2:
+            raise CommandError('--iterations must be at least 2')
+        post = Post.objects.select_related('author').order_by('-comment_count', 'pk').first()
+        if post is None:
+            raise CommandError('No posts to benchmark; run seed_data first')
+        user = post.author
+
+        if options['redis_url']:
+            sessions_cache = {
+                'BACKEND': 'core_apps.common.cache.RedisCache',
+                'LOCATION': options['redis_url'],
+                'KEY_PREFIX': 'bench-sessions',
+            }
+        else:
+            try:
+                sessions_cache = fakeredis_cache('bench-sessions')
+            except ImportError:
+                raise CommandError('Pass --redis-url or install fakeredis')
+
+        latency = None
+        if options['db_latency'] > 0:
+            latency = SimulatedLatency(options['db_latency'] / 1000)
+            latency.install(None, connection)
+            connection_created.connect(latency.install)
+
+        results = {}
+        try:
+            for store in options['store'] or list(settings.SESSION_ENGINES):
+                with override_settings(
+                    SESSION_ENGINE=settings.SESSION_ENGINES[store],
+                    CACHES={**settings.CACHES, 'sessions': sessions_cache},
+                    ALLOWED_HOSTS=['testserver', *settings.ALLOWED_HOSTS],
+                ):
+                    for scenario, run in self.scenarios(user, post, options['iterations']):
+                        key = f'{store}:{scenario}'
+                        results[key] = run()
+                        self.write_row(key, results[key])
+        finally:
+            if latency is not None:
+                connection_created.disconnect(latency.install)
+                connection.execute_wrappers.remove(latency)
+
+        if options['output']:
+            report = {
+                'meta': {
+                    'iterations': options['iterations'],
+                    'db_latency_ms': options['db_latency'],
+                    'sessions_cache': options['redis_url'] or 'fakeredis',
+                },
+                'results': results,
+            }
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2, sort_keys=True)
+                f.write('\n')
+            self.stdout.write(f"Wrote {options['output']}")
+
+    def scenarios(self, user, post, iterations):
+        SessionStore = import_module(settings.SESSION_ENGINE).SessionStore
+        created = []
+
+        def create():
+            # What a login stores
+            session = SessionStore()
+            session[SESSION_KEY] = str(user.pk)
+            session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+            session.save()
+            created.append(session)
+            return session.session_key
+
+        session_key = create()
+
+        def read():
+            # What SessionMiddleware and AuthenticationMiddleware do per request
+            SessionStore(session_key).get(SESSION_KEY)
+
+        def write():
+            session = SessionStore(session_key)
+            session['bench'] = time.perf_counter()
+            session.save()
+
+        client = Client()
+        client.force_login(user)
+        home = reverse('posts:home')
+        like = reverse('posts:toggle_like', args=[post.pk])
+
+        yield 'load', lambda: self.measure(read, iterations)
+        yield 'modify', lambda: self.measure(write, iterations)
+        yield 'create', lambda: self.measure(create, iterations)
+        yield 'home', lambda: self.measure(lambda: client.get(home), iterations)
+        # With the counted first run, an even number of toggles in total
+        # leaves the like as it was.
+        yield 'toggle_like', lambda: self.measure(lambda: client.post(like), iterations - 1 + iterations % 2)
+
+        for session in created:
+            session.delete()
+        client.logout()
+
+    def measure(self, operation, iterations):
+        # Requests reset the query log when they start, as in bench.py.
+        reset_queries()
+        with CaptureQueriesContext(connection) as queries:
+            operation()
+        # Read before the next request resets the log.
+        query_count = len(queries)
+        session_queries = sum('django_session' in query['sql'] for query in queries)
+        samples = []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            operation()
+            samples.append((time.perf_counter() - started) * 1000)
+        p50, p95, p99 = percentiles(samples)
+        return {
+            'p50_ms': round(p50, 3),
+            'p95_ms': round(p95, 3),
+            'p99_ms': round(p99, 3),
+            'mean_ms': round(statistics.fmean(samples), 3),
+            'queries': query_count,
+            'session_queries': session_queries,
+        }
+
+    def write_row(self, key, result):
+        self.stdout.write(
+            f"{key:<24} p50 {result['p50_ms']:8.3f}ms  p95 {result['p95_ms']:8.3f}ms  "
+            f"p99 {result['p99_ms']:8.3f}ms  {result['queries']:>3} queries "
+            f"({result['session_queries']} on django_session)"
+        )
@@ -0,0 +1,67 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F, Q
+
+from core_apps.accounts.models import UserStats
+from core_apps.accounts.stats import STATS_FIELDS, actual_stats, stats_cache_key
+
+
+class Command(BaseCommand):
+    help = "Recompute UserStats rows that drifted from the real totals, creating missing ones"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Number of users checked per batch (default: 1000)')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Report drifted users without writing anything')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        dry_run = options['dry_run']
+        checked = fixed = 0
+        last_pk = 0
+
+        while True:
+            batch = list(
+                User.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:batch_size]
+            )
+            if not batch:
+                break
+            last_pk = batch[-1]
+            checked += len(batch)
+
+            with transaction.atomic():
+                if not dry_run:
+                    UserStats.objects.bulk_create([UserStats(user_id=pk) for pk in batch], ignore_conflicts=True)
+                drifted = list(
+                    UserStats.objects.filter(user_id__in=batch)
+                    .annotate(**actual_stats())
+                    .filter(
+                        ~Q(post_count=F('actual_post_count'))
+                        | ~Q(comment_count=F('actual_comment_count'))
+                        | ~Q(likes_received=F('actual_likes_received'))
+                        | Q(actual_last_active_at__isnull=False) & (
+                            Q(last_active_at__isnull=True) | ~Q(last_active_at=F('actual_last_active_at'))
+                        )
+                    )
+                    .select_for_update()
+                )
+                for stats in drifted:
+                    if options['verbosity'] > 1:
+                        changes = ', '.join(
+                            f"{field} {getattr(stats, field)} -> {getattr(stats, f'actual_{field}')}"
+                            for field in STATS_FIELDS
+                            if getattr(stats, field) != getattr(stats, f'actual_{field}')
+                        )
+                        self.stdout.write(f"User {stats.user_id}: {changes}")
+                    for field in STATS_FIELDS:
+                        setattr(stats, field, getattr(stats, f'actual_{field}'))
+                if drifted and not dry_run:
+                    UserStats.objects.bulk_update(drifted, STATS_FIELDS)
+                    cache.delete_many([stats_cache_key(stats.user_id) for stats in drifted])
+            fixed += len(drifted)
+
+        verb = 'would be fixed' if dry_run else 'fixed'
+        self.stdout.write(self.style.SUCCESS(f"Checked {checked} users, {fixed} {verb}."))
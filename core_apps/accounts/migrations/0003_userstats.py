@@ -0,0 +1,69 @@
+# Generated by Django 5.2.4 on 2026-10-18 04:16
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def fill_stats(apps, schema_editor):
+    User = apps.get_model("auth", "User")
+    Post = apps.get_model("posts", "Post")
+    Comment = apps.get_model("comments", "Comment")
+    UserStats = apps.get_model("accounts", "UserStats")
+
+    posts = {
+        row["author_id"]: row
+        for row in Post.objects.order_by().values("author_id").annotate(
+            n=models.Count("id"), likes=models.Sum("like_count"), last=models.Max("created_at")
+        )
+    }
+    comments = {
+        row["author_id"]: row
+        for row in Comment.objects.order_by().values("author_id").annotate(
+            n=models.Count("id"), last=models.Max("created_at")
+        )
+    }
+    batch = []
+    for user_id in User.objects.values_list("pk", flat=True).iterator(chunk_size=1000):
+        post_row = posts.get(user_id, {})
+        comment_row = comments.get(user_id, {})
+        last_seen = [last for last in (post_row.get("last"), comment_row.get("last")) if last]
+        batch.append(UserStats(
+            user_id=user_id,
+            post_count=post_row.get("n", 0),
+            comment_count=comment_row.get("n", 0),
+            likes_received=post_row.get("likes") or 0,
+            last_active_at=max(last_seen, default=None),
+        ))
+        if len(batch) >= 1000:
+            UserStats.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        UserStats.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0002_avatar_variants"),
+        ("auth", "0012_alter_user_first_name_max_length"),
+        ("comments", "0005_comment_author_created_index"),
+        ("posts", "0006_post_author_feed_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="UserStats",
+            fields=[
+                ("user", models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name="stats", serialize=False, to=settings.AUTH_USER_MODEL)),
+                ("post_count", models.PositiveIntegerField(default=0, editable=False)),
+                ("comment_count", models.PositiveIntegerField(default=0, editable=False)),
+                ("likes_received", models.PositiveIntegerField(default=0, editable=False)),
+                ("last_active_at", models.DateTimeField(blank=True, editable=False, null=True)),
+            ],
+            options={
+                "verbose_name_plural": "user stats",
+            },
+        ),
+        migrations.RunPython(fill_stats, migrations.RunPython.noop),
+    ]
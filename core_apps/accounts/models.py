@@ -1,11 +1,58 @@
 from django.db import models
 from django.contrib.auth.models import User
 
+from .avatars import AVATAR_SIZES, srcset, variant_url
+
 class UserProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
     bio = models.TextField(max_length=500, blank=True)
     avatar = models.ImageField(upload_to='avatars/', default='avatars/default.png', blank=True)
+    # The latest upload, waiting for the process_avatar task; see avatars.py.
+    avatar_upload = models.FileField(upload_to='avatars/uploads/', blank=True)
+    # Storage names of the processed variants: {"webp": {"128": name, ...}, "jpeg": {...}}
+    avatar_variants = models.JSONField(default=dict, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Post pages show the author's avatar; their ETags include this.
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.user.username}'s Profile"
+
+    @property
+    def avatar_processing(self):
+        return bool(self.avatar_upload)
+
+    @property
+    def avatar_thumbnail_url(self):
+        """The smallest JPEG variant, for <img src> fallbacks"""
+        return variant_url(self.avatar_variants, 'jpeg', min(AVATAR_SIZES))
+
+    @property
+    def avatar_webp_srcset(self):
+        return srcset(self.avatar_variants, 'webp')
+
+    @property
+    def avatar_jpeg_srcset(self):
+        return srcset(self.avatar_variants, 'jpeg')
+
+
+class UserStats(models.Model):
+    """
+    Activity totals shown in the profile header. Kept current by the
+    signals in accounts/signals.py and posts/likes.py, read through the
+    cache by stats.get_user_stats(). `manage.py reconcile_user_stats`
+    repairs drift.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    post_count = models.PositiveIntegerField(default=0, editable=False)
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
+    # Likes on the user's posts
+    likes_received = models.PositiveIntegerField(default=0, editable=False)
+    # Newest post or comment
+    last_active_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    class Meta:
+        verbose_name_plural = 'user stats'
 
     def __str__(self):
-        return f"{self.user.username}'s Profile"
\ No newline at end of file
+        return f"{self.user_id}'s stats"
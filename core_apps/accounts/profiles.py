@@ -0,0 +1,45 @@
+"""
+Cached UserProfile lookups.
+
+Every user gets a profile when the user is created (see signals.py), so
+reading one never writes. get_profile() keeps each profile in the cache
+until it is saved or deleted; pages listing many users load profiles
+with select_related('author__userprofile') instead.
+"""
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import UserProfile
+
+PROFILE_CACHE_TIMEOUT = 60 * 60
+
+
+def profile_cache_key(user_id):
+    return f'accounts:profile:{user_id}'
+
+
+def forget_profile(user_id):
+    transaction.on_commit(lambda: cache.delete(profile_cache_key(user_id)))
+
+
+def get_profile(user):
+    """
+    The user's profile: the one joined by select_related('userprofile'),
+    else usually from the cache. An unsaved blank one if it was never created.
+    The profile is attached to `user`, so later calls with it are free.
+    """
+    if User.userprofile.is_cached(user):
+        return getattr(user, 'userprofile', None) or UserProfile(user=user)
+
+    key = profile_cache_key(user.pk)
+    profile = cache.get(key)
+    if profile is None:
+        profile = UserProfile.objects.filter(user_id=user.pk).first()
+        if profile is None:
+            # Users from before the signal, until backfill_user_profiles runs.
+            return UserProfile(user=user)
+        # Cached before the user is attached, so the user row is not stored with it.
+        cache.set(key, profile, PROFILE_CACHE_TIMEOUT)
+    profile.user = user
+    return profile
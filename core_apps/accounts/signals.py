@@ -0,0 +1,76 @@
+from django.contrib.auth.models import User
+from django.db.models import Count, OuterRef, QuerySet, Subquery
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from core_apps.comments.models import Comment
+from core_apps.posts.models import Post
+from .models import UserProfile, UserStats
+from .profiles import forget_profile
+from .stats import adjust_stats, credit_likes
+
+
+@receiver(post_save, sender=User)
+def create_user_profile(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        UserProfile.objects.bulk_create([UserProfile(user=instance)], ignore_conflicts=True)
+
+
+@receiver([post_save, post_delete], sender=UserProfile)
+def forget_changed_profile(sender, instance, **kwargs):
+    forget_profile(instance.user_id)
+
+
+@receiver(post_save, sender=User)
+def create_user_stats(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        UserStats.objects.bulk_create([UserStats(user=instance)], ignore_conflicts=True)
+
+
+@receiver(post_save, sender=Post)
+def count_created_post(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        adjust_stats([instance.author_id], active_at=instance.created_at, post_count=1)
+
+
+def _deleting_posts(origin):
+    """Whether a delete() was called on posts, so their comments cascade"""
+    return isinstance(origin, Post) or (isinstance(origin, QuerySet) and origin.model is Post)
+
+
+@receiver(pre_delete, sender=Post)
+def count_deleted_post(sender, instance, origin=None, **kwargs):
+    # The post's like rows cascade without m2m signals. Its stored like_count
+    # is read in the UPDATE itself: the instance's copy may be stale.
+    like_count = Subquery(Post.objects.filter(pk=instance.pk).values('like_count'))
+    adjust_stats([instance.author_id], post_count=-1, likes_received=-like_count)
+    if _deleting_posts(origin):
+        # One UPDATE for all commenters instead of one per cascaded comment;
+        # count_deleted_comment skips these.
+        comments = Comment.objects.filter(post_id=instance.pk)
+        per_author = Subquery(
+            comments.filter(author_id=OuterRef('user_id')).order_by().values('author_id')
+            .annotate(count=Count('*')).values('count')
+        )
+        author_ids = list(comments.order_by().values_list('author_id', flat=True).distinct())
+        adjust_stats(author_ids, comment_count=-per_author)
+
+
+@receiver(post_save, sender=Comment)
+def count_created_comment(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        adjust_stats([instance.author_id], active_at=instance.created_at, comment_count=1)
+
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_comment(sender, instance, origin=None, **kwargs):
+    if _deleting_posts(origin):
+        # Counted per post by count_deleted_post.
+        return
+    adjust_stats([instance.author_id], comment_count=-1)
+
+
+@receiver(pre_delete, sender=User)
+def release_likes_of_deleted_user(sender, instance, **kwargs):
+    # Like posts/signals.drop_likes_of_deleted_user, for the authors' totals.
+    credit_likes({post_id: -1 for post_id in Post.objects.filter(likes=instance).values_list('pk', flat=True)})
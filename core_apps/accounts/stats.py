@@ -0,0 +1,139 @@
+"""
+Per-user activity totals for the profile header.
+
+Every post, comment or like that is written or removed moves the affected
+UserStats rows with a single UPDATE of F() expressions, so the totals are
+never recounted on the read path. Reads go through a per-user cache entry
+that is deleted once the writing transaction commits.
+"""
+from collections import Counter, defaultdict
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import (
+    Case, Count, DateTimeField, F, IntegerField, Max, OuterRef, Subquery, Sum, Value, When,
+)
+from django.db.models.functions import Coalesce, Greatest
+
+from core_apps.comments.models import Comment
+from core_apps.posts.models import Post
+from .models import UserStats
+
+STATS_FIELDS = ('post_count', 'comment_count', 'likes_received', 'last_active_at')
+STATS_CACHE_TIMEOUT = 60 * 60
+# Users per UPDATE in adjust_stats_by_user, well below SQLite's parameter limit.
+ADJUST_BATCH_SIZE = 500
+
+
+def stats_cache_key(user_id):
+    return f'accounts:user-stats:{user_id}'
+
+
+def _forget(user_ids):
+    keys = [stats_cache_key(user_id) for user_id in user_ids]
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def adjust_stats(user_ids, active_at=None, **deltas):
+    """
+    Atomically add the given deltas (numbers or expressions, e.g.
+    post_count=1) to the stats of `user_ids`, and move their
+    last_active_at forward to `active_at` (a datetime or an expression).
+    """
+    updates = {
+        field: Greatest(F(field) + delta, Value(0)) for field, delta in deltas.items() if delta
+    }
+    if active_at is not None:
+        if not hasattr(active_at, 'resolve_expression'):
+            active_at = Value(active_at)
+        updates['last_active_at'] = Greatest(Coalesce(F('last_active_at'), active_at), active_at)
+    if not user_ids or not updates:
+        return 0
+    _forget(user_ids)
+    return UserStats.objects.filter(user_id__in=user_ids).update(**updates)
+
+
+def adjust_stats_by_user(changes):
+    """
+    adjust_stats with deltas that differ per user, e.g. after bulk inserts:
+    {user_id: {'post_count': 2, 'active_at': datetime, ...}}. Runs one
+    UPDATE per ADJUST_BATCH_SIZE users.
+    """
+    user_ids = sorted(changes)
+    for start in range(0, len(user_ids), ADJUST_BATCH_SIZE):
+        chunk = user_ids[start:start + ADJUST_BATCH_SIZE]
+        fields = {field for user_id in chunk for field in changes[user_id]}
+        values = {}
+        for field in fields:
+            whens = [
+                When(user_id=user_id, then=Value(changes[user_id][field]))
+                for user_id in chunk if changes[user_id].get(field)
+            ]
+            if field == 'active_at':
+                values[field] = Case(*whens, default=F('last_active_at'), output_field=DateTimeField())
+            else:
+                values[field] = Case(*whens, default=Value(0), output_field=IntegerField())
+        adjust_stats(chunk, **values)
+
+
+def credit_likes(likes_by_post):
+    """Move likes_received of the authors of the given posts, {post_id: delta}"""
+    if not likes_by_post:
+        return
+    by_author = Counter()
+    for post_id, author_id in Post.objects.filter(pk__in=likes_by_post).values_list('pk', 'author_id'):
+        by_author[author_id] += likes_by_post[post_id]
+    authors_by_delta = defaultdict(list)
+    for author_id, delta in by_author.items():
+        authors_by_delta[delta].append(author_id)
+    for delta, author_ids in authors_by_delta.items():
+        # Zero deltas are skipped by adjust_stats.
+        adjust_stats(author_ids, likes_received=delta)
+
+
+def _subquery(queryset, aggregate, user_ref):
+    rows = queryset.filter(author_id=OuterRef(user_ref)).order_by().values('author_id')
+    return Subquery(rows.annotate(value=aggregate).values('value'))
+
+
+def actual_stats(user_ref='user_id'):
+    """
+    Annotations with the totals counted from scratch, named actual_<field>,
+    for a queryset whose user id is `user_ref` (UserStats by default).
+    """
+    last_post = _subquery(Post.objects, Max('created_at'), user_ref)
+    last_comment = _subquery(Comment.objects, Max('created_at'), user_ref)
+    return {
+        'actual_post_count': Coalesce(_subquery(Post.objects, Count('*'), user_ref), Value(0)),
+        'actual_comment_count': Coalesce(_subquery(Comment.objects, Count('*'), user_ref), Value(0)),
+        'actual_likes_received': Coalesce(
+            _subquery(Post.objects, Sum('like_count'), user_ref), Value(0), output_field=IntegerField()
+        ),
+        # Either side may be NULL, which GREATEST() does not skip on every backend.
+        'actual_last_active_at': Greatest(Coalesce(last_post, last_comment), Coalesce(last_comment, last_post)),
+    }
+
+
+def recount_stats(user_ids):
+    """Recompute the stats rows of `user_ids` in one UPDATE, e.g. after bulk inserts"""
+    _forget(user_ids)
+    actual = actual_stats()
+    return UserStats.objects.filter(user_id__in=user_ids).update(
+        **{field: actual[f'actual_{field}'] for field in STATS_FIELDS}
+    )
+
+
+def get_user_stats(user):
+    """The user's totals as a dict of STATS_FIELDS, usually from the cache"""
+    key = stats_cache_key(user.pk)
+    stats = cache.get(key)
+    if stats is None:
+        stats = UserStats.objects.filter(user_id=user.pk).values(*STATS_FIELDS).first()
+        if stats is None:
+            # No row (users inserted around the signals, until
+            # reconcile_user_stats runs): count, without writing.
+            row = User.objects.filter(pk=user.pk).values(**actual_stats('pk')).get()
+            return {field: row[f'actual_{field}'] for field in STATS_FIELDS}
+        cache.set(key, stats, STATS_CACHE_TIMEOUT)
+    return stats
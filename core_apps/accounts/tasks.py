@@ -0,0 +1,45 @@
+import logging
+
+from celery import shared_task
+from django.utils import timezone
+
+from core_apps.posts.feed_cache import bump_feed_version
+from .avatars import AVATAR_SIZES, InvalidAvatar, render_variants, store_variants
+from .models import UserProfile
+from .profiles import forget_profile
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(ignore_result=True)
+def process_avatar(profile_id, upload_name):
+    """Turn a profile's pending avatar upload into stripped, resized variants"""
+    storage = UserProfile._meta.get_field('avatar_upload').storage
+    pending = UserProfile.objects.filter(pk=profile_id, avatar_upload=upload_name)
+    user_id = pending.values_list('user_id', flat=True).first()
+    if user_id is None:
+        # Superseded by a newer upload, or the profile is gone.
+        storage.delete(upload_name)
+        return
+
+    try:
+        with storage.open(upload_name) as upload:
+            variants = store_variants(render_variants(upload), storage)
+    except (InvalidAvatar, FileNotFoundError) as exc:
+        logger.warning('Discarding avatar upload %s of profile %s: %s', upload_name, profile_id, exc)
+        if pending.update(avatar_upload='', updated_at=timezone.now()):
+            forget_profile(user_id)
+    else:
+        # The filter makes this a no-op if another upload arrived meanwhile;
+        # that upload's own task will finish the job.
+        updated = pending.update(
+            avatar=variants['jpeg'][str(max(AVATAR_SIZES))],
+            avatar_variants=variants,
+            avatar_upload='',
+            updated_at=timezone.now(),
+        )
+        if updated:
+            # Post cards and comments show the avatar.
+            forget_profile(user_id)
+            bump_feed_version()
+    storage.delete(upload_name)
@@ -1,3 +1,438 @@
-from django.test import TestCase
+import gzip
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.db import connection
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from core_apps.comments.models import Comment
+from core_apps.common.cache import fakeredis_cache
+from core_apps.posts.likes import like_post, unlike_post
+from core_apps.posts.models import Post
+
+from . import export
+from .avatars import AVATAR_SIZES
+from .models import UserProfile, UserStats
+from .profiles import get_profile
+from .stats import STATS_FIELDS, get_user_stats
+from .tasks import process_avatar
+from .views import serve_media
+
+
+class ExportViewTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('writer', password='pass12345')
+        other = User.objects.create_user('other', password='pass12345')
+        self.posts = [
+            Post.objects.create(title=f'Post {i}', content='Body ✓', author=self.user) for i in range(5)
+        ]
+        foreign = Post.objects.create(title='Not mine', content='Body', author=other)
+        Comment.objects.create(post=foreign, author=self.user, text='Nice')
+        Comment.objects.create(post=self.posts[0], author=other, text='Not mine either')
+        foreign.likes.add(self.user)
+        self.url = reverse('accounts:export')
+
+    def records(self, body):
+        return [json.loads(line) for line in body.decode('utf-8').splitlines()]
+
+    def test_requires_login(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 302)
+
+    def test_streams_only_the_users_data(self):
+        self.client.force_login(self.user)
+        response = self.client.get(self.url)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson; charset=utf-8')
+        self.assertIn('writer-export.ndjson', response['Content-Disposition'])
+
+        records = self.records(b''.join(response.streaming_content))
+        self.assertEqual(records[0]['type'], 'user')
+        self.assertEqual(records[0]['username'], 'writer')
+        posts = [r for r in records if r['type'] == 'post']
+        self.assertEqual([p['id'] for p in posts], [p.pk for p in self.posts])
+        self.assertEqual(posts[0]['content'], 'Body ✓')
+        self.assertEqual([r['text'] for r in records if r['type'] == 'comment'], ['Nice'])
+        self.assertEqual(len([r for r in records if r['type'] == 'like']), 1)
+
+    def test_gzip(self):
+        self.client.force_login(self.user)
+        response = self.client.get(self.url, {'compress': 'gzip'})
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        self.assertIn('.ndjson.gz', response['Content-Disposition'])
+        records = self.records(gzip.decompress(b''.join(response.streaming_content)))
+        self.assertEqual(len(records), 1 + 5 + 1 + 1)
+
+    async def test_streams_from_async_generators_under_asgi(self):
+        await self.async_client.aforce_login(self.user)
+        for params, decode in (({}, bytes), ({'compress': 'gzip'}, gzip.decompress)):
+            response = await self.async_client.get(self.url, params)
+            # A sync iterator would be read into a list before sending.
+            self.assertTrue(response.is_async)
+            body = b''.join([block async for block in response.streaming_content])
+            records = self.records(decode(body))
+            self.assertEqual([r['type'] for r in records], ['user'] + ['post'] * 5 + ['comment', 'like'])
+
+    def test_rows_are_read_in_chunks_and_emitted_in_blocks(self):
+        with mock.patch.object(export, 'EXPORT_CHUNK_SIZE', 2):
+            blocks = list(export.ndjson_blocks(export.export_records(self.user), block_size=1))
+        self.assertEqual(len(blocks), 8)
+        self.assertTrue(all(block.endswith(b'\n') for block in blocks))
+
+        async def ablocks():
+            return [block async for block in export.andjson_blocks(export.aexport_records(self.user), block_size=1)]
+
+        with mock.patch.object(export, 'EXPORT_CHUNK_SIZE', 2):
+            self.assertEqual(async_to_sync(ablocks)(), blocks)
+
+
+def jpeg_upload(name='me.jpg', size=(640, 480), color='red'):
+    """A JPEG carrying EXIF: camera make and a 90 degree orientation"""
+    exif = Image.Exif()
+    exif[0x010F] = 'Camera'
+    exif[0x0112] = 6
+    out = io.BytesIO()
+    Image.new('RGB', size, color).save(out, 'JPEG', exif=exif)
+    return SimpleUploadedFile(name, out.getvalue(), content_type='image/jpeg')
+
+
+class AvatarProcessingTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.user = User.objects.create_user('writer', password='pass12345')
+        self.client.force_login(self.user)
+        self.url = reverse('accounts:ajax_edit_profile')
+
+    def upload(self, file):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(self.url, {'bio': 'Hi', 'avatar': file})
+
+    def test_upload_is_replaced_by_stripped_variants(self):
+        response = self.upload(jpeg_upload())
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['avatar_processing'])
+
+        profile = UserProfile.objects.get(user=self.user)
+        self.assertFalse(profile.avatar_processing)
+        self.assertEqual(default_storage.listdir('avatars/uploads/')[1], [])
+        self.assertEqual(set(profile.avatar_variants), {'webp', 'jpeg'})
+        for key, fmt in (('webp', 'WEBP'), ('jpeg', 'JPEG')):
+            for size in AVATAR_SIZES:
+                name = profile.avatar_variants[key][str(size)]
+                with default_storage.open(name) as f:
+                    image = Image.open(f)
+                    self.assertEqual((image.format, image.size), (fmt, (size, size)))
+                    self.assertEqual(len(image.getexif()), 0)
+        self.assertEqual(profile.avatar.name, profile.avatar_variants['jpeg'][str(max(AVATAR_SIZES))])
+        self.assertIn(' 256w', profile.avatar_webp_srcset)
+
+        page = self.client.get(reverse('accounts:user_profile', args=[self.user.username]))
+        self.assertContains(page, profile.avatar_thumbnail_url)
+
+    def test_identical_images_share_variant_files(self):
+        self.upload(jpeg_upload('a.jpg'))
+        first = UserProfile.objects.get(user=self.user).avatar_variants
+        self.upload(jpeg_upload('b.jpg'))
+        self.assertEqual(UserProfile.objects.get(user=self.user).avatar_variants, first)
+
+    def test_invalid_upload_is_discarded(self):
+        self.upload(SimpleUploadedFile('me.jpg', b'not an image', content_type='image/jpeg'))
+        profile = UserProfile.objects.get(user=self.user)
+        self.assertFalse(profile.avatar_processing)
+        self.assertEqual(profile.avatar_variants, {})
+        self.assertEqual(default_storage.listdir('avatars/uploads/')[1], [])
+
+    def test_superseded_upload_is_dropped(self):
+        with mock.patch('core_apps.accounts.views.process_avatar'):
+            self.upload(jpeg_upload('old.jpg', color='blue'))
+            old_name = UserProfile.objects.get(user=self.user).avatar_upload.name
+            self.upload(jpeg_upload('new.jpg'))
+        process_avatar(UserProfile.objects.get(user=self.user).pk, old_name)
+
+        profile = UserProfile.objects.get(user=self.user)
+        self.assertTrue(profile.avatar_processing)
+        self.assertFalse(default_storage.exists(old_name))
+
+    @override_settings(AVATAR_MAX_UPLOAD_SIZE=100)
+    def test_oversized_upload_is_rejected(self):
+        response = self.upload(jpeg_upload())
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(UserProfile.objects.get(user=self.user).avatar_upload)
+
+    def test_development_media_caches_variants_forever(self):
+        self.upload(jpeg_upload())
+        variant = UserProfile.objects.get(user=self.user).avatar_variants['webp']['128']
+        default_storage.save('avatars/other.jpg', io.BytesIO(b'x'))
+        request = RequestFactory().get('/media/')
+        response = serve_media(request, variant, document_root=settings.MEDIA_ROOT)
+        self.assertIn('immutable', response['Cache-Control'])
+        response = serve_media(request, 'avatars/other.jpg', document_root=settings.MEDIA_ROOT)
+        self.assertFalse(response.has_header('Cache-Control'))
+
+    def test_local_settings_process_uploads_without_a_broker(self):
+        script = 'from config.settings import local; print(local.CELERY_TASK_ALWAYS_EAGER)'
+        env = {key: value for key, value in os.environ.items() if key != 'CELERY_TASK_ALWAYS_EAGER'}
+        output = subprocess.run([sys.executable, '-c', script], env=env, check=True,
+                                capture_output=True, text=True).stdout
+        self.assertEqual(output.strip(), 'True')
+
+
+class UserStatsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user('author', password='pass12345')
+        self.reader = User.objects.create_user('reader', password='pass12345')
+
+    def stats(self, user):
+        return UserStats.objects.values(*STATS_FIELDS).get(user=user)
+
+    def test_counters_follow_writes(self):
+        posts = [Post.objects.create(title=f'Post {i}', content='Body', author=self.author) for i in range(3)]
+        comment = Comment.objects.create(post=posts[0], author=self.reader, text='Nice')
+        Comment.objects.create(post=posts[1], author=self.reader, text='Again')
+        like_post(posts[0].pk, self.reader.pk)
+        like_post(posts[0].pk, self.reader.pk)
+        posts[1].likes.add(self.reader, self.author)
+        self.reader.liked_posts.add(posts[2])
+        self.reader.liked_posts.remove(posts[1], posts[2])
+
+        self.assertEqual(self.stats(self.author)['post_count'], 3)
+        self.assertEqual(self.stats(self.author)['likes_received'], 2)
+        self.assertEqual(self.stats(self.reader)['comment_count'], 2)
+        self.assertEqual(self.stats(self.reader)['last_active_at'], Comment.objects.latest('created_at').created_at)
+
+        unlike_post(posts[0].pk, self.reader.pk)
+        comment.delete()
+        posts[1].delete()
+        self.assertEqual(self.stats(self.author)['post_count'], 2)
+        self.assertEqual(self.stats(self.author)['likes_received'], 0)
+        self.assertEqual(self.stats(self.reader)['comment_count'], 0)
+
+        out = StringIO()
+        call_command('reconcile_user_stats', stdout=out)
+        self.assertIn('Checked 2 users, 0 fixed.', out.getvalue())
+
+    def test_post_deletes_count_cascaded_comments_in_one_update(self):
+        posts = [Post.objects.create(title=f'Post {i}', content='Body', author=self.author) for i in range(3)]
+        for post in posts:
+            for i in range(4):
+                Comment.objects.create(post=post, author=self.reader, text=f'Hi {i}')
+            Comment.objects.create(post=post, author=self.author, text='Thanks')
+
+        with CaptureQueriesContext(connection) as ctx:
+            posts[0].delete()
+        updates = [query for query in ctx if query['sql'].startswith('UPDATE "accounts_userstats"')]
+        self.assertEqual(len(updates), 2)
+        self.assertEqual(self.stats(self.reader)['comment_count'], 8)
+        self.assertEqual(self.stats(self.author)['comment_count'], 2)
+
+        Post.objects.filter(pk__in=[posts[1].pk, posts[2].pk]).delete()
+        self.assertEqual(self.stats(self.reader)['comment_count'], 0)
+        self.assertEqual(self.stats(self.author)['comment_count'], 0)
+        self.assertEqual(self.stats(self.author)['post_count'], 0)
+
+    def test_reconcile_repairs_drift(self):
+        Post.objects.create(title='Post', content='Body', author=self.author)
+        UserStats.objects.filter(user=self.author).update(post_count=7)
+        UserStats.objects.filter(user=self.reader).delete()
+
+        out = StringIO()
+        call_command('reconcile_user_stats', stdout=out)
+        self.assertIn('Checked 2 users, 1 fixed.', out.getvalue())
+        self.assertEqual(self.stats(self.author)['post_count'], 1)
+        self.assertEqual(self.stats(self.reader)['post_count'], 0)
+
+    def test_reads_are_cached_until_a_write_commits(self):
+        self.assertEqual(get_user_stats(self.author)['post_count'], 0)
+        with self.assertNumQueries(0):
+            get_user_stats(self.author)
+        with self.captureOnCommitCallbacks(execute=True):
+            Post.objects.create(title='Post', content='Body', author=self.author)
+        self.assertEqual(get_user_stats(self.author)['post_count'], 1)
+
+
+class ProfilePaginationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('writer', password='pass12345')
+        self.posts = [Post.objects.create(title=f'Post {i}', content='Body', author=self.user) for i in range(23)]
+        for post in self.posts[:12]:
+            Comment.objects.create(post=post, author=self.user, text=f'On {post.title}')
+        self.client.force_login(self.user)
+
+    def test_profile_shows_totals_and_first_pages(self):
+        response = self.client.get(reverse('accounts:user_profile', args=['writer']))
+        self.assertEqual(response.context['stats']['post_count'], 23)
+        self.assertEqual(response.context['stats']['comment_count'], 12)
+        self.assertEqual(len(response.context['posts']), 10)
+        self.assertContains(response, 'Posts (23)')
+        self.assertContains(response, reverse('accounts:load_profile_posts', args=['writer']))
+
+    def test_cursor_pages_cover_everything_once(self):
+        for name, total in (('load_profile_posts', 23), ('load_profile_comments', 12)):
+            url = reverse(f'accounts:{name}', args=['writer'])
+            cursor = self.client.get(reverse('accounts:user_profile', args=['writer'])).context[
+                name.removeprefix('load_profile_')
+            ].next_cursor
+            seen = 10
+            while cursor:
+                data = self.client.get(url, {'cursor': cursor}).json()
+                seen += data['html'].count('card-body')
+                cursor = data['next_cursor']
+            self.assertEqual(seen, total, name)
+
+        self.assertEqual(self.client.get(url, {'cursor': 'garbage'}).status_code, 400)
+
+
+class UserProfileTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('writer', password='pass12345')
+        self.client.force_login(self.user)
+
+    def writes(self, queries):
+        return [q['sql'] for q in queries if q['sql'].startswith(('INSERT', 'UPDATE', 'DELETE'))]
+
+    def test_profile_comes_with_the_user(self):
+        self.assertTrue(UserProfile.objects.filter(user=self.user).exists())
+        self.client.logout()
+        response = self.client.post(
+            reverse('accounts:ajax_register'),
+            json.dumps({'username': 'newbie', 'email': 'newbie@example.com', 'first_name': 'New', 'last_name': 'Bie',
+                        'password1': 'S3cure-pass-123', 'password2': 'S3cure-pass-123'}),
+            content_type='application/json',
+        )
+        self.assertTrue(response.json()['success'], response.content)
+        self.assertEqual(UserProfile.objects.filter(user__username='newbie').count(), 1)
+
+    def test_profile_pages_never_write_and_own_profile_is_cached(self):
+        other = User.objects.create_user('other', password='pass12345')
+        UserProfile.objects.filter(user=other).delete()
+        for url in (reverse('accounts:profile'), reverse('accounts:user_profile', args=['other'])):
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.client.get(url).status_code, 200)
+            self.assertEqual(self.writes(queries), [], url)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('accounts:profile'))
+        self.assertFalse(any('accounts_userprofile' in q['sql'] for q in queries))
+
+    def test_edit_invalidates_the_cached_profile(self):
+        self.assertEqual(get_profile(self.user).bio, '')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('accounts:ajax_edit_profile'), {'bio': 'Hello there'})
+        self.assertEqual(get_profile(User.objects.get(pk=self.user.pk)).bio, 'Hello there')
+        self.assertContains(self.client.get(reverse('accounts:profile')), 'Hello there')
+
+    def test_backfill_creates_missing_profiles(self):
+        UserProfile.objects.all().delete()
+        out = StringIO()
+        call_command('backfill_user_profiles', stdout=out)
+        self.assertIn('Created 1 missing profiles.', out.getvalue())
+        self.assertTrue(UserProfile.objects.filter(user=self.user).exists())
+
+    def test_cards_and_comments_show_avatars_without_extra_queries(self):
+        variants = {'jpeg': {'128': 'avatars/v/abc.jpg'}}
+        authors = [User.objects.create_user(f'author{i}', password='pass12345') for i in range(3)]
+        UserProfile.objects.filter(user__in=authors).update(avatar_variants=variants)
+        post = None
+        for author in authors:
+            post = Post.objects.create(title='Post', content='Body', author=author)
+            Comment.objects.create(post=post, author=author, text='Me first')
+
+        # Query budgets raise on N+1 under the test runner.
+        self.assertContains(self.client.get('/'), 'avatars/v/abc.jpg', count=3)
+        self.assertContains(self.client.get(reverse('posts:post_detail', args=[post.pk])), 'avatars/v/abc.jpg')
+
+
+class SessionStoreTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('reader', password='pass12345')
+
+    def session_queries(self, store):
+        caches = {**settings.CACHES, 'sessions': fakeredis_cache(f'test-sessions-{store}')}
+        with override_settings(SESSION_ENGINE=settings.SESSION_ENGINES[store], CACHES=caches):
+            # A new client: SessionMiddleware binds its store when loaded.
+            client = Client()
+            client.force_login(self.user)
+            client.get('/')
+            with CaptureQueriesContext(connection) as queries:
+                response = client.get('/')
+            self.assertEqual(response.context['user'], self.user)
+        return [q['sql'] for q in queries if 'django_session' in q['sql']]
+
+    def test_cache_backed_stores_skip_the_session_table(self):
+        self.assertEqual(len(self.session_queries('db')), 1)
+        self.assertEqual(self.session_queries('cached_db'), [])
+        self.assertEqual(self.session_queries('cache'), [])
+
+    def test_purge_deletes_only_expired_sessions(self):
+        now = timezone.now()
+        Session.objects.bulk_create(
+            [Session(session_key=f'expired{i}', session_data='', expire_date=now - timedelta(days=1)) for i in range(5)]
+            + [Session(session_key='live', session_data='', expire_date=now + timedelta(days=1))]
+        )
+        out = StringIO()
+        call_command('purge_sessions', '--batch-size', '2', stdout=out)
+        self.assertIn('Deleted 5 expired sessions.', out.getvalue())
+        self.assertEqual(list(Session.objects.values_list('session_key', flat=True)), ['live'])
+
+        out = StringIO()
+        with override_settings(SESSION_ENGINE=settings.SESSION_ENGINES['cache']):
+            call_command('purge_sessions', stdout=out)
+        self.assertIn('nothing to purge', out.getvalue())
+
+    def test_unknown_store_is_a_configuration_error(self):
+        env = {**os.environ, 'DJANGO_SESSION_STORE': 'redis'}
+        result = subprocess.run([sys.executable, '-c', 'from config.settings import base'], env=env,
+                                capture_output=True, text=True)
+        self.assertNotEqual(result.returncode, 0)
+        self.assertIn("ImproperlyConfigured: DJANGO_SESSION_STORE='redis' is not one of cache, cached_db, db",
+                      result.stderr)
+
+
+class BenchSessionsCommandTests(TestCase):
+    def test_compares_the_stores(self):
+        author = User.objects.create_user('author', password='pass12345')
+        post = Post.objects.create(title='Benchmarked post', content='Body', author=author)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            output_path = os.path.join(tmp, 'sessions.json')
+            call_command('bench_sessions', '--iterations', '3', '--output', output_path, stdout=StringIO())
+            with open(output_path) as f:
+                results = json.load(f)['results']
+
+        self.assertEqual(len(results), 15)
+        self.assertEqual(results['db:load']['session_queries'], 1)
+        self.assertEqual(results['cached_db:load']['session_queries'], 0)
+        self.assertEqual(results['cached_db:modify']['session_queries'], 1)
+        self.assertEqual(results['cache:home']['session_queries'], 0)
+        self.assertGreater(results['db:home']['session_queries'], 0)
+        post.refresh_from_db()
+        self.assertEqual(post.like_count, 0)
+        self.assertFalse(Session.objects.exists())
@@ -9,6 +9,9 @@ urlpatterns = [
     path('logout/', views.CustomLogoutView.as_view(), name='logout'),
     path('profile/', views.profile_view, name='profile'),
     path('profile/<str:username>/', views.profile_view, name='user_profile'),
+    path('profile/<str:username>/posts/', views.load_profile_posts, name='load_profile_posts'),
+    path('profile/<str:username>/comments/', views.load_profile_comments, name='load_profile_comments'),
+    path('export/', views.export_view, name='export'),
     
     # AJAX endpoints
     path('ajax/login/', views.ajax_login, name='ajax_login'),
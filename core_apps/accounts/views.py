@@ -3,16 +3,27 @@ from django.shortcuts import render, redirect
 from django.contrib.auth import login, authenticate
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
-from django.http import JsonResponse
+from django.conf import settings
+from django.db import transaction
+from django.http import JsonResponse, StreamingHttpResponse
+from django.template.loader import render_to_string
 from django.views.decorators.csrf import csrf_exempt
+from django.views import static
 from django.views.decorators.http import require_http_methods
 from django.contrib.auth.views import LoginView, LogoutView
 from django.urls import reverse_lazy
 from django.contrib import messages
 import json
 
+from core_apps.common.query_budget import query_budget
+from core_apps.posts.pagination import InvalidCursor, KeysetPaginator
+from .avatars import AVATAR_VARIANT_DIR
+from .export import export_records, gzip_blocks, ndjson_blocks
 from .forms import CustomUserCreationForm, CustomAuthenticationForm
 from .models import UserProfile
+from .profiles import get_profile
+from .stats import get_user_stats
+from .tasks import process_avatar
 
 class CustomLoginView(LoginView):
     form_class = CustomAuthenticationForm
@@ -40,29 +51,97 @@ def login_view(request):
     return render(request, 'user/auth/signin.html', {'form': form})
 
 
+PROFILE_PAGE_SIZE = 10
+
+
+def profile_posts(user):
+    return user.post_set.defer('content')
+
+
+def profile_comments(user):
+    return user.comment_set.select_related('post').only(
+        'text', 'created_at', 'author', 'post', 'post__title'
+    )
+
+
+def profile_user_or_none(request, username):
+    if not username:
+        return request.user
+    return User.objects.select_related('userprofile').filter(username=username).first()
+
+
+@query_budget(8)
 @login_required
 def profile_view(request, username=None):
-    if username:
-        try:
-            user = User.objects.get(username=username)
-        except User.DoesNotExist:
-            return redirect('home')
-    else:
-        user = request.user
-    
-    profile, created = UserProfile.objects.get_or_create(user=user)
-    posts = user.post_set.all().order_by('-created_at')
-    comments = user.comment_set.all().order_by('-created_at')
-    
+    user = profile_user_or_none(request, username)
+    if user is None:
+        return redirect('home')
+
+    profile = get_profile(user)
+    # The header reads the cached totals; the lists are the first cursor
+    # pages, the rest is fetched on demand by load_profile_posts/comments.
     context = {
         'profile_user': user,
         'profile': profile,
-        'posts': posts,
-        'comments': comments,
+        'stats': get_user_stats(user),
+        'posts': KeysetPaginator(profile_posts(user), PROFILE_PAGE_SIZE).page(),
+        'comments': KeysetPaginator(profile_comments(user), PROFILE_PAGE_SIZE).page(),
     }
     return render(request, 'user/profile/profile.html', context)
 
 
+def _profile_page(request, username, queryset_for, template, context_name):
+    user = profile_user_or_none(request, username)
+    if user is None:
+        return JsonResponse({'success': False, 'message': 'User not found'}, status=404)
+    try:
+        page = KeysetPaginator(queryset_for(user), PROFILE_PAGE_SIZE).page(request.GET.get('cursor'))
+    except InvalidCursor:
+        return JsonResponse({'success': False, 'message': 'Invalid cursor'}, status=400)
+    html = render_to_string(template, {context_name: page, 'profile_user': user}, request=request)
+    return JsonResponse({
+        'success': True,
+        'html': html,
+        'next_cursor': page.next_cursor,
+        'has_next': page.has_next(),
+    })
+
+
+@query_budget(4)
+@login_required
+@require_http_methods(["GET"])
+def load_profile_posts(request, username):
+    """The next page of a user's posts, after ?cursor="""
+    return _profile_page(request, username, profile_posts, 'user/profile/components/posts.html', 'posts')
+
+
+@query_budget(4)
+@login_required
+@require_http_methods(["GET"])
+def load_profile_comments(request, username):
+    """The next page of a user's comments, after ?cursor="""
+    return _profile_page(request, username, profile_comments, 'user/profile/components/comments.html', 'comments')
+
+
+def export_response(request, blocks, gzip):
+    """StreamingHttpResponse of NDJSON export blocks, passed through `gzip` for ?compress=gzip"""
+    filename = f'{request.user.username}-export.ndjson'
+    if request.GET.get('compress') == 'gzip':
+        response = StreamingHttpResponse(gzip(blocks), content_type='application/gzip')
+        filename += '.gz'
+    else:
+        response = StreamingHttpResponse(blocks, content_type='application/x-ndjson; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response['Cache-Control'] = 'private, no-store'
+    return response
+
+
+@login_required
+def export_view(request):
+    """The signed-in user's posts, comments and likes as streamed NDJSON; ?compress=gzip for .gz"""
+    return export_response(request, ndjson_blocks(export_records(request.user)), gzip_blocks)
+
+
 #.......................................API.......................................................
 @require_http_methods(["POST"])
 def ajax_register(request):
@@ -71,10 +150,8 @@ def ajax_register(request):
         form = CustomUserCreationForm(data)
         
         if form.is_valid():
-            user = form.save()
-            # Create user profile
-            UserProfile.objects.create(user=user)
-            
+            user = form.save()  # the profile comes with the user, see signals.py
+
             # Authenticate and login
             username = form.cleaned_data.get('username')
             password = form.cleaned_data.get('password1')
@@ -133,18 +210,39 @@ def ajax_login(request):
 def ajax_edit_profile(request):
     if request.method == 'POST':
         user = request.user
-        profile, _ = UserProfile.objects.get_or_create(user=user)
+        # Read fresh rather than through the cache, since it is saved below.
+        profile = UserProfile.objects.filter(user=user).first() or UserProfile(user=user)
 
         user.first_name = request.POST.get('first_name', user.first_name)
         user.last_name = request.POST.get('last_name', user.last_name)
         profile.bio = request.POST.get('bio', profile.bio)
 
-        if request.FILES.get('avatar'):
-            profile.avatar = request.FILES['avatar']
+        avatar = request.FILES.get('avatar')
+        if avatar:
+            if avatar.size > settings.AVATAR_MAX_UPLOAD_SIZE:
+                return JsonResponse({'success': False, 'error': 'The picture is too large'}, status=400)
+            # Stored as uploaded; resizing and metadata stripping happen in the background.
+            profile.avatar_upload = avatar
 
         user.save()
         profile.save()
+        if avatar:
+            upload_name = profile.avatar_upload.name
+            transaction.on_commit(lambda: process_avatar.delay(profile.pk, upload_name))
 
-        return JsonResponse({'success': True, 'message': 'Profile updated successfully'})
+        return JsonResponse({
+            'success': True,
+            'message': 'Profile updated successfully',
+            'avatar_processing': profile.avatar_processing,
+        })
     
-    return JsonResponse({'success': False, 'error': 'Invalid request method'}, status=400)
\ No newline at end of file
+    return JsonResponse({'success': False, 'error': 'Invalid request method'}, status=400)
+
+
+def serve_media(request, path, document_root=None, show_indexes=False):
+    """django.views.static.serve for MEDIA_URL in development, caching avatar variants forever"""
+    response = static.serve(request, path, document_root, show_indexes)
+    if path.startswith(AVATAR_VARIANT_DIR) and response.status_code == 200:
+        # Variant names are hashes of their content.
+        response['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
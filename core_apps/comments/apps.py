@@ -4,4 +4,7 @@ from django.utils.translation import gettext_lazy as _
 class CommentsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "core_apps.comments"
-    verbose_name = _("Comments")
\ No newline at end of file
+    verbose_name = _("Comments")
+
+    def ready(self):
+        from . import signals  # noqa: F401
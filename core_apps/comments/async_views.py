@@ -0,0 +1,105 @@
+"""
+Async variants of the comment read views, served under ASGI.
+See core_apps/posts/async_views.py.
+"""
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.shortcuts import aget_object_or_404
+from django.template.loader import render_to_string
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_http_methods
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from core_apps.common.query_budget import query_budget
+from core_apps.posts.models import Post
+from core_apps.posts.pagination import InvalidCursor, aget_page
+from .models import Comment
+from .pagination import COMMENTS_PAGE_SIZE, acomments_after
+from .serializers import CommentValuesSerializer
+from .views import CommentListCreateView
+
+comment_list_create_view = CommentListCreateView.as_view()
+
+
+@query_budget(8)
+@csrf_exempt
+async def comment_list_api(request, post_id):
+    """GET of CommentListCreateView; other methods go to the sync view"""
+    if request.method not in ('GET', 'HEAD'):
+        return await sync_to_async(comment_list_create_view)(request, post_id=post_id)
+
+    serializer = CommentValuesSerializer(context={'request': request})
+    queryset = serializer.values(
+        Comment.objects.filter(post_id=post_id).select_related('author').order_by('created_at')
+    )
+
+    # Cursor pagination, as linked from the post detail's comments_next
+    cursor = request.GET.get('cursor')
+    if cursor:
+        try:
+            comments, next_cursor = await acomments_after(queryset, cursor)
+        except InvalidCursor:
+            return JsonResponse({'detail': 'Invalid cursor'}, status=404)
+        next_url = None
+        if next_cursor:
+            url = remove_query_param(request.build_absolute_uri(), 'page')
+            next_url = replace_query_param(url, 'cursor', next_cursor)
+        return JsonResponse({
+            'comments': serializer.to_representation(comments),
+            'pagination': {
+                'next': next_url,
+                'has_next': next_cursor is not None,
+            }
+        })
+
+    comments = await aget_page(queryset, COMMENTS_PAGE_SIZE, request.GET.get('page', 1))
+    return JsonResponse({
+        'comments': serializer.to_representation(comments),
+        'pagination': {
+            'current_page': comments.number,
+            'total_pages': comments.paginator.num_pages,
+            'has_next': comments.has_next(),
+            'has_previous': comments.has_previous(),
+            'total_comments': comments.paginator.count,
+        }
+    })
+
+
+@query_budget(8)
+@require_http_methods(["GET"])
+async def load_comments_page(request, post_id):
+    """Load a specific page of comments via AJAX"""
+    try:
+        post = await aget_object_or_404(Post, id=post_id)
+        comments = Comment.objects.filter(post=post).select_related('author__userprofile').order_by('created_at')
+        comments_page = await aget_page(comments, 10, request.GET.get('page', 1))
+
+        # The rows are loaded and no request is passed, so nothing here
+        # touches the database: render in the event loop.
+        comments_html = render_to_string('blog/components/comments_list.html', {
+            'comments': comments_page,
+            'user': request.user,
+        })
+        pagination_html = render_to_string('blog/components/pagination.html', {
+            'page_obj': comments_page,
+            'post_id': post_id,
+        })
+
+        return JsonResponse({
+            'success': True,
+            'comments_html': comments_html,
+            'pagination_html': pagination_html,
+            'pagination': {
+                'current_page': comments_page.number,
+                'total_pages': comments_page.paginator.num_pages,
+                'has_next': comments_page.has_next(),
+                'has_previous': comments_page.has_previous(),
+                'total_comments': comments_page.paginator.count,
+            }
+        })
+
+    except Exception as e:
+        return JsonResponse({
+            'success': False,
+            'message': f'Error loading comments: {str(e)}'
+        }, status=500)
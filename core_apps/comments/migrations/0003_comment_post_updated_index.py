@@ -0,0 +1,19 @@
+# Generated by Django 5.2.4 on 2026-10-18 03:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("comments", "0002_comment_updated_at"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="comment",
+            index=models.Index(
+                fields=["post", "updated_at"], name="comments_post_updated_idx"
+            ),
+        ),
+    ]
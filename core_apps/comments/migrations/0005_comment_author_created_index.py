@@ -0,0 +1,20 @@
+# Generated by Django 5.2.4 on 2026-10-18 04:16
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("comments", "0004_comment_post_created_index"),
+        ("posts", "0006_post_author_feed_index"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="comment",
+            index=models.Index(fields=["author", "-created_at", "-id"], name="comments_author_created_idx"),
+        ),
+    ]
@@ -12,6 +12,14 @@ class Comment(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     class Meta:
         ordering = ['created_at']
+        indexes = [
+            # Newest comment edit per post, used by the post detail ETag
+            models.Index(fields=['post', 'updated_at'], name='comments_post_updated_idx'),
+            # Cursor pages of a post's comments, oldest first
+            models.Index(fields=['post', 'created_at', 'id'], name='comments_post_created_idx'),
+            # Cursor pages of one author's comments on the profile page, newest first
+            models.Index(fields=['author', '-created_at', '-id'], name='comments_author_created_idx'),
+        ]
 
     def __str__(self):
         return f'Comment by {self.author.username} on {self.post.title}'
\ No newline at end of file
@@ -0,0 +1,36 @@
+from django.db.models import Q
+
+from core_apps.posts.pagination import decode_cursor, encode_cursor
+
+# Comments embedded in the post detail API; the rest are fetched by cursor
+# from the comment list endpoint.
+EMBEDDED_COMMENTS = 5
+COMMENTS_PAGE_SIZE = 4
+
+
+def comments_after(queryset, cursor=None, limit=COMMENTS_PAGE_SIZE):
+    """
+    Return (comments, next_cursor) for the `limit` comments following
+    `cursor`, oldest first. Seeks on (created_at, id), so the cost does not
+    depend on how many comments come before the cursor.
+    """
+    return _page(list(_seek(queryset, cursor)[:limit + 1]), limit)
+
+
+async def acomments_after(queryset, cursor=None, limit=COMMENTS_PAGE_SIZE):
+    """comments_after for async views"""
+    return _page([row async for row in _seek(queryset, cursor)[:limit + 1]], limit)
+
+
+def _seek(queryset, cursor):
+    if cursor:
+        created_at, pk, _ = decode_cursor(cursor)
+        queryset = queryset.filter(Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=pk))
+    return queryset.order_by('created_at', 'id')
+
+
+def _page(rows, limit):
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, encode_cursor(rows[-1])
+    return rows, None
@@ -3,8 +3,10 @@ from rest_framework import serializers
 from django.contrib.auth.models import User
 from .models import Comment
 from core_apps.accounts.serializers import UserSerializer
+from core_apps.posts.fieldsets import SparseFieldsetMixin
+from core_apps.posts.values_serializers import ValuesSerializer, datetime_field
 
-class CommentSerializer(serializers.ModelSerializer):
+class CommentSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     author = UserSerializer(read_only=True)
     author_name = serializers.CharField(source='author.username', read_only=True)
 
@@ -16,3 +18,24 @@ class CommentSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         validated_data['author'] = self.context['request'].user
         return super().create(validated_data)
+
+
+class CommentValuesSerializer(ValuesSerializer):
+    """CommentSerializer over values() rows, for the comment list endpoint"""
+    fields = (
+        ('id', 'id', None),
+        ('post', 'post_id', None),
+        ('author', None, None),
+        ('author_name', 'author__username', None),
+        ('text', 'text', None),
+        ('created_at', 'created_at', datetime_field.to_representation),
+    )
+    extra_lookups = ('author_id', 'author__first_name', 'author__last_name')
+
+    def get_author(self, row):
+        return {
+            'id': row['author_id'],
+            'username': row['author__username'],
+            'first_name': row['author__first_name'],
+            'last_name': row['author__last_name'],
+        }
@@ -0,0 +1,22 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core_apps.posts.counters import adjust_counter
+from core_apps.posts.feed_cache import bump_feed_version
+from core_apps.posts.signals import deleting_posts
+from .models import Comment
+
+
+@receiver(post_save, sender=Comment)
+def count_created_comment(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        adjust_counter([instance.post_id], 'comment_count', 1)
+        bump_feed_version()
+
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_comment(sender, instance, origin=None, **kwargs):
+    if deleting_posts(origin):
+        return
+    adjust_counter([instance.post_id], 'comment_count', -1)
+    bump_feed_version()
@@ -1,3 +1,66 @@
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
 from django.test import TestCase
+from rest_framework.renderers import JSONRenderer
 
-# Create your tests here.
+from core_apps.posts.models import Post
+from .models import Comment
+from .serializers import CommentSerializer, CommentValuesSerializer
+
+
+class CommentValuesSerializerParityTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user('author', first_name='Ana', last_name='Lee', password='pass12345')
+        self.reader = User.objects.create_user('reader', password='pass12345')
+        self.post = Post.objects.create(title='Hello', content='Body', author=self.author)
+        for i, user in enumerate((self.author, self.reader, self.author, self.reader, self.reader)):
+            Comment.objects.create(post=self.post, author=user, text=f'Comment {i} <i>ünïcode</i>\nline')
+
+    def test_byte_identical_to_comment_serializer(self):
+        queryset = Comment.objects.filter(post=self.post).select_related('author').order_by('created_at')
+        fast = CommentValuesSerializer()
+        old = JSONRenderer().render(CommentSerializer(queryset, many=True).data)
+        new = JSONRenderer().render(fast.to_representation(fast.values(queryset)))
+        self.assertEqual(old, new)
+
+    def test_list_endpoint_pages_match(self):
+        data = self.client.get(f'/api/posts/{self.post.id}/comments/', {'page': 2}).json()
+        expected = CommentSerializer(
+            Comment.objects.filter(post=self.post).order_by('created_at')[4:], many=True
+        ).data
+        self.assertEqual([row['id'] for row in data['comments']], [row['id'] for row in expected])
+        self.assertEqual(data['comments'][0]['author'], dict(expected[0]['author']))
+        self.assertEqual(data['pagination']['total_comments'], 5)
+
+
+class AsyncCommentViewTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user('author', password='pass12345')
+        self.post = Post.objects.create(title='Hello', content='Body', author=self.author)
+        for i in range(12):
+            Comment.objects.create(post=self.post, author=self.author, text=f'Comment {i}')
+
+    def fetch(self, url):
+        sync_response = self.client.get(url)
+        async_response = async_to_sync(self.async_client.get)(url)
+        self.assertEqual(sync_response.status_code, async_response.status_code)
+        return sync_response.json(), async_response.json()
+
+    def test_comment_list_matches_sync_view(self):
+        base = f'/api/posts/{self.post.pk}/comments/'
+        for url in (base, f'{base}?page=3', f'{base}?page=99', f'{base}?cursor=bad'):
+            sync_data, async_data = self.fetch(url)
+            self.assertEqual(sync_data, async_data, url)
+
+        cursor_url = async_to_sync(self.async_client.get)(f'/api/posts/{self.post.pk}/').json()['comments_next']
+        sync_data, async_data = self.fetch(cursor_url)
+        self.assertEqual(sync_data, async_data)
+        self.assertTrue(async_data['pagination']['has_next'])
+
+    def test_load_comments_page_matches_sync_view(self):
+        url = f'/ajax/posts/{self.post.pk}/comments/page/?page=2'
+        sync_data, async_data = self.fetch(url)
+        self.assertEqual(sync_data, async_data)
+        self.assertIn('Comment 10', async_data['comments_html'])
+        response = async_to_sync(self.async_client.post)(url)
+        self.assertEqual(response.status_code, 405)
@@ -14,12 +14,18 @@ import json
 from django.template.defaultfilters import linebreaks
 
 from core_apps.posts.models import Post
+from rest_framework.exceptions import NotFound
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+from core_apps.common.query_budget import query_budget
+from core_apps.posts.pagination import InvalidCursor
 from .models import Comment
-from .serializers import CommentSerializer
+from .pagination import COMMENTS_PAGE_SIZE, comments_after
+from .serializers import CommentSerializer, CommentValuesSerializer
 from core_apps.posts.serializers import PostSerializer, PostListSerializer
 from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
 from django.template.loader import render_to_string
 
+@query_budget(8)
 class CommentListCreateView(generics.ListCreateAPIView):
     """List comments for a post or create a new comment"""
     serializer_class = CommentSerializer
@@ -29,11 +35,31 @@ class CommentListCreateView(generics.ListCreateAPIView):
         post_id = self.kwargs['post_id']
         return Comment.objects.filter(post_id=post_id).select_related('author').order_by('created_at')
     def list(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
-        
+        serializer = CommentValuesSerializer(context=self.get_serializer_context())
+        queryset = serializer.values(self.get_queryset())
+
+        # Cursor pagination, as linked from the post detail's comments_next
+        cursor = request.GET.get('cursor')
+        if cursor:
+            try:
+                comments, next_cursor = comments_after(queryset, cursor)
+            except InvalidCursor:
+                raise NotFound('Invalid cursor')
+            next_url = None
+            if next_cursor:
+                url = remove_query_param(request.build_absolute_uri(), 'page')
+                next_url = replace_query_param(url, 'cursor', next_cursor)
+            return Response({
+                'comments': serializer.to_representation(comments),
+                'pagination': {
+                    'next': next_url,
+                    'has_next': next_cursor is not None,
+                }
+            })
+
         # Pagination
         page = request.GET.get('page', 1)
-        paginator = Paginator(queryset, 4)  
+        paginator = Paginator(queryset, COMMENTS_PAGE_SIZE)
         
         try:
             comments = paginator.page(page)
@@ -42,10 +68,8 @@ class CommentListCreateView(generics.ListCreateAPIView):
         except EmptyPage:
             comments = paginator.page(paginator.num_pages)
         
-        serializer = self.get_serializer(comments, many=True)
-        
         return Response({
-            'comments': serializer.data,
+            'comments': serializer.to_representation(comments),
             'pagination': {
                 'current_page': comments.number,
                 'total_pages': paginator.num_pages,
@@ -229,12 +253,13 @@ def edit_comment_ajax(request, comment_id):
 
 
 # AJAX pagination view for Comments
+@query_budget(8)
 @require_http_methods(["GET"])
 def load_comments_page(request, post_id):
     """Load a specific page of comments via AJAX"""
     try:
         post = get_object_or_404(Post, id=post_id)
-        comments = Comment.objects.filter(post=post).select_related('author').order_by('created_at')
+        comments = Comment.objects.filter(post=post).select_related('author__userprofile').order_by('created_at')
         
         page = request.GET.get('page', 1)
         paginator = Paginator(comments, 10)  # 10 comments per page
@@ -301,7 +326,8 @@ def create_comment_ajax(request, post_id):
         )
         
         # Get total comments for pagination calculation
-        total_comments = Comment.objects.filter(post=post).count()
+        post.refresh_from_db(fields=['comment_count'])
+        total_comments = post.comment_count
         
         # Calculate which page the new comment should be on
         # Assuming newest comments go to the last page
@@ -0,0 +1,14 @@
+from django.apps import AppConfig
+from django.utils.translation import gettext_lazy as _
+
+class CommonConfig(AppConfig):
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "core_apps.common"
+    verbose_name = _("Common")
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+
+        from .db import configure_sqlite, install_context_wrappers
+        connection_created.connect(configure_sqlite)
+        connection_created.connect(install_context_wrappers)
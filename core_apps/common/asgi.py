@@ -0,0 +1,61 @@
+"""
+Serving the async read views under ASGI.
+
+Django decides per request whether a view runs sync or async, but a URL
+maps to one callable. AsyncViewsMiddleware therefore points ASGI requests
+at ASYNC_ROOT_URLCONF, a copy of ROOT_URLCONF built by `with_async_views`
+in which views with an async twin are replaced by it. URL names do not
+change, so reverse() is unaffected. WSGI requests pass straight through.
+
+The middleware also resolves request.user with `auser()`: the lazy
+request.user runs its session and user queries synchronously, which the
+async views may not do.
+"""
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.urls import URLPattern, URLResolver
+
+
+def with_async_views(patterns, async_views):
+    """
+    Copy a urlpatterns list, replacing views found in `async_views`, a dict
+    keyed by sync view function or by class based view class.
+    """
+    swapped = []
+    for entry in patterns:
+        if isinstance(entry, URLResolver):
+            swapped.append(URLResolver(
+                entry.pattern, with_async_views(entry.url_patterns, async_views),
+                entry.default_kwargs, entry.app_name, entry.namespace,
+            ))
+            continue
+        callback = entry.callback
+        view = async_views.get(callback) or async_views.get(getattr(callback, 'view_class', None))
+        if view is None:
+            swapped.append(entry)
+        else:
+            swapped.append(URLPattern(entry.pattern, view, entry.default_args, entry.name))
+    return swapped
+
+
+class AsyncViewsMiddleware:
+    """Goes after AuthenticationMiddleware"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        urlconf = getattr(settings, 'ASYNC_ROOT_URLCONF', None)
+        if urlconf:
+            request.urlconf = urlconf
+            request.user = await request.auser()
+        return await self.get_response(request)
@@ -0,0 +1,55 @@
+"""
+Cache backends that count hits and misses for the metrics endpoint.
+
+Only reads are counted: get() and get_many(), which is what the feed cache
+uses. Configure them in place of Django's own classes; the optional
+METRICS_NAME entry of the cache's settings labels its samples.
+"""
+from django.core.cache.backends import locmem, redis
+
+from .metrics import CACHE_REQUESTS
+
+_MISSING = object()
+
+
+class CacheMetricsMixin:
+    def __init__(self, location, params):
+        super().__init__(location, params)
+        self.metrics_name = params.get('METRICS_NAME', 'default')
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, _MISSING, version=version)
+        hit = value is not _MISSING
+        CACHE_REQUESTS.labels(self.metrics_name, 'hit' if hit else 'miss').inc()
+        return value if hit else default
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        found = super().get_many(keys, version=version)
+        CACHE_REQUESTS.labels(self.metrics_name, 'hit').inc(len(found))
+        CACHE_REQUESTS.labels(self.metrics_name, 'miss').inc(len(keys) - len(found))
+        return found
+
+
+class LocMemCache(CacheMetricsMixin, locmem.LocMemCache):
+    pass
+
+
+class RedisCache(CacheMetricsMixin, redis.RedisCache):
+    pass
+
+
+def fakeredis_cache(name):
+    """
+    A CACHES entry for RedisCache backed by fakeredis, an in-process Redis
+    stand-in, for tests and benchmarks. Entries with the same name share data.
+    """
+    from fakeredis import FakeConnection
+
+    return {
+        'BACKEND': 'core_apps.common.cache.RedisCache',
+        'LOCATION': 'redis://fakeredis:6379/0',
+        'KEY_PREFIX': name,
+        'METRICS_NAME': name,
+        'OPTIONS': {'connection_class': FakeConnection},
+    }
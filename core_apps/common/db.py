@@ -0,0 +1,56 @@
+"""
+Instrumenting every database query of one request.
+
+Connections are per thread, and under ASGI the async ORM runs its queries
+in whichever thread sync_to_async picks. Rather than installing
+execute_wrappers on the connections of one thread, middleware registers
+them in a context variable with `wrap_connections`. Every connection
+carries one permanent wrapper (added when it connects) that runs the
+wrappers registered in the current context; sync_to_async copies the
+context into its threads, so the same code works from sync and async
+middleware without extra thread hops.
+
+`configure_sqlite`, another connection_created receiver, sets the SQLite
+pragmas of settings.SQLITE_PRAGMAS on every new connection.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import partial
+
+from django.conf import settings
+
+_wrappers = ContextVar('core_apps.common.db.wrappers', default=())
+
+
+def context_wrappers(execute, sql, params, many, context):
+    wrappers = _wrappers.get()
+    for wrapper in reversed(wrappers):
+        execute = partial(wrapper, execute)
+    return execute(sql, params, many, context)
+
+
+def install_context_wrappers(sender, connection, **kwargs):
+    """connection_created receiver, connected by CommonConfig.ready()"""
+    # Reconnections reuse the same wrapper list. Go first: execute_wrapper()
+    # blocks pop their own wrappers from the end.
+    if context_wrappers not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, context_wrappers)
+
+
+@contextmanager
+def wrap_connections(*wrappers):
+    """Apply execute_wrappers to every query run in the current context, on every connection"""
+    token = _wrappers.set(_wrappers.get() + wrappers)
+    try:
+        yield
+    finally:
+        _wrappers.reset(token)
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    """connection_created receiver applying settings.SQLITE_PRAGMAS to SQLite connections"""
+    if connection.vendor != 'sqlite':
+        return
+    # On the raw connection: these are not queries of the current request.
+    for name, value in getattr(settings, 'SQLITE_PRAGMAS', {}).items():
+        connection.connection.execute(f'PRAGMA {name} = {value}')
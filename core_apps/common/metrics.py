@@ -0,0 +1,130 @@
+"""
+Prometheus metrics for requests, database time, template rendering and
+cache lookups, exposed by `metrics_view` at /metrics.
+
+Every metric here is a Counter or a Histogram, so it works unchanged in
+prometheus_client's multiprocess mode. Under gunicorn, point the
+PROMETHEUS_MULTIPROC_DIR environment variable at an empty directory that
+all workers share, wipe it on deploy, and call
+`prometheus_client.multiprocess.mark_process_dead(worker.pid)` from the
+`child_exit` server hook. The view then aggregates all workers. Without the
+variable it serves the in-process registry.
+
+Requests are labelled by resolved URL name (`posts:home`), never by raw
+path, so label cardinality stays bounded.
+
+Scrapers authenticate with METRICS_TOKEN. Without one the endpoint answers
+404, except under DEBUG.
+"""
+import os
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import Http404, HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest,
+)
+from prometheus_client import multiprocess
+
+from .db import wrap_connections
+
+UNRESOLVED = '<unresolved>'
+
+REQUEST_LATENCY = Histogram(
+    'blogapp_http_request_duration_seconds', 'Time spent handling a request',
+    ['view', 'method'],
+)
+REQUESTS = Counter(
+    'blogapp_http_requests', 'Requests handled, by response status',
+    ['view', 'method', 'status'],
+)
+DB_QUERIES = Histogram(
+    'blogapp_db_queries_per_request', 'Database queries run by one request',
+    ['view'], buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144, float('inf')),
+)
+DB_TIME = Histogram(
+    'blogapp_db_time_per_request_seconds', 'Time one request spent waiting on the database',
+    ['view'],
+)
+TEMPLATE_RENDER = Histogram(
+    'blogapp_template_render_duration_seconds', 'Time spent rendering a top level template',
+    ['template'],
+)
+CACHE_REQUESTS = Counter(
+    'blogapp_cache_requests', 'Cache lookups by alias and result',
+    ['cache', 'result'],
+)
+
+
+class DatabaseTimer:
+    """execute_wrapper counting queries and the time spent in them"""
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - started
+            self.queries += 1
+
+
+class MetricsMiddleware:
+    """Outermost middleware: request latency, status and DB usage per URL name"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timer = DatabaseTimer()
+        started = time.perf_counter()
+        with wrap_connections(timer):
+            response = self.get_response(request)
+        self.observe(request, response, timer, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        timer = DatabaseTimer()
+        started = time.perf_counter()
+        with wrap_connections(timer):
+            response = await self.get_response(request)
+        self.observe(request, response, timer, time.perf_counter() - started)
+        return response
+
+    def observe(self, request, response, timer, elapsed):
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else UNRESOLVED
+        method = request.method if request.method in ('GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE') else 'other'
+        REQUEST_LATENCY.labels(view, method).observe(elapsed)
+        REQUESTS.labels(view, method, str(response.status_code)).inc()
+        DB_QUERIES.labels(view).observe(timer.queries)
+        DB_TIME.labels(view).observe(timer.seconds)
+
+
+def metrics_view(request):
+    token = getattr(settings, 'METRICS_TOKEN', None)
+    if not token:
+        # Never public by accident: view names, traffic and timings leak.
+        if not settings.DEBUG:
+            raise Http404
+    elif not constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return HttpResponseForbidden()
+
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return HttpResponse(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
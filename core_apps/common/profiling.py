@@ -0,0 +1,219 @@
+"""
+Opt-in sampled request profiling.
+
+ProfilingMiddleware runs a request under cProfile when either
+
+  * a random draw falls under PROFILING_SAMPLE_RATE (0.0 disables sampling), or
+  * the request carries an `X-Profile` header holding a token from
+    `make_profile_token()`, signed with SECRET_KEY and valid for
+    PROFILING_TOKEN_MAX_AGE seconds. The admin profile list shows one.
+
+A sampled request leaves two files in PROFILING_DIR that share a stem: the
+pstats dump (`.prof`, open it with pstats or snakeviz) and a JSON summary
+with the request, timings and the SQL it ran (`.json`). The directory is a
+ring buffer of PROFILING_MAX_PROFILES profiles; the oldest are removed as
+new ones arrive.
+
+Requests that are not sampled only pay for one random() call and a header
+lookup. Work done while a streaming response is consumed is not profiled.
+Under ASGI the profile covers the event loop thread, where other requests'
+coroutines run too, but not the threads the ORM and templates run in; the
+SQL log is complete either way.
+"""
+import cProfile
+import io
+import json
+import os
+import pstats
+import random
+import re
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core import signing
+from django.utils import timezone
+
+from .db import wrap_connections
+
+PROFILE_HEADER = 'X-Profile'
+TOKEN_SALT = 'core_apps.common.profiling'
+# File names as written by save_profile(), e.g. 20261018T031502-123456-posts_home-1a2b3c4d.prof
+PROFILE_NAME_RE = re.compile(r'^[\w-]+\.(prof|json)$')
+SQL_LOG_LIMIT = 500
+
+
+def profile_dir():
+    return Path(getattr(settings, 'PROFILING_DIR', Path(tempfile.gettempdir()) / 'blogapp-profiles'))
+
+
+def make_profile_token():
+    return signing.TimestampSigner(salt=TOKEN_SALT).sign('profile')
+
+
+def valid_profile_token(token):
+    max_age = getattr(settings, 'PROFILING_TOKEN_MAX_AGE', 3600)
+    try:
+        return signing.TimestampSigner(salt=TOKEN_SALT).unsign(token, max_age=max_age) == 'profile'
+    except signing.BadSignature:
+        return False
+
+
+class SQLLog:
+    """execute_wrapper keeping the statements and timings of a profiled request"""
+
+    def __init__(self):
+        self.queries = []
+        self.total = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.total += 1
+            if len(self.queries) < SQL_LOG_LIMIT:
+                self.queries.append({
+                    'sql': sql,
+                    'params': repr(params)[:500],
+                    'many': many,
+                    'ms': round((time.perf_counter() - started) * 1000, 3),
+                })
+
+
+def list_profiles():
+    """Summaries of the stored profiles, newest first"""
+    profiles = []
+    for path in sorted(profile_dir().glob('*.json'), reverse=True):
+        try:
+            summary = json.loads(path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            continue
+        summary['stem'] = path.stem
+        profiles.append(summary)
+    return profiles
+
+
+def _write_atomically(path, write):
+    tmp = path.with_name(f'.{path.name}.tmp')
+    write(tmp)
+    os.replace(tmp, path)
+
+
+def _trim(directory, keep):
+    stems = sorted({path.stem for path in directory.glob('*.prof')} | {path.stem for path in directory.glob('*.json')})
+    for stem in stems[:max(len(stems) - keep, 0)]:
+        for suffix in ('.prof', '.json'):
+            (directory / f'{stem}{suffix}').unlink(missing_ok=True)
+
+
+def save_profile(profiler, sql_log, request, response, elapsed, reason):
+    directory = profile_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    match = getattr(request, 'resolver_match', None)
+    view = match.view_name if match else 'unresolved'
+    now = timezone.now()
+    stem = '-'.join([
+        now.strftime('%Y%m%dT%H%M%S'), f'{now.microsecond:06d}',
+        re.sub(r'\W+', '_', view).strip('_'), uuid.uuid4().hex[:8],
+    ])
+
+    summary = {
+        'created_at': now.isoformat(),
+        'method': request.method,
+        'path': request.get_full_path()[:1000],
+        'view': view,
+        'status': response.status_code,
+        'reason': reason,
+        'duration_ms': round(elapsed * 1000, 3),
+        'sql_count': sql_log.total,
+        'sql_ms': round(sum(query['ms'] for query in sql_log.queries), 3),
+        'sql': sql_log.queries,
+    }
+    _write_atomically(directory / f'{stem}.prof', lambda tmp: profiler.dump_stats(tmp))
+    _write_atomically(
+        directory / f'{stem}.json',
+        lambda tmp: tmp.write_text(json.dumps(summary, indent=1), encoding='utf-8'),
+    )
+    _trim(directory, getattr(settings, 'PROFILING_MAX_PROFILES', 50))
+    return stem
+
+
+def profile_text(stem, limit=60):
+    """pstats report of a stored profile, by cumulative time"""
+    out = io.StringIO()
+    stats = pstats.Stats(str(profile_dir() / f'{stem}.prof'), stream=out)
+    stats.sort_stats('cumulative').print_stats(limit)
+    return out.getvalue()
+
+
+def _start_profiler():
+    """A cProfile.Profile, or None when another profiler is already active"""
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # Another profiler (e.g. a developer's own cProfile run) is active.
+        return None
+    profiler.disable()
+    return profiler
+
+
+class ProfilingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def sample_reason(self, request):
+        rate = getattr(settings, 'PROFILING_SAMPLE_RATE', 0.0)
+        if rate and random.random() < rate:
+            return 'sampled'
+        token = request.headers.get(PROFILE_HEADER)
+        if token and valid_profile_token(token):
+            return 'header'
+        return None
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        reason = self.sample_reason(request)
+        profiler = _start_profiler() if reason else None
+        if profiler is None:
+            return self.get_response(request)
+
+        sql_log = SQLLog()
+        started = time.perf_counter()
+        with wrap_connections(sql_log):
+            profiler.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                profiler.disable()
+        elapsed = time.perf_counter() - started
+        save_profile(profiler, sql_log, request, response, elapsed, reason)
+        return response
+
+    async def __acall__(self, request):
+        reason = self.sample_reason(request)
+        profiler = _start_profiler() if reason else None
+        if profiler is None:
+            return await self.get_response(request)
+
+        sql_log = SQLLog()
+        started = time.perf_counter()
+        with wrap_connections(sql_log):
+            profiler.enable()
+            try:
+                response = await self.get_response(request)
+            finally:
+                profiler.disable()
+        elapsed = time.perf_counter() - started
+        await sync_to_async(save_profile)(profiler, sql_log, request, response, elapsed, reason)
+        return response
@@ -0,0 +1,159 @@
+"""
+Per-request SQL query budgets and N+1 detection.
+
+QueryBudgetMiddleware counts every query a request runs, on every database
+connection, and groups them by shape: the SQL with its parameters left out
+and IN lists collapsed, so the same lookup repeated for each row of a page
+shows up as one shape executed many times.
+
+A view declares its budget with the `query_budget` decorator, or through
+the QUERY_BUDGETS setting (keyed by URL name, e.g. for admin views that
+cannot be decorated). When a declared view runs more queries than its
+budget, or repeats one shape more than `max_duplicates` times, the
+violation is logged or raised depending on QUERY_BUDGET_MODE:
+
+    'off'    no counting at all (default)
+    'log'    log a warning; local settings use this mode
+    'raise'  raise QueryBudgetExceeded; the test runner uses this mode
+
+Repeated shapes in views without a declared budget are only logged.
+Queries run while a streaming response is consumed are not counted.
+"""
+import logging
+import re
+from collections import Counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from .db import wrap_connections
+
+logger = logging.getLogger(__name__)
+
+# A shape executed more often than this within one request is treated as
+# an N+1 unless the view's budget says otherwise.
+DEFAULT_MAX_DUPLICATES = 5
+
+IN_LIST_RE = re.compile(r'IN \((?:%s, )*%s\)')
+# Savepoints from atomic() blocks, and the BEGIN sent for an explicit SQLite
+# transaction_mode, are transaction bookkeeping, not queries.
+TRANSACTION_CONTROL_RE = re.compile(r'\s*(BEGIN|SAVEPOINT|RELEASE SAVEPOINT|ROLLBACK TO SAVEPOINT)\b', re.I)
+WHITESPACE_RE = re.compile(r'\s+')
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class QueryBudget:
+    def __init__(self, max_queries=None, max_duplicates=DEFAULT_MAX_DUPLICATES):
+        self.max_queries = max_queries
+        self.max_duplicates = max_duplicates
+
+    def __repr__(self):
+        return f'<QueryBudget max_queries={self.max_queries} max_duplicates={self.max_duplicates}>'
+
+
+def query_budget(max_queries=None, max_duplicates=DEFAULT_MAX_DUPLICATES):
+    """
+    Declare the query budget of a view function or class based view.
+    Apply it outermost, above @api_view and friends.
+    """
+    budget = QueryBudget(max_queries, max_duplicates)
+
+    def decorator(view):
+        view.query_budget = budget
+        return view
+    return decorator
+
+
+def query_shape(sql):
+    return IN_LIST_RE.sub('IN (...)', WHITESPACE_RE.sub(' ', sql.strip()))
+
+
+class QueryRecorder:
+    """execute_wrapper that tallies the shape of every query"""
+
+    def __init__(self):
+        self.shapes = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        if not TRANSACTION_CONTROL_RE.match(sql):
+            self.shapes[query_shape(sql)] += 1
+        return execute(sql, params, many, context)
+
+    @property
+    def total(self):
+        return sum(self.shapes.values())
+
+    def repeated(self, limit):
+        return [(shape, count) for shape, count in self.shapes.most_common() if count > limit]
+
+
+def view_budget(resolver_match):
+    """The declared budget for a resolved view, or None"""
+    if resolver_match is None:
+        return None
+    func = resolver_match.func
+    budget = getattr(func, 'query_budget', None) or getattr(
+        getattr(func, 'view_class', None), 'query_budget', None
+    )
+    if budget is None:
+        limit = getattr(settings, 'QUERY_BUDGETS', {}).get(resolver_match.view_name)
+        if limit is not None:
+            budget = QueryBudget(limit)
+    return budget
+
+
+class QueryBudgetMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        mode = getattr(settings, 'QUERY_BUDGET_MODE', 'off')
+        if mode == 'off':
+            return self.get_response(request)
+
+        recorder = QueryRecorder()
+        with wrap_connections(recorder):
+            response = self.get_response(request)
+        self.check(request, recorder, mode)
+        return response
+
+    async def __acall__(self, request):
+        mode = getattr(settings, 'QUERY_BUDGET_MODE', 'off')
+        if mode == 'off':
+            return await self.get_response(request)
+
+        recorder = QueryRecorder()
+        with wrap_connections(recorder):
+            response = await self.get_response(request)
+        self.check(request, recorder, mode)
+        return response
+
+    def check(self, request, recorder, mode):
+        match = getattr(request, 'resolver_match', None)
+        budget = view_budget(match)
+        view_name = match.view_name if match else request.path
+        limit = budget.max_duplicates if budget else DEFAULT_MAX_DUPLICATES
+
+        problems = []
+        if budget and budget.max_queries is not None and recorder.total > budget.max_queries:
+            problems.append(f'{recorder.total} queries, budget is {budget.max_queries}')
+        problems += [
+            f'possible N+1, {count} x {shape[:300]}' for shape, count in recorder.repeated(limit)
+        ]
+        if not problems:
+            return
+
+        message = f'{request.method} {request.path} ({view_name}): ' + '; '.join(problems)
+        if budget is not None and mode == 'raise':
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
@@ -0,0 +1,27 @@
+"""
+DjangoTemplates backend that times every render() of a top level template
+(render(), render_to_string(), TemplateResponse) for the metrics endpoint.
+Included and extended templates count towards the template that pulls
+them in.
+"""
+from django.template import TemplateDoesNotExist
+from django.template.backends import django as django_backend
+
+from .metrics import TEMPLATE_RENDER
+
+
+class Template(django_backend.Template):
+    def render(self, context=None, request=None):
+        with TEMPLATE_RENDER.labels(self.template.name or '<string>').time():
+            return super().render(context, request)
+
+
+class DjangoTemplates(django_backend.DjangoTemplates):
+    def from_string(self, template_code):
+        return Template(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return Template(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            django_backend.reraise(exc, self)
@@ -0,0 +1,31 @@
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class QueryBudgetTestRunner(DiscoverRunner):
+    """DiscoverRunner that makes query budget violations fail the test that caused them"""
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.saved_query_budget_mode = getattr(settings, 'QUERY_BUDGET_MODE', 'off')
+        settings.QUERY_BUDGET_MODE = 'raise'
+        # Run Celery tasks in-process (when their transaction commits). The
+        # Celery app reads CELERY_ settings from django.conf.settings live.
+        self.saved_celery_eager = settings.CELERY_TASK_ALWAYS_EAGER
+        settings.CELERY_TASK_ALWAYS_EAGER = True
+        settings.CELERY_TASK_EAGER_PROPAGATES = True
+        # collectstatic does not run for tests, so there is no manifest to
+        # resolve hashed names from: serve static files under their own names.
+        self.static_storage = override_settings(STORAGES={
+            **settings.STORAGES,
+            'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+        })
+        self.static_storage.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.static_storage.disable()
+        settings.QUERY_BUDGET_MODE = self.saved_query_budget_mode
+        settings.CELERY_TASK_ALWAYS_EAGER = self.saved_celery_eager
+        del settings.CELERY_TASK_EAGER_PROPAGATES
+        super().teardown_test_environment(**kwargs)
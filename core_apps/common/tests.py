@@ -0,0 +1,368 @@
+import os
+import re
+import subprocess
+import sys
+import tempfile
+from io import StringIO
+from unittest import mock, skipUnless
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.wsgi import get_wsgi_application
+from django.core.management import call_command
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import path, reverse
+from prometheus_client import REGISTRY
+
+from config.settings.database import postgres_database
+from core_apps.comments.models import Comment
+from core_apps.posts.management.commands.bench_concurrency import wsgi_get
+from core_apps.posts.models import Post
+from .profiling import PROFILE_HEADER, list_profiles, make_profile_token
+from .query_budget import QueryBudgetExceeded, query_budget, query_shape
+
+
+@query_budget(2)
+def over_budget(request):
+    for _ in range(3):
+        User.objects.exists()
+    return HttpResponse('ok')
+
+
+def undeclared_n_plus_one(request):
+    for comment in Comment.objects.all():
+        comment.post.title
+    return HttpResponse('ok')
+
+
+n_plus_one = query_budget(20)(lambda request: undeclared_n_plus_one(request))
+
+
+def registered(request):
+    for _ in range(3):
+        User.objects.exists()
+    return HttpResponse('ok')
+
+
+urlpatterns = [
+    path('over/', over_budget),
+    path('n-plus-one/', n_plus_one),
+    path('undeclared/', undeclared_n_plus_one),
+    path('registered/', registered, name='registered'),
+]
+
+
+@override_settings(ROOT_URLCONF='core_apps.common.tests')
+class QueryBudgetMiddlewareTests(TestCase):
+    def setUp(self):
+        author = User.objects.create_user('author', password='pass12345')
+        for i in range(8):
+            post = Post.objects.create(title=f'Post {i}', content='Body', author=author)
+            Comment.objects.create(post=post, author=author, text='Hi')
+
+    def test_budget_violations_raise_under_the_test_runner(self):
+        with self.assertRaisesMessage(QueryBudgetExceeded, '3 queries, budget is 2'):
+            self.client.get('/over/')
+        with self.assertRaisesMessage(QueryBudgetExceeded, 'possible N+1, 8 x SELECT'):
+            self.client.get('/n-plus-one/')
+
+    def test_log_mode_and_undeclared_views_only_warn(self):
+        with self.settings(QUERY_BUDGET_MODE='log'):
+            with self.assertLogs('core_apps.common.query_budget', 'WARNING') as logs:
+                self.assertEqual(self.client.get('/over/').status_code, 200)
+            self.assertIn('/over/', logs.output[0])
+        with self.assertLogs('core_apps.common.query_budget', 'WARNING') as logs:
+            self.assertEqual(self.client.get('/undeclared/').status_code, 200)
+        self.assertIn('possible N+1', logs.output[0])
+
+    def test_registry_and_off_mode(self):
+        with self.settings(QUERY_BUDGETS={'registered': 2}):
+            with self.assertRaises(QueryBudgetExceeded):
+                self.client.get('/registered/')
+            with self.settings(QUERY_BUDGET_MODE='off'):
+                self.assertEqual(self.client.get('/registered/').status_code, 200)
+
+    def test_counting_is_off_outside_local_settings(self):
+        script = 'from config.settings import base, local; print(base.QUERY_BUDGET_MODE, local.QUERY_BUDGET_MODE)'
+        env = {key: value for key, value in os.environ.items() if key != 'QUERY_BUDGET_MODE'}
+        output = subprocess.run([sys.executable, '-c', script], env=env, check=True,
+                                capture_output=True, text=True).stdout
+        self.assertEqual(output.split(), ['off', 'log'])
+
+    def test_query_shape_ignores_parameters(self):
+        self.assertEqual(
+            query_shape('SELECT  * FROM t\n WHERE id IN (%s, %s, %s)'),
+            query_shape('SELECT * FROM t WHERE id IN (%s)'),
+        )
+
+
+class EndpointBudgetTests(TestCase):
+    """The real views stay inside their budgets on a seeded database"""
+
+    def setUp(self):
+        cache.clear()
+        call_command('seed_data', '--users', '15', '--posts', '40', '--comments', '300', '--likes', '200',
+                     stdout=StringIO())
+        self.post = Post.objects.order_by('-comment_count').first()
+        self.user = User.objects.filter(post__isnull=False).first()
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'pass12345')
+
+    def test_main_pages(self):
+        urls = [
+            reverse('posts:home'),
+            reverse('posts:post_detail', args=[self.post.pk]),
+            reverse('posts:post_list_api'),
+            reverse('posts:post_detail_api', args=[self.post.pk]),
+            reverse('posts:search_posts') + '?q=the',
+            reverse('comments:comment_list_api', args=[self.post.pk]),
+            reverse('comments:load_comments_page', args=[self.post.pk]) + '?page=2',
+            reverse('accounts:user_profile', args=[self.user.username]),
+        ]
+        for user in (None, self.user):
+            if user:
+                self.client.force_login(user)
+            for url in urls:
+                self.assertIn(self.client.get(url).status_code, (200, 302), url)
+        self.assertEqual(self.client.post(reverse('posts:toggle_like', args=[self.post.pk])).status_code, 200)
+
+    def test_admin_changelists(self):
+        self.client.force_login(self.admin)
+        for url in ('/admin/posts/post/', '/admin/comments/comment/'):
+            self.assertEqual(self.client.get(url).status_code, 200)
+
+
+class MetricsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        author = User.objects.create_user('author', password='pass12345')
+        Post.objects.create(title='Hello', content='Body', author=author)
+
+    def sample(self, name, **labels):
+        return REGISTRY.get_sample_value(name, labels) or 0
+
+    def test_request_db_template_and_cache_metrics(self):
+        home = {'view': 'posts:home', 'method': 'GET'}
+        before = {
+            'requests': self.sample('blogapp_http_request_duration_seconds_count', **home),
+            'ok': self.sample('blogapp_http_requests_total', status='200', **home),
+            'queries': self.sample('blogapp_db_queries_per_request_sum', view='posts:home'),
+            'template': self.sample('blogapp_template_render_duration_seconds_count', template='user/home.html'),
+            'hits': self.sample('blogapp_cache_requests_total', cache='default', result='hit'),
+            'misses': self.sample('blogapp_cache_requests_total', cache='default', result='miss'),
+            'unresolved': self.sample('blogapp_http_requests_total', view='<unresolved>', method='GET', status='404'),
+        }
+        self.client.get('/')
+        self.client.get('/')
+        self.client.get('/no/such/page/')
+
+        self.assertEqual(self.sample('blogapp_http_request_duration_seconds_count', **home), before['requests'] + 2)
+        self.assertEqual(self.sample('blogapp_http_requests_total', status='200', **home), before['ok'] + 2)
+        self.assertGreater(self.sample('blogapp_db_queries_per_request_sum', view='posts:home'), before['queries'])
+        self.assertEqual(
+            self.sample('blogapp_template_render_duration_seconds_count', template='user/home.html'),
+            before['template'] + 2,
+        )
+        # The first anonymous home page misses the feed cache, the second hits it.
+        self.assertGreater(self.sample('blogapp_cache_requests_total', cache='default', result='miss'), before['misses'])
+        self.assertGreater(self.sample('blogapp_cache_requests_total', cache='default', result='hit'), before['hits'])
+        self.assertEqual(
+            self.sample('blogapp_http_requests_total', view='<unresolved>', method='GET', status='404'),
+            before['unresolved'] + 1,
+        )
+
+    def test_metrics_endpoint(self):
+        self.client.get('/')
+        with self.settings(METRICS_TOKEN='s3cret'):
+            self.assertEqual(self.client.get('/metrics').status_code, 403)
+            response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer s3cret')
+            self.assertEqual(response.status_code, 200)
+        self.assertIn(b'blogapp_http_request_duration_seconds_bucket{le="0.005",method="GET",view="posts:home"}',
+                      response.content)
+
+    def test_metrics_endpoint_is_hidden_without_a_token(self):
+        with self.settings(METRICS_TOKEN=None):
+            self.assertEqual(self.client.get('/metrics').status_code, 404)
+            with self.settings(DEBUG=True):
+                self.assertEqual(self.client.get('/metrics').status_code, 200)
+
+    def test_multiprocess_mode_aggregates_workers(self):
+        script = (
+            "import django, os\n"
+            "django.setup()\n"
+            "from core_apps.common.metrics import REQUESTS\n"
+            "REQUESTS.labels('posts:home', 'GET', '200').inc()\n"
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            env = {**os.environ, 'PROMETHEUS_MULTIPROC_DIR': directory, 'METRICS_TOKEN': 's3cret'}
+            for _ in range(2):
+                subprocess.run([sys.executable, '-c', script], env=env, check=True)
+            reader = (
+                "import django\n"
+                "django.setup()\n"
+                "from django.test import RequestFactory\n"
+                "from core_apps.common.metrics import metrics_view\n"
+                "request = RequestFactory().get('/metrics', HTTP_AUTHORIZATION='Bearer s3cret')\n"
+                "print(metrics_view(request).content.decode())\n"
+            )
+            output = subprocess.run([sys.executable, '-c', reader], env=env, check=True,
+                                    capture_output=True, text=True).stdout
+        self.assertIn('blogapp_http_requests_total{method="GET",status="200",view="posts:home"} 2.0', output)
+
+
+class ProfilingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        overrides = self.settings(PROFILING_DIR=self.tmp.name, PROFILING_MAX_PROFILES=2)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        author = User.objects.create_user('author', password='pass12345')
+        Post.objects.create(title='Hello', content='Body', author=author)
+
+    def test_unsampled_requests_write_nothing(self):
+        self.client.get('/')
+        self.client.get('/', HTTP_X_PROFILE='forged:token')
+        self.assertEqual(os.listdir(self.tmp.name), [])
+
+    def test_sampled_requests_fill_a_bounded_ring_buffer(self):
+        with self.settings(PROFILING_SAMPLE_RATE=1.0):
+            for _ in range(3):
+                self.client.get('/api/posts/')
+        self.assertEqual(len(os.listdir(self.tmp.name)), 4)
+        profiles = list_profiles()
+        self.assertEqual(len(profiles), 2)
+        self.assertEqual(profiles[0]['view'], 'posts:post_list_api')
+        self.assertEqual(profiles[0]['reason'], 'sampled')
+        self.assertIn('posts_post', profiles[0]['sql'][-1]['sql'])
+
+    def test_signed_header_and_admin_views(self):
+        self.client.get('/api/posts/', **{f'HTTP_{PROFILE_HEADER.upper().replace("-", "_")}': make_profile_token()})
+        [profile] = list_profiles()
+        self.assertEqual(profile['reason'], 'header')
+
+        list_url = reverse('common:profile_list')
+        staff = User.objects.create_user('staff', password='pass12345', is_staff=True)
+        self.client.force_login(staff)
+        self.assertEqual(self.client.get(list_url).status_code, 302)
+
+        self.client.force_login(User.objects.create_superuser('root', 'root@example.com', 'pass12345'))
+        response = self.client.get(list_url)
+        self.assertContains(response, profile['stem'])
+        download = self.client.get(reverse('common:profile_download', args=[profile['stem'] + '.prof']))
+        self.assertEqual(download.status_code, 200)
+        self.assertIn('attachment', download['Content-Disposition'])
+        report = self.client.get(reverse('common:profile_report', args=[profile['stem']]))
+        self.assertContains(report, 'cumulative')
+        self.assertEqual(self.client.get(reverse('common:profile_download', args=['..settings.py'])).status_code, 404)
+
+
+class StaticPipelineTests(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        # Only the project's own files: compressing every app's assets is slow.
+        overrides = self.settings(STATIC_ROOT=self.tmp.name, STATICFILES_FINDERS=[
+            'django.contrib.staticfiles.finders.FileSystemFinder',
+        ], STORAGES={
+            'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+            'staticfiles': {'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage'},
+        })
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        call_command('collectstatic', interactive=False, verbosity=0)
+
+    def test_pages_link_hashed_precompressed_immutable_files(self):
+        page = self.client.get('/').content.decode()
+        url = re.search(r'/static/css/custom\.[0-9a-f]{12}\.css', page).group()
+        self.assertTrue(os.path.exists(os.path.join(self.tmp.name, url.removeprefix('/static/') + '.br')))
+
+        response = self.client.get(url, headers={'Accept-Encoding': 'gzip, br'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertIn('immutable', response['Cache-Control'])
+        response.close()
+
+        response = self.client.get('/static/css/custom.css', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Cache-Control'], 'max-age=3600, public')
+        response.close()
+
+
+class DatabaseSettingsTests(TestCase):
+    env = {'POSTGRES_DB': 'blog', 'POSTGRES_USER': 'blog', 'POSTGRES_HOST': 'db'}
+
+    def test_pooled_by_default(self):
+        database = postgres_database({**self.env, 'DJANGO_DB_POOL_MAX_SIZE': '20'})
+        self.assertEqual(database['ENGINE'], 'django.db.backends.postgresql')
+        self.assertEqual(database['CONN_MAX_AGE'], 0)
+        self.assertTrue(database['CONN_HEALTH_CHECKS'])
+        self.assertEqual(database['OPTIONS']['pool'], {
+            'min_size': 2, 'max_size': 20, 'timeout': 10.0, 'max_idle': 300.0, 'max_lifetime': 1800.0,
+        })
+
+    def test_persistent_connections_without_pool(self):
+        database = postgres_database({**self.env, 'DJANGO_DB_POOL': 'off', 'DJANGO_DB_CONN_MAX_AGE': '120'})
+        self.assertNotIn('pool', database['OPTIONS'])
+        self.assertEqual(database['CONN_MAX_AGE'], 120)
+        self.assertIsNone(postgres_database({}))
+
+    def test_production_settings_read_the_environment(self):
+        script = (
+            'import json; from config.settings import production as s; '
+            'print(json.dumps(s.DATABASES["default"], default=str))'
+        )
+        env = {**os.environ, **self.env, 'DJANGO_DB_POOL_MIN_SIZE': '4'}
+        output = subprocess.run([sys.executable, '-c', script], env=env, check=True,
+                                capture_output=True, text=True).stdout
+        self.assertIn('"min_size": 4', output)
+        self.assertIn('"HOST": "db"', output)
+
+
+class ConnectionReuseTests(TransactionTestCase):
+    # Requests go through the WSGI handler, which closes or releases the
+    # connection at the end of each request, as in production.
+
+    def test_requests_reuse_one_connection(self):
+        url = reverse('posts:post_list_api')
+        opened = []
+
+        def receiver(sender, connection, **kwargs):
+            opened.append(connection.connection)
+
+        connection_created.connect(receiver)
+        self.addCleanup(connection_created.disconnect, receiver)
+        # Only the PostgreSQL backend pools; elsewhere use persistent connections.
+        pool = getattr(connection, 'pool', None)
+        persistent = {} if pool else {'CONN_MAX_AGE': 60, 'CONN_HEALTH_CHECKS': True}
+        with mock.patch.dict(connection.settings_dict, persistent):
+            connection.close()
+            application = get_wsgi_application()
+            for _ in range(5):
+                self.assertEqual(wsgi_get(application, url), 200)
+        connection.close()
+
+        # Pooled connections are checked out (and "created") per request,
+        # but come from the pool's few open ones.
+        distinct = {id(raw) for raw in opened}
+        self.assertGreaterEqual(len(opened), 1)
+        self.assertLessEqual(len(distinct), pool.min_size if pool else 1)
+
+
+@skipUnless(connection.vendor == 'sqlite', 'SQLite only')
+class SQLitePragmaTests(TestCase):
+    def pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_connections_are_configured(self):
+        self.assertEqual(self.pragma('journal_mode'), 'wal')
+        self.assertEqual(self.pragma('synchronous'), 1)  # NORMAL
+        self.assertEqual(self.pragma('busy_timeout'), settings.SQLITE_PRAGMAS['busy_timeout'])
+        self.assertEqual(self.pragma('cache_size'), settings.SQLITE_PRAGMAS['cache_size'])
+        self.assertEqual(connection.transaction_mode, 'IMMEDIATE')
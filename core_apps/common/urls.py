@@ -0,0 +1,10 @@
+from django.urls import path
+from . import views
+
+app_name = 'common'
+
+urlpatterns = [
+    path('', views.profile_list, name='profile_list'),
+    path('<str:name>/report/', views.profile_report, name='profile_report'),
+    path('<str:name>', views.profile_download, name='profile_download'),
+]
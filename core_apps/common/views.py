@@ -0,0 +1,44 @@
+from django.contrib import admin
+from django.contrib.auth.decorators import user_passes_test
+from django.http import FileResponse, Http404, HttpResponse
+from django.shortcuts import render
+
+from .profiling import (
+    PROFILE_HEADER, PROFILE_NAME_RE, list_profiles, make_profile_token, profile_dir, profile_text,
+)
+
+# Profiles hold SQL parameters and request paths, so only superusers see them.
+superuser_required = user_passes_test(lambda user: user.is_active and user.is_superuser, login_url='admin:login')
+
+
+def stored_profile(name):
+    if not PROFILE_NAME_RE.match(name):
+        raise Http404
+    path = profile_dir() / name
+    if not path.is_file():
+        raise Http404
+    return path
+
+
+@superuser_required
+def profile_list(request):
+    context = {
+        **admin.site.each_context(request),
+        'title': 'Request profiles',
+        'profiles': list_profiles(),
+        'profile_header': PROFILE_HEADER,
+        'profile_token': make_profile_token(),
+    }
+    return render(request, 'admin/profiles.html', context)
+
+
+@superuser_required
+def profile_download(request, name):
+    return FileResponse(stored_profile(name).open('rb'), as_attachment=True, filename=name)
+
+
+@superuser_required
+def profile_report(request, name):
+    stored_profile(f'{name}.prof')
+    return HttpResponse(profile_text(name), content_type='text/plain; charset=utf-8')
+
@@ -33,15 +33,17 @@ class PostAdmin(admin.ModelAdmin):
     view_post.short_description = 'View Post'
 
     def total_likes(self, obj):
-        return obj.likes.count()
+        return obj.like_count
     total_likes.short_description = 'Likes'
+    total_likes.admin_order_field = 'like_count'
 
     def total_comments(self, obj):
-        return obj.comments.count()
+        return obj.comment_count
     total_comments.short_description = 'Comments'
+    total_comments.admin_order_field = 'comment_count'
 
     def get_queryset(self, request):
-        return super().get_queryset(request).select_related('author').prefetch_related('likes', 'comments')
+        return super().get_queryset(request).select_related('author')
 
 # Customize admin site
 admin.site.site_header = "BlogApp Administration"
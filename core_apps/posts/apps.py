@@ -5,3 +5,6 @@ class PostsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "core_apps.posts"
     verbose_name = _("Posts")
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,135 @@
+"""
+Async variants of the read views in views.py, served under ASGI.
+
+config/asgi_urls.py swaps them in for their sync twins, which keep serving
+WSGI. Data is read through the async ORM and the async cache API, so a
+request waiting on the database does not hold a worker thread. Django's
+template engine has no async API: full pages, whose context processors
+may touch the session, are rendered through sync_to_async.
+
+Writes, and the page-number/search modes of the posts API (DRF has no
+async views), are handed to the sync view.
+"""
+from asgiref.sync import sync_to_async
+from django.http import Http404, JsonResponse
+from django.shortcuts import render
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.exceptions import NotFound
+
+from core_apps.common.query_budget import query_budget
+from .conditional import apost_conditional
+from .feed_cache import aget_cached_feed, aset_cached_feed
+from .likes import aliked_ids_among
+from .models import Post
+from .pagination import PostFeedPagination, aget_feed_page, page_number_limit
+from .search import full_text_search
+from .serializers import PostListValuesSerializer
+from .views import PostListCreateView
+
+post_list_create_view = PostListCreateView.as_view()
+
+
+@query_budget(6)
+async def home(request):
+    """Home page with post listing"""
+    search_query = request.GET.get('search', '')
+
+    cacheable = not request.user.is_authenticated
+    feed = None
+    if cacheable:
+        cache_key, feed = await aget_cached_feed(request.GET)
+
+    if feed is None:
+        posts = Post.objects.select_related('author__userprofile').defer('content').order_by('-created_at')
+        if search_query:
+            posts = full_text_search(posts, search_query)
+        page_obj = await aget_feed_page(posts, request.GET, ranked=bool(search_query))
+
+        feed_context = {
+            'posts': page_obj,
+            'search_query': search_query,
+            'is_paginated': page_obj.has_other_pages(),
+            'max_page_number': page_number_limit(ranked=bool(search_query)),
+            'liked_post_ids': await aliked_ids_among(request.user, [post.pk for post in page_obj]),
+        }
+        html = await sync_to_async(render_to_string)('blog/components/feed.html', feed_context, request=request)
+        feed = {
+            'html': html,
+            'post_count': page_obj.paginator.count if hasattr(page_obj, 'paginator') else None,
+        }
+        if cacheable:
+            await aset_cached_feed(cache_key, feed)
+
+    context = {
+        'feed_html': mark_safe(feed['html']),
+        'post_count': feed['post_count'],
+        'search_query': search_query,
+    }
+    return await sync_to_async(render)(request, 'user/home.html', context)
+
+
+@query_budget(8)
+@apost_conditional
+async def post_detail(request, pk):
+    """Post detail page"""
+    try:
+        post = await Post.objects.select_related('author__userprofile').aget(pk=pk)
+    except Post.DoesNotExist:
+        raise Http404('No Post matches the given query.')
+    comments = [comment async for comment in post.comments.select_related('author__userprofile').order_by('created_at')]
+    is_liked = False
+    if request.user.is_authenticated:
+        is_liked = await post.likes.filter(id=request.user.id).aexists()
+
+    context = {
+        'post': post,
+        'comments': comments,
+        'total_likes': post.total_likes(),
+        'total_comments': post.total_comments(),
+        'is_liked': is_liked,
+    }
+    return await sync_to_async(render)(request, 'blog/post_details.html', context)
+
+
+async def _values_page(serializer, rows):
+    """Render values() rows, resolving is_liked with one async query"""
+    if 'is_liked' in serializer.field_names:
+        request = serializer.context['request']
+        serializer.context['liked_post_ids'] = await aliked_ids_among(
+            request.user, [row['id'] for row in rows]
+        )
+    return serializer.to_representation(rows)
+
+
+@query_budget(10)
+@csrf_exempt
+async def post_list_api(request):
+    """GET of PostListCreateView in cursor mode; everything else goes to the sync view"""
+    pagination = PostFeedPagination()
+    if request.method not in ('GET', 'HEAD') or pagination.uses_page_numbers(request.GET):
+        return await sync_to_async(post_list_create_view)(request)
+
+    serializer = PostListValuesSerializer(context={'request': request})
+    queryset = serializer.values(Post.objects.select_related('author').defer('content').order_by('-created_at'))
+    try:
+        rows = await pagination.apaginate_queryset(queryset, request)
+    except NotFound as exc:
+        return JsonResponse({'detail': str(exc.detail)}, status=exc.status_code)
+    return JsonResponse(pagination.get_paginated_data(await _values_page(serializer, rows)))
+
+
+@query_budget(6)
+async def search_posts(request):
+    """Search posts API endpoint"""
+    if request.method not in ('GET', 'HEAD'):
+        return JsonResponse({'detail': f'Method "{request.method}" not allowed.'}, status=405)
+    query = request.GET.get('q', '').strip()
+    if not query:
+        return JsonResponse({'results': []})
+
+    serializer = PostListValuesSerializer(context={'request': request})
+    posts = serializer.values(full_text_search(Post.objects.all(), query))[:10]
+    rows = [row async for row in posts]
+    return JsonResponse({'results': await _values_page(serializer, rows)})
@@ -0,0 +1,94 @@
+"""
+Conditional GET support for the post detail page and API.
+
+The validators come from a single indexed lookup: the post's updated_at,
+its stored like/comment counters, the newest comment edit, the author's
+name and profile (the page shows their avatar) and, for signed in users,
+whether they like the post (the page renders that state). When
+a client's If-None-Match / If-Modified-Since still matches, Django's
+`condition` decorator answers 304 before comments are loaded or anything
+is rendered.
+
+Like changes do not move updated_at, so the ETag is the validator that
+tracks them; Django ignores If-Modified-Since whenever If-None-Match is sent.
+"""
+import hashlib
+from functools import wraps
+
+from django.db.models import Exists, F, OuterRef, Subquery, Value
+from django.views.decorators.http import condition
+
+from core_apps.comments.models import Comment
+from .models import Post
+
+
+def _post_state_queryset(user, pk):
+    latest_comment = (
+        Comment.objects.filter(post_id=OuterRef('pk'))
+        .order_by('-updated_at')
+        .values('updated_at')[:1]
+    )
+    liked = (
+        Exists(Post.likes.through.objects.filter(post_id=OuterRef('pk'), user_id=user.pk))
+        if user.is_authenticated else Value(False)
+    )
+    return (
+        Post.objects.filter(pk=pk)
+        .annotate(
+            latest_comment_at=Subquery(latest_comment),
+            liked=liked,
+            author_profile_at=F('author__userprofile__updated_at'),
+        )
+        .values(
+            'updated_at', 'like_count', 'comment_count', 'latest_comment_at', 'liked',
+            'author__first_name', 'author__last_name', 'author_profile_at',
+        )
+    )
+
+
+def _post_state(request, pk):
+    # etag_func and last_modified_func are called separately; share one query.
+    cache = request.__dict__.setdefault('_post_state', {})
+    if pk not in cache:
+        cache[pk] = _post_state_queryset(request.user, pk).first()
+    return cache[pk]
+
+
+def post_etag(request, pk, *args, **kwargs):
+    state = _post_state(request, pk)
+    if state is None:
+        return None
+    latest = state['latest_comment_at'].isoformat() if state['latest_comment_at'] else ''
+    profile = state['author_profile_at'].isoformat() if state['author_profile_at'] else ''
+    raw = (
+        f"{pk}:{state['updated_at'].isoformat()}:{latest}:{state['like_count']}:"
+        f"{state['comment_count']}:{request.user.pk or 0}:{int(bool(state['liked']))}:"
+        f"{profile}:{state['author__first_name']}:{state['author__last_name']}"
+    )
+    return hashlib.md5(raw.encode(), usedforsecurity=False).hexdigest()
+
+
+def post_last_modified(request, pk, *args, **kwargs):
+    state = _post_state(request, pk)
+    if state is None:
+        return None
+    return max(filter(None, (state['updated_at'], state['latest_comment_at'], state['author_profile_at'])))
+
+
+post_conditional = condition(etag_func=post_etag, last_modified_func=post_last_modified)
+
+
+def apost_conditional(view):
+    """
+    post_conditional for async views. `condition` calls the validators
+    synchronously, so their query is run through the async ORM beforehand.
+    """
+    conditional_view = post_conditional(view)
+
+    @wraps(view)
+    async def wrapper(request, pk, *args, **kwargs):
+        cache = request.__dict__.setdefault('_post_state', {})
+        if pk not in cache:
+            cache[pk] = await _post_state_queryset(request.user, pk).afirst()
+        return await conditional_view(request, pk, *args, **kwargs)
+    return wrapper
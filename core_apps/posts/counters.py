@@ -0,0 +1,38 @@
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Post
+
+
+def adjust_counter(post_ids, field, delta):
+    """Atomically add `delta` to a counter column of the given posts"""
+    if not post_ids or not delta:
+        return 0
+    return Post.objects.filter(pk__in=post_ids).update(
+        **{field: Greatest(F(field) + delta, Value(0))}
+    )
+
+
+def _count_subquery(model, fk_field):
+    """Correlated COUNT(*) over `model` rows pointing at the outer post"""
+    rows = (
+        model.objects.filter(**{fk_field: OuterRef('pk')})
+        .order_by()
+        .values(fk_field)
+        .annotate(n=Count('*'))
+        .values('n')
+    )
+    return Coalesce(Subquery(rows, output_field=IntegerField()), Value(0))
+
+
+def actual_counts():
+    """
+    Annotations with the real like and comment totals. Each total is its own
+    correlated subquery, so the two relations are never joined together.
+    """
+    from core_apps.comments.models import Comment
+
+    return {
+        'actual_like_count': _count_subquery(Post.likes.through, 'post_id'),
+        'actual_comment_count': _count_subquery(Comment, 'post_id'),
+    }
@@ -0,0 +1,15 @@
+EXCERPT_WORDS = 30
+
+
+def summarize(content):
+    """
+    Return (excerpt, word_count) for a post body.
+
+    The excerpt is the first EXCERPT_WORDS words followed by '...', or the
+    body unchanged when it is already that short. It matches what the list
+    API used to compute from the full content on every request.
+    """
+    words = content.split()
+    if len(words) > EXCERPT_WORDS:
+        return ' '.join(words[:EXCERPT_WORDS]) + '...', len(words)
+    return content, len(words)
@@ -0,0 +1,88 @@
+"""
+Versioned cache for the rendered home feed.
+
+Anonymous visitors all see the same feed, so the rendered posts list for a
+given page/cursor/search is stored under a key that embeds a global "feed
+version". Any write that can change a feed page (posts, comments, likes,
+author names) bumps the version after commit, which orphans every cached
+page at once instead of hunting for the affected keys.
+"""
+import hashlib
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+FEED_VERSION_KEY = 'posts:feed-version'
+FEED_PAGE_TIMEOUT = 300
+
+# Only these query parameters change what the feed shows.
+FEED_PARAMS = ('page', 'cursor', 'search')
+
+
+def _fresh_version():
+    # Clock based, so a version key lost to eviction never comes back with a
+    # number that older cached pages were stored under.
+    return time.time_ns()
+
+
+def feed_version():
+    version = cache.get(FEED_VERSION_KEY)
+    if version is None:
+        cache.add(FEED_VERSION_KEY, _fresh_version(), timeout=None)
+        version = cache.get(FEED_VERSION_KEY)
+    return version
+
+
+async def afeed_version():
+    version = await cache.aget(FEED_VERSION_KEY)
+    if version is None:
+        await cache.aadd(FEED_VERSION_KEY, _fresh_version(), timeout=None)
+        version = await cache.aget(FEED_VERSION_KEY)
+    return version
+
+
+def _bump():
+    try:
+        cache.incr(FEED_VERSION_KEY)
+    except ValueError:
+        cache.set(FEED_VERSION_KEY, _fresh_version(), timeout=None)
+
+
+def bump_feed_version():
+    """Invalidate every cached feed page once the current transaction commits"""
+    transaction.on_commit(_bump)
+
+
+def _params_digest(params):
+    parts = '&'.join(f'{name}={params.get(name, "")}' for name in FEED_PARAMS)
+    return hashlib.md5(parts.encode(), usedforsecurity=False).hexdigest()
+
+
+def feed_page_key(params):
+    return f'posts:feed:{feed_version()}:{_params_digest(params)}'
+
+
+def get_cached_feed(params):
+    """
+    Return (key, feed) for the request parameters; feed is None on a miss.
+
+    Store a freshly rendered feed under the returned key, not a recomputed
+    one: the key pins the version read before the database was queried.
+    """
+    key = feed_page_key(params)
+    return key, cache.get(key)
+
+
+def set_cached_feed(key, feed):
+    cache.set(key, feed, FEED_PAGE_TIMEOUT)
+
+
+async def aget_cached_feed(params):
+    """get_cached_feed for async views"""
+    key = f'posts:feed:{await afeed_version()}:{_params_digest(params)}'
+    return key, await cache.aget(key)
+
+
+async def aset_cached_feed(key, feed):
+    await cache.aset(key, feed, FEED_PAGE_TIMEOUT)
@@ -0,0 +1,45 @@
+"""
+Sparse fieldsets for the read API.
+
+`?fields=id,title` keeps only the listed keys of each serialized object and
+`?exclude=content,comments` drops keys. Fields that are not rendered are not
+computed either, so excluding `comments` from the post detail also skips
+the comment query. Unknown names are ignored. Write requests always use the
+full field set.
+"""
+FIELDS_PARAM = 'fields'
+EXCLUDE_PARAM = 'exclude'
+
+
+def _names(value):
+    return {name.strip() for name in value.split(',') if name.strip()}
+
+
+def sparse_field_names(context, available):
+    """The subset of `available` (in its order) that the request asks for"""
+    request = context.get('request')
+    if request is None or not context.get('sparse_fieldsets', True):
+        return list(available)
+    if request.method not in ('GET', 'HEAD'):
+        return list(available)
+
+    params = getattr(request, 'query_params', request.GET)
+    names = list(available)
+    if params.get(FIELDS_PARAM):
+        wanted = _names(params[FIELDS_PARAM])
+        names = [name for name in names if name in wanted]
+    if params.get(EXCLUDE_PARAM):
+        unwanted = _names(params[EXCLUDE_PARAM])
+        names = [name for name in names if name not in unwanted]
+    return names
+
+
+class SparseFieldsetMixin:
+    """Serializer mixin that applies ?fields= / ?exclude= to the top level fields"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        keep = set(sparse_field_names(self.context, self.fields))
+        for name in list(self.fields):
+            if name not in keep:
+                self.fields.pop(name)
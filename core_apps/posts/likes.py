@@ -0,0 +1,115 @@
+from django.db import connection, transaction
+
+from core_apps.accounts.stats import credit_likes
+from .feed_cache import bump_feed_version
+from .models import Post
+
+PostLike = Post.likes.through
+
+
+def liked_post_ids(user, posts):
+    """
+    Ids of the given posts that `user` has liked, in a single query.
+
+    Lets list pages and serializers resolve "liked by me" once per page
+    instead of running an EXISTS per post.
+    """
+    return liked_ids_among(user, [post.pk for post in posts])
+
+
+def liked_ids_among(user, post_ids):
+    """Same as liked_post_ids, for callers that only hold post ids"""
+    if user is None or not user.is_authenticated:
+        return set()
+    if not post_ids:
+        return set()
+    return set(
+        PostLike.objects.filter(user_id=user.pk, post_id__in=post_ids).values_list('post_id', flat=True)
+    )
+
+
+async def aliked_ids_among(user, post_ids):
+    """liked_ids_among for async views"""
+    if user is None or not user.is_authenticated or not post_ids:
+        return set()
+    likes = PostLike.objects.filter(user_id=user.pk, post_id__in=post_ids).values_list('post_id', flat=True)
+    return {post_id async for post_id in likes}
+
+
+def _bump_like_count(cursor, post_id, delta):
+    """Apply `delta` to the stored counter and return the new value, or None if the post is gone"""
+    cursor.execute(
+        'UPDATE posts_post SET like_count = like_count + %s WHERE id = %s RETURNING like_count',
+        [delta, post_id],
+    )
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def _insert_like(cursor, post_id, user_id):
+    table = PostLike._meta.db_table
+    cursor.execute(
+        f'INSERT INTO {table} (post_id, user_id) '
+        f'SELECT %s, %s WHERE EXISTS (SELECT 1 FROM posts_post WHERE id = %s) '
+        f'ON CONFLICT (post_id, user_id) DO NOTHING',
+        [post_id, user_id, post_id],
+    )
+    changed = cursor.rowcount == 1
+    like_count = _bump_like_count(cursor, post_id, 1 if changed else 0)
+    if changed:
+        credit_likes({post_id: 1})
+    return changed, like_count
+
+
+def _delete_like(cursor, post_id, user_id):
+    table = PostLike._meta.db_table
+    cursor.execute(f'DELETE FROM {table} WHERE post_id = %s AND user_id = %s', [post_id, user_id])
+    changed = cursor.rowcount == 1
+    like_count = _bump_like_count(cursor, post_id, -1 if changed else 0)
+    if changed:
+        credit_likes({post_id: -1})
+    return changed, like_count
+
+
+def _finish(post_id, changed, like_count):
+    if like_count is None:
+        raise Post.DoesNotExist(f'Post {post_id} does not exist')
+    if changed:
+        bump_feed_version()
+
+
+def like_post(post_id, user_id):
+    """
+    Idempotently record a like. Returns (changed, like_count).
+
+    The like row is written with a single insert-or-ignore statement, so
+    repeated or concurrent requests from the same user can never double
+    count, and the counter moves only when a row was really inserted.
+    Uses ON CONFLICT and RETURNING, which SQLite and PostgreSQL support.
+    Raises Post.DoesNotExist for unknown posts.
+    """
+    with transaction.atomic(), connection.cursor() as cursor:
+        changed, like_count = _insert_like(cursor, post_id, user_id)
+    _finish(post_id, changed, like_count)
+    return changed, like_count
+
+
+def unlike_post(post_id, user_id):
+    """Idempotently remove a like. Returns (changed, like_count)."""
+    with transaction.atomic(), connection.cursor() as cursor:
+        changed, like_count = _delete_like(cursor, post_id, user_id)
+    _finish(post_id, changed, like_count)
+    return changed, like_count
+
+
+def toggle_like(post_id, user_id):
+    """
+    Remove the like if there is one, otherwise record it, in one
+    transaction. Returns (liked, like_count).
+    """
+    with transaction.atomic(), connection.cursor() as cursor:
+        unliked, like_count = _delete_like(cursor, post_id, user_id)
+        if not unliked:
+            _, like_count = _insert_like(cursor, post_id, user_id)
+    _finish(post_id, True, like_count)
+    return not unliked, like_count
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core_apps.posts.excerpts import summarize
+from core_apps.posts.models import Post
+
+
+class Command(BaseCommand):
+    help = "Fill Post.excerpt and Post.word_count for rows written without Post.save()"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Number of posts updated per batch (default: 1000)')
+        parser.add_argument('--all', action='store_true',
+                            help='Recompute every post, not only the ones with an empty excerpt')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        posts = Post.objects.all() if options['all'] else Post.objects.filter(excerpt='')
+        updated = 0
+        last_pk = 0
+
+        while True:
+            batch = list(
+                posts.filter(pk__gt=last_pk).order_by('pk').only('pk', 'content')[:batch_size]
+            )
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+            for post in batch:
+                post.excerpt, post.word_count = summarize(post.content)
+            with transaction.atomic():
+                Post.objects.bulk_update(batch, ['excerpt', 'word_count'])
+            updated += len(batch)
+            if options['verbosity'] > 1:
+                self.stdout.write(f"Updated {updated} posts (up to id {last_pk})")
+
+        self.stdout.write(self.style.SUCCESS(f"Updated excerpts for {updated} posts."))
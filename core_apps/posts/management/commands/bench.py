@@ -0,0 +1,204 @@
+import json
+import platform
+import statistics
+import time
+import tracemalloc
+from collections import Counter
+from urllib.parse import urlencode
+
+import django
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, reset_queries
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core_apps.posts.models import Post
+
+# Latency changes smaller than this are treated as noise when comparing
+# against a baseline, however large they are relative to the baseline.
+NOISE_FLOOR_MS = 1.0
+
+
+def percentiles(samples):
+    """p50/p95/p99 of the samples, interpolating between the closest ranks"""
+    if len(samples) == 1:
+        return samples * 3
+    cuts = statistics.quantiles(samples, n=100, method='inclusive')
+    return cuts[49], cuts[94], cuts[98]
+
+
+class Scenario:
+    def __init__(self, name, url, method='get', auth_only=False, toggles=False):
+        self.name = name
+        self.url = url
+        self.method = method
+        self.auth_only = auth_only
+        # Each request flips state, so the run is padded to an even count.
+        self.toggles = toggles
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the main HTML and API endpoints in-process against the current (seeded) "
+        "database. Reports p50/p95/p99 latency, queries and peak allocated memory per "
+        "request, and compares against a stored JSON baseline."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=50,
+                            help='Timed requests per scenario (default: 50)')
+        parser.add_argument('--warmup', type=int, default=5,
+                            help='Untimed requests per scenario before timing (default: 5)')
+        parser.add_argument('--only', action='append', default=[],
+                            help='Run only scenarios whose name contains this text (repeatable)')
+        parser.add_argument('--username',
+                            help='User for the authenticated runs (default: the most active author)')
+        parser.add_argument('--query', help='Search query (default: a word from a popular title)')
+        parser.add_argument('--output', help='Write the results to this JSON file')
+        parser.add_argument('--baseline', help='Compare against a JSON file written by --output')
+        parser.add_argument('--threshold', type=float, default=0.2,
+                            help='Relative p95 slowdown flagged as a regression (default: 0.2)')
+        parser.add_argument('--fail-on-regression', action='store_true',
+                            help='Exit with an error when the baseline comparison finds regressions')
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1:
+            raise CommandError('--iterations must be positive')
+        post = Post.objects.order_by('-comment_count', '-like_count', 'pk').first()
+        if post is None:
+            raise CommandError('No posts to benchmark; run seed_data first')
+        user = self.get_user(options['username'])
+        query = options['query'] or max(post.title.split(), key=len)
+
+        scenarios = [
+            Scenario('home', reverse('posts:home')),
+            Scenario('post_detail', reverse('posts:post_detail', args=[post.pk])),
+            Scenario('api_post_list', reverse('posts:post_list_api')),
+            Scenario('api_post_detail', reverse('posts:post_detail_api', args=[post.pk])),
+            Scenario('search_posts', f"{reverse('posts:search_posts')}?{urlencode({'q': query})}"),
+            Scenario('toggle_like', reverse('posts:toggle_like', args=[post.pk]),
+                     method='post', auth_only=True, toggles=True),
+            Scenario('load_comments_page', f"{reverse('comments:load_comments_page', args=[post.pk])}?page=2"),
+            Scenario('profile_view', reverse('accounts:user_profile', args=[user.username]), auth_only=True),
+        ]
+        if options['only']:
+            scenarios = [s for s in scenarios if any(text in s.name for text in options['only'])]
+
+        anonymous, signed_in = Client(), Client()
+        signed_in.force_login(user)
+        results = {}
+        with override_settings(ALLOWED_HOSTS=['testserver', *settings.ALLOWED_HOSTS]):
+            for scenario in scenarios:
+                for audience, client in (('anon', anonymous), ('auth', signed_in)):
+                    if audience == 'anon' and scenario.auth_only:
+                        continue
+                    key = f'{scenario.name}:{audience}'
+                    results[key] = self.run_scenario(scenario, client, options)
+                    self.write_row(key, results[key])
+
+        report = {
+            'meta': {
+                'created_at': timezone.now().isoformat(),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+                'posts': Post.objects.count(),
+                'post_id': post.pk,
+                'username': user.username,
+                'iterations': options['iterations'],
+            },
+            'results': results,
+        }
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2, sort_keys=True)
+                f.write('\n')
+            self.stdout.write(f"Wrote {options['output']}")
+        if options['baseline']:
+            self.compare(results, options)
+
+    def get_user(self, username):
+        if username:
+            try:
+                return User.objects.get(username=username)
+            except User.DoesNotExist:
+                raise CommandError(f'No user named {username}')
+        author_id = Counter(Post.objects.values_list('author_id', flat=True)[:10000]).most_common(1)[0][0]
+        return User.objects.get(pk=author_id)
+
+    def request(self, scenario, client):
+        return getattr(client, scenario.method)(scenario.url)
+
+    def run_scenario(self, scenario, client, options):
+        for _ in range(options['warmup']):
+            self.request(scenario, client)
+
+        # Queries and memory are measured on separate requests so their
+        # instrumentation does not skew the timings. The query log is capped
+        # (DEBUG keeps the last 9000), so start from an empty one.
+        reset_queries()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.request(scenario, client)
+        query_count = len(queries)  # the log is reset by the next request
+        tracemalloc.start()
+        try:
+            self.request(scenario, client)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        samples = []
+        for _ in range(options['iterations']):
+            started = time.perf_counter()
+            self.request(scenario, client)
+            samples.append((time.perf_counter() - started) * 1000)
+        if scenario.toggles and (options['warmup'] + options['iterations']) % 2:
+            self.request(scenario, client)
+
+        p50, p95, p99 = percentiles(samples)
+        return {
+            'status': response.status_code,
+            'p50_ms': round(p50, 3),
+            'p95_ms': round(p95, 3),
+            'p99_ms': round(p99, 3),
+            'mean_ms': round(statistics.fmean(samples), 3),
+            'queries': query_count,
+            'peak_kb': round(peak / 1024, 1),
+        }
+
+    def write_row(self, key, result):
+        self.stdout.write(
+            f"{key:<26} {result['status']:>3}  p50 {result['p50_ms']:8.2f}ms  "
+            f"p95 {result['p95_ms']:8.2f}ms  p99 {result['p99_ms']:8.2f}ms  "
+            f"{result['queries']:>3} queries  {result['peak_kb']:>9.1f} KiB"
+        )
+
+    def compare(self, results, options):
+        try:
+            with open(options['baseline'], encoding='utf-8') as f:
+                baseline = json.load(f)['results']
+        except (OSError, ValueError, KeyError) as exc:
+            raise CommandError(f"Cannot read baseline {options['baseline']}: {exc}")
+
+        regressions = []
+        for key, result in results.items():
+            before = baseline.get(key)
+            if before is None:
+                continue
+            slower = result['p95_ms'] - before['p95_ms']
+            if slower > NOISE_FLOOR_MS and result['p95_ms'] > before['p95_ms'] * (1 + options['threshold']):
+                regressions.append(f"{key}: p95 {before['p95_ms']:.2f}ms -> {result['p95_ms']:.2f}ms")
+            if result['queries'] > before['queries']:
+                regressions.append(f"{key}: queries {before['queries']} -> {result['queries']}")
+
+        if not regressions:
+            self.stdout.write(self.style.SUCCESS(f"No regressions against {options['baseline']}."))
+            return
+        for line in regressions:
+            self.stdout.write(self.style.ERROR(f"REGRESSION {line}"))
+        if options['fail_on_regression']:
+            raise CommandError(f'{len(regressions)} regressions against {options["baseline"]}')
@@ -0,0 +1,240 @@
+import asyncio
+import json
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand, CommandError
+from django.core.wsgi import get_wsgi_application
+from django.db.backends.signals import connection_created
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from core_apps.posts.models import Post
+
+from .bench import percentiles
+
+HOST = 'testserver'
+
+
+class SimulatedLatency:
+    """execute_wrapper adding a fixed round trip to every query, like a remote database"""
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+
+    def __call__(self, execute, sql, params, many, context):
+        time.sleep(self.seconds)
+        return execute(sql, params, many, context)
+
+    def install(self, sender, connection, **kwargs):
+        # Connections are opened per thread and per request. Go first in the
+        # list: middleware pops its own wrappers from the end.
+        if self not in connection.execute_wrappers:
+            connection.execute_wrappers.insert(0, self)
+
+
+def wsgi_get(application, url):
+    parts = urlsplit(url)
+    environ = {
+        'REQUEST_METHOD': 'GET',
+        'SCRIPT_NAME': '',
+        'PATH_INFO': parts.path,
+        'QUERY_STRING': parts.query,
+        'SERVER_NAME': HOST,
+        'SERVER_PORT': '80',
+        'HTTP_HOST': HOST,
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': 'http',
+        'wsgi.input': BytesIO(),
+        'wsgi.errors': BytesIO(),
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    status = []
+    body = application(environ, lambda s, headers, exc_info=None: status.append(s))
+    try:
+        for _ in body:
+            pass
+    finally:
+        if hasattr(body, 'close'):
+            body.close()
+    return int(status[0].split()[0])
+
+
+async def asgi_get(application, url):
+    parts = urlsplit(url)
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': parts.path,
+        'raw_path': parts.path.encode(),
+        'query_string': parts.query.encode(),
+        'root_path': '',
+        'headers': [(b'host', HOST.encode())],
+        'client': ('127.0.0.1', 0),
+        'server': (HOST, 80),
+    }
+    finished = asyncio.Event()
+    sent_body = False
+    status = []
+
+    async def receive():
+        nonlocal sent_body
+        if not sent_body:
+            sent_body = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        await finished.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            status.append(message['status'])
+        elif message['type'] == 'http.response.body' and not message.get('more_body'):
+            finished.set()
+
+    await application(scope, receive, send)
+    finished.set()
+    return status[0]
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare throughput and latency of the read endpoints under WSGI and ASGI at a "
+        "fixed worker count. WSGI requests are served by a pool of --workers threads, "
+        "like one gunicorn process with --threads; ASGI requests by one event loop, like "
+        "one uvicorn worker. Both go through the real handlers and middleware, anonymous."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4,
+                            help='WSGI worker threads (default: 4)')
+        parser.add_argument('--concurrency', type=int, action='append', default=[],
+                            help='Concurrent clients; repeatable (default: 1, 8 and 32)')
+        parser.add_argument('--requests', type=int, default=200,
+                            help='Requests per scenario, mode and concurrency level (default: 200)')
+        parser.add_argument('--db-latency', type=float, default=0.0,
+                            help='Milliseconds added to every query, to stand in for a networked '
+                                 'database (default: 0)')
+        parser.add_argument('--only', action='append', default=[],
+                            help='Run only scenarios whose name contains this text (repeatable)')
+        parser.add_argument('--output', help='Write the results to this JSON file')
+
+    def handle(self, *args, **options):
+        if options['workers'] < 1 or options['requests'] < 1:
+            raise CommandError('--workers and --requests must be positive')
+        levels = options['concurrency'] or [1, 8, 32]
+        if min(levels) < 1:
+            raise CommandError('--concurrency must be positive')
+        # A typical busy post: recent, with a second page of comments. The
+        # most commented post would make post_detail dominate the run.
+        post = (
+            Post.objects.filter(comment_count__gte=20).order_by('-created_at', '-pk').first()
+            or Post.objects.order_by('-comment_count', 'pk').first()
+        )
+        if post is None:
+            raise CommandError('No posts to benchmark; run seed_data first')
+
+        scenarios = {
+            'home': reverse('posts:home'),
+            'post_detail': reverse('posts:post_detail', args=[post.pk]),
+            'api_post_list': reverse('posts:post_list_api'),
+            'search_posts': f"{reverse('posts:search_posts')}?q={max(post.title.split(), key=len)}",
+            'api_comment_list': reverse('comments:comment_list_api', args=[post.pk]),
+            'load_comments_page': f"{reverse('comments:load_comments_page', args=[post.pk])}?page=2",
+        }
+        if options['only']:
+            scenarios = {
+                name: url for name, url in scenarios.items() if any(text in name for text in options['only'])
+            }
+
+        latency = None
+        if options['db_latency'] > 0:
+            latency = SimulatedLatency(options['db_latency'] / 1000)
+            connection_created.connect(latency.install)
+
+        results = {}
+        try:
+            with override_settings(ALLOWED_HOSTS=[HOST, *settings.ALLOWED_HOSTS]):
+                wsgi, asgi = get_wsgi_application(), get_asgi_application()
+                with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+                    for name, url in scenarios.items():
+                        for concurrency in levels:
+                            for mode in ('wsgi', 'asgi'):
+                                if mode == 'wsgi':
+                                    run = self.run_wsgi(wsgi, pool, url, concurrency, options['requests'])
+                                else:
+                                    run = self.run_asgi(asgi, url, concurrency, options['requests'])
+                                key = f'{name}:{mode}:c{concurrency}'
+                                results[key] = self.summarize(*asyncio.run(run))
+                                self.write_row(key, results[key])
+        finally:
+            if latency is not None:
+                connection_created.disconnect(latency.install)
+
+        if options['output']:
+            report = {
+                'meta': {
+                    'workers': options['workers'],
+                    'requests': options['requests'],
+                    'db_latency_ms': options['db_latency'],
+                },
+                'results': results,
+            }
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2, sort_keys=True)
+                f.write('\n')
+            self.stdout.write(f"Wrote {options['output']}")
+
+    async def drive(self, get, concurrency, total):
+        """Run `total` requests from `concurrency` clients; returns (latencies, errors, seconds)"""
+        remaining = total
+        samples, errors = [], 0
+
+        async def client():
+            nonlocal remaining, errors
+            while remaining > 0:
+                remaining -= 1
+                started = time.perf_counter()
+                status = await get()
+                samples.append((time.perf_counter() - started) * 1000)
+                errors += status >= 400
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+        return samples, errors, time.perf_counter() - started
+
+    def run_wsgi(self, application, pool, url, concurrency, total):
+        async def get():
+            return await asyncio.get_running_loop().run_in_executor(pool, wsgi_get, application, url)
+        return self.drive(get, concurrency, total)
+
+    def run_asgi(self, application, url, concurrency, total):
+        return self.drive(lambda: asgi_get(application, url), concurrency, total)
+
+    def summarize(self, samples, errors, seconds):
+        p50, p95, p99 = percentiles(samples)
+        return {
+            'requests_per_second': round(len(samples) / seconds, 1),
+            'p50_ms': round(p50, 3),
+            'p95_ms': round(p95, 3),
+            'p99_ms': round(p99, 3),
+            'mean_ms': round(statistics.fmean(samples), 3),
+            'errors': errors,
+        }
+
+    def write_row(self, key, result):
+        self.stdout.write(
+            f"{key:<32} {result['requests_per_second']:>8.1f} req/s  "
+            f"p50 {result['p50_ms']:8.2f}ms  p95 {result['p95_ms']:8.2f}ms  "
+            f"p99 {result['p99_ms']:8.2f}ms  {result['errors']:>3} errors"
+        )
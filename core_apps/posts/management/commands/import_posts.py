@@ -0,0 +1,266 @@
+import csv
+import json
+import os
+import sys
+import time
+from collections import defaultdict
+from itertools import islice
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from core_apps.accounts.models import UserProfile, UserStats
+from core_apps.accounts.stats import adjust_stats_by_user
+from core_apps.comments.models import Comment
+from core_apps.posts import search
+from core_apps.posts.bulk import insert_objects
+from core_apps.posts.excerpts import summarize
+from core_apps.posts.feed_cache import bump_feed_version
+from core_apps.posts.models import Post
+
+TITLE_MAX_LENGTH = Post._meta.get_field('title').max_length
+
+
+def parse_timestamp(value, default):
+    if not value:
+        return default
+    parsed = parse_datetime(value)
+    if parsed is None:
+        raise ValueError(f'invalid timestamp {value!r}')
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def csv_record(row):
+    # CSV has no room for nested comments; likes are space separated usernames.
+    return {
+        'title': row.get('title'),
+        'content': row.get('content'),
+        'author': row.get('author'),
+        'created_at': row.get('created_at'),
+        'updated_at': row.get('updated_at'),
+        'likes': (row.get('likes') or '').split(),
+    }
+
+
+class AuthorCache:
+    """username -> user id, filled with one query per batch of unseen names"""
+
+    def __init__(self, create_missing=False):
+        self.create_missing = create_missing
+        self.ids = {}
+        self.created = 0
+
+    def resolve(self, usernames):
+        missing = {name for name in usernames if name and name not in self.ids}
+        if not missing:
+            return
+        self.ids.update(User.objects.filter(username__in=missing).values_list('username', 'id'))
+        missing -= self.ids.keys()
+        if missing and self.create_missing:
+            users = []
+            for name in sorted(missing):
+                user = User(username=name)
+                user.set_unusable_password()
+                users.append(user)
+            User.objects.bulk_create(users)
+            # bulk_create skips the post_save signals that add these.
+            UserProfile.objects.bulk_create(UserProfile(user_id=user.pk) for user in users)
+            UserStats.objects.bulk_create(UserStats(user_id=user.pk) for user in users)
+            self.ids.update((user.username, user.pk) for user in users)
+            self.created += len(users)
+
+    def get(self, username):
+        return self.ids.get(username)
+
+
+class Command(BaseCommand):
+    help = (
+        "Import posts, with their comments and likes, from an NDJSON or CSV archive. "
+        "Rows are written with multi-row INSERTs in one transaction per batch; derived columns, "
+        "counters and the search index are filled per batch rather than per row."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="NDJSON or CSV file to import, or '-' for stdin")
+        parser.add_argument('--format', choices=['ndjson', 'csv'],
+                            help='Input format (default: from the file extension, else ndjson)')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Number of posts written per transaction (default: 1000)')
+        parser.add_argument('--create-users', action='store_true',
+                            help='Create users (with unusable passwords) for unknown usernames '
+                                 'instead of skipping their posts, comments and likes')
+        parser.add_argument('--checkpoint',
+                            help='File recording how many records have been committed, '
+                                 'updated after every batch')
+        parser.add_argument('--resume', action='store_true',
+                            help='Skip the records already committed according to --checkpoint')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError('--batch-size must be positive')
+        if options['resume'] and not options['checkpoint']:
+            raise CommandError('--resume needs --checkpoint')
+        fmt = options['format'] or ('csv' if path.lower().endswith('.csv') else 'ndjson')
+
+        self.verbosity = options['verbosity']
+        self.checkpoint = options['checkpoint']
+        self.source = path if path == '-' else os.path.abspath(path)
+        done = self.read_checkpoint() if options['resume'] else 0
+
+        self.authors = AuthorCache(create_missing=options['create_users'])
+        self.totals = {'posts': 0, 'comments': 0, 'likes': 0, 'skipped': 0}
+        started = time.monotonic()
+
+        stream = sys.stdin if path == '-' else open(path, newline='', encoding='utf-8')
+        try:
+            if fmt == 'csv':
+                records = map(csv_record, csv.DictReader(stream))
+            else:
+                records = map(json.loads, (line for line in stream if line.strip()))
+            records = islice(records, done, None)
+            if done and options['verbosity'] > 0:
+                self.stdout.write(f"Resuming after {done} records")
+
+            while True:
+                try:
+                    batch = list(islice(records, batch_size))
+                except json.JSONDecodeError as exc:
+                    raise CommandError(f'Record {done + 1} onwards: invalid JSON ({exc})')
+                if not batch:
+                    break
+                self.import_batch(batch, first_record=done + 1)
+                done += len(batch)
+                self.write_checkpoint(done)
+                if options['verbosity'] > 1:
+                    elapsed = time.monotonic() - started
+                    self.stdout.write(
+                        f"Committed {done} records, {self.totals['posts']} posts "
+                        f"({self.totals['posts'] / elapsed:.0f} posts/s)"
+                    )
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        if self.totals['posts']:
+            bump_feed_version()
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {self.totals['posts']} posts, {self.totals['comments']} comments and "
+            f"{self.totals['likes']} likes in {elapsed:.1f}s "
+            f"({self.totals['posts'] / max(elapsed, 1e-6):.0f} posts/s); "
+            f"skipped {self.totals['skipped']} records, created {self.authors.created} users."
+        ))
+
+    def read_checkpoint(self):
+        try:
+            with open(self.checkpoint, encoding='utf-8') as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return 0
+        except ValueError:
+            raise CommandError(f'Unreadable checkpoint file {self.checkpoint}')
+        if state.get('source') != self.source:
+            raise CommandError(
+                f"Checkpoint {self.checkpoint} belongs to {state.get('source')}, not {self.source}"
+            )
+        return int(state['records'])
+
+    def write_checkpoint(self, records):
+        if not self.checkpoint:
+            return
+        # Written after the batch commits; replace() so a crash never leaves
+        # a half written file behind.
+        tmp = f'{self.checkpoint}.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'source': self.source, 'records': records}, f)
+        os.replace(tmp, self.checkpoint)
+
+    def import_batch(self, batch, first_record):
+        usernames = set()
+        for record in batch:
+            usernames.add(record.get('author'))
+            usernames.update(record.get('likes') or ())
+            usernames.update(comment.get('author') for comment in record.get('comments') or ())
+
+        now = timezone.now()
+        posts, comments, likes = [], [], []
+        with transaction.atomic():
+            self.authors.resolve(usernames)
+            for number, record in enumerate(batch, first_record):
+                author_id = self.authors.get(record.get('author'))
+                title = (record.get('title') or '').strip()
+                if author_id is None or not title:
+                    self.totals['skipped'] += 1
+                    if self.verbosity > 1:
+                        self.stderr.write(f"Skipping record {number}: missing title or unknown author")
+                    continue
+                try:
+                    created_at = parse_timestamp(record.get('created_at'), now)
+                    updated_at = parse_timestamp(record.get('updated_at'), created_at)
+                    post_comments = [
+                        (self.authors.get(comment.get('author')), comment.get('text') or '',
+                         parse_timestamp(comment.get('created_at'), created_at))
+                        for comment in record.get('comments') or ()
+                    ]
+                except ValueError as exc:
+                    self.totals['skipped'] += 1
+                    if self.verbosity > 1:
+                        self.stderr.write(f"Skipping record {number}: {exc}")
+                    continue
+                post_comments = [comment for comment in post_comments if comment[0] and comment[1]]
+                likers = {self.authors.get(name) for name in record.get('likes') or ()} - {None}
+
+                content = record.get('content') or ''
+                excerpt, word_count = summarize(content)
+                posts.append(Post(
+                    title=title[:TITLE_MAX_LENGTH], content=content, author_id=author_id,
+                    created_at=created_at, updated_at=updated_at,
+                    excerpt=excerpt, word_count=word_count,
+                    like_count=len(likers), comment_count=len(post_comments),
+                ))
+                comments.append(post_comments)
+                likes.append(likers)
+
+            # Not bulk_create(): it would stamp the archived timestamps with now().
+            insert_objects(Post, posts)
+            insert_objects(Comment, [
+                Comment(post_id=post.pk, author_id=author_id, text=text,
+                        created_at=created_at, updated_at=created_at)
+                for post, post_comments in zip(posts, comments)
+                for author_id, text, created_at in post_comments
+            ])
+            Post.likes.through.objects.bulk_create(
+                (Post.likes.through(post_id=post.pk, user_id=user_id)
+                 for post, likers in zip(posts, likes) for user_id in likers),
+                ignore_conflicts=True,
+            )
+            search.index_posts(post.pk for post in posts)
+            # The bulk inserts skip the signals keeping UserStats current.
+            adjust_stats_by_user(self.stats_changes(posts, comments, likes))
+
+        self.totals['posts'] += len(posts)
+        self.totals['comments'] += sum(map(len, comments))
+        self.totals['likes'] += sum(map(len, likes))
+
+    def stats_changes(self, posts, comments, likes):
+        """What the batch adds to its authors' and commenters' UserStats"""
+        changes = defaultdict(lambda: {'post_count': 0, 'comment_count': 0, 'likes_received': 0})
+
+        def add(user_id, field, delta, created_at):
+            change = changes[user_id]
+            change[field] += delta
+            change['active_at'] = max(change.get('active_at', created_at), created_at)
+
+        for post, post_comments, likers in zip(posts, comments, likes):
+            add(post.author_id, 'post_count', 1, post.created_at)
+            changes[post.author_id]['likes_received'] += len(likers)
+            for author_id, _, created_at in post_comments:
+                add(author_id, 'comment_count', 1, created_at)
+        return changes
@@ -0,0 +1,44 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core_apps.posts import search
+from core_apps.posts.models import Post
+
+
+class Command(BaseCommand):
+    help = "Re-index every post in the full-text search table, in primary key batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000,
+                            help='Number of posts indexed per transaction (default: 2000)')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        backend = search.get_backend()
+        started = time.monotonic()
+        indexed = 0
+        last_pk = 0
+
+        while True:
+            batch = list(
+                Post.objects.filter(pk__gt=last_pk)
+                .order_by('pk')
+                .values_list('pk', flat=True)[:batch_size]
+            )
+            if not batch:
+                break
+            last_pk = batch[-1]
+            with transaction.atomic():
+                backend.index_posts(batch)
+            indexed += len(batch)
+            if options['verbosity'] > 1:
+                self.stdout.write(f"Indexed {indexed} posts (up to id {last_pk})")
+
+        removed = backend.remove_orphans()
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexed {indexed} posts in {elapsed:.1f}s, dropped {removed} stale entries "
+            f"({type(backend).__name__})."
+        ))
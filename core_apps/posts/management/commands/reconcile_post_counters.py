@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F, Q
+
+from core_apps.posts.counters import actual_counts
+from core_apps.posts.models import Post
+
+
+class Command(BaseCommand):
+    help = "Recompute Post.like_count and Post.comment_count where they drifted from the real totals"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Number of posts checked per batch (default: 1000)')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Report drifted posts without writing anything')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        dry_run = options['dry_run']
+        checked = fixed = 0
+        last_pk = 0
+
+        while True:
+            batch = list(
+                Post.objects.filter(pk__gt=last_pk)
+                .order_by('pk')
+                .values_list('pk', flat=True)[:batch_size]
+            )
+            if not batch:
+                break
+            last_pk = batch[-1]
+            checked += len(batch)
+
+            with transaction.atomic():
+                drifted = list(
+                    Post.objects.filter(pk__in=batch)
+                    .annotate(**actual_counts())
+                    .filter(~Q(like_count=F('actual_like_count')) | ~Q(comment_count=F('actual_comment_count')))
+                    .only('pk', 'like_count', 'comment_count')
+                    .select_for_update()
+                )
+                for post in drifted:
+                    if options['verbosity'] > 1:
+                        self.stdout.write(
+                            f"Post {post.pk}: likes {post.like_count} -> {post.actual_like_count}, "
+                            f"comments {post.comment_count} -> {post.actual_comment_count}"
+                        )
+                    post.like_count = post.actual_like_count
+                    post.comment_count = post.actual_comment_count
+                if drifted and not dry_run:
+                    Post.objects.bulk_update(drifted, ['like_count', 'comment_count'])
+            fixed += len(drifted)
+
+        verb = 'would be fixed' if dry_run else 'fixed'
+        self.stdout.write(self.style.SUCCESS(f"Checked {checked} posts, {fixed} {verb}."))
@@ -0,0 +1,264 @@
+import math
+import random
+import time
+from collections import Counter
+from datetime import timedelta
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from core_apps.accounts.models import UserProfile, UserStats
+from core_apps.accounts.stats import recount_stats
+from core_apps.comments.models import Comment
+from core_apps.posts import search
+from core_apps.posts.bulk import insert_objects, insert_rows
+from core_apps.posts.excerpts import summarize
+from core_apps.posts.feed_cache import bump_feed_version
+from core_apps.posts.models import Post
+
+WORDS = (
+    'the of and to in is it that for on with as was at by this be from or have an are not but '
+    'what all were when we there can more if out so up said about its than into them only some '
+    'time would other two could then first these over new may after most also use way many '
+    'python django query index cache page feed post comment like user server request response '
+    'database table row column migration model view template serializer cursor latency throughput '
+    'benchmark profile memory thread process worker queue deploy release test build debug error '
+    'design pattern system network storage search ranking timeline stream batch signal counter '
+    'write read update delete insert select join filter order group limit offset key value scale '
+    'today week month year morning evening story idea note thought question answer problem fix '
+    'simple fast slow small large better worse easy hard quick quiet loud bright dark early late'
+).split()
+
+# Lengths in words, drawn from log-normal distributions: most posts are a
+# few hundred words with a long tail of essays, most comments are a line.
+POST_WORDS = (math.log(350), 0.7)
+COMMENT_WORDS = (math.log(20), 0.8)
+TITLE_WORDS = (3, 10)
+BIO_WORDS = (0, 40)
+
+# Size of the shared word stream text is sliced from; slicing is much faster
+# than drawing every word separately.
+CORPUS_WORDS = 200_000
+
+
+def zipf_cum_weights(n, exponent, rng):
+    """Cumulative Zipf weights over n items, with ranks shuffled across them"""
+    ranks = list(range(1, n + 1))
+    rng.shuffle(ranks)
+    return list(accumulate(1.0 / rank ** exponent for rank in ranks))
+
+
+def zipf_counts(total, cum_weights, rng, chunk=100_000):
+    """Spread `total` events over len(cum_weights) items; a Counter of item index -> events"""
+    counts = Counter()
+    population = range(len(cum_weights))
+    while total > 0:
+        k = min(total, chunk)
+        counts.update(rng.choices(population, cum_weights=cum_weights, k=k))
+        total -= k
+    return counts
+
+
+class TextGenerator:
+    def __init__(self, rng):
+        self.rng = rng
+        self.corpus = rng.choices(WORDS, k=CORPUS_WORDS)
+
+    def words(self, count):
+        count = max(1, min(count, CORPUS_WORDS))
+        start = self.rng.randrange(CORPUS_WORDS - count + 1)
+        return self.corpus[start:start + count]
+
+    def lognormal_words(self, params, upper):
+        return self.words(min(int(self.rng.lognormvariate(*params)) + 1, upper))
+
+    def title(self):
+        return ' '.join(self.words(self.rng.randint(*TITLE_WORDS))).capitalize()
+
+    def paragraphs(self, words):
+        # Break the body into paragraphs of 40-120 words.
+        parts, i = [], 0
+        while i < len(words):
+            step = self.rng.randint(40, 120)
+            parts.append(' '.join(words[i:i + step]).capitalize() + '.')
+            i += step
+        return '\n\n'.join(parts)
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate synthetic users, profiles, posts, comments and likes for load and "
+        "performance testing. Output is reproducible for a given --seed; comments and "
+        "likes per post follow a Zipf distribution."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000, help='Users to create (default: 1000)')
+        parser.add_argument('--posts', type=int, default=10000, help='Posts to create (default: 10000)')
+        parser.add_argument('--comments', type=int, default=50000,
+                            help='Total comments to create (default: 50000)')
+        parser.add_argument('--likes', type=int, default=100000,
+                            help='Total likes to create; fewer when a post runs out of users '
+                                 '(default: 100000)')
+        parser.add_argument('--seed', type=int, default=1, help='Random seed (default: 1)')
+        parser.add_argument('--zipf', type=float, default=1.1,
+                            help='Zipf exponent for post popularity and user activity (default: 1.1)')
+        parser.add_argument('--days', type=int, default=365,
+                            help='Spread post dates over this many past days (default: 365)')
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help='Rows per bulk insert (default: 5000)')
+        parser.add_argument('--prefix', default='seed',
+                            help="Username prefix for generated users (default: 'seed')")
+        parser.add_argument('--password', default='password',
+                            help="Password for every generated user (default: 'password')")
+        parser.add_argument('--skip-search-index', action='store_true',
+                            help='Do not index posts; run rebuild_search_index afterwards')
+
+    def handle(self, *args, **options):
+        for name in ('users', 'posts', 'comments', 'likes'):
+            if options[name] < 0:
+                raise CommandError(f'--{name} cannot be negative')
+        if options['posts'] and not options['users']:
+            raise CommandError('Posts need at least one user')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive')
+        if User.objects.filter(username__startswith=options['prefix']).exists():
+            raise CommandError(
+                f"Users named {options['prefix']}* already exist; pass another --prefix"
+            )
+
+        self.options = options
+        self.rng = random.Random(options['seed'])
+        self.text = TextGenerator(self.rng)
+        self.batch_size = options['batch_size']
+        self.now = timezone.now()
+        started = time.monotonic()
+
+        user_ids = self.create_users(options['users'])
+        self.report('users', len(user_ids), started)
+        totals = self.create_posts(user_ids, started)
+        for start in range(0, len(user_ids), self.batch_size):
+            recount_stats(user_ids[start:start + self.batch_size])
+
+        bump_feed_version()
+        elapsed = time.monotonic() - started
+        rows = len(user_ids) * 3 + sum(totals.values())
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {len(user_ids)} users and profiles, {totals['posts']} posts, "
+            f"{totals['comments']} comments and {totals['likes']} likes in {elapsed:.1f}s "
+            f"({rows / max(elapsed, 1e-6):.0f} rows/s)."
+        ))
+
+    def report(self, what, count, started):
+        if self.options['verbosity'] > 1:
+            elapsed = time.monotonic() - started
+            self.stdout.write(f"{count} {what} ({elapsed:.1f}s)")
+
+    def create_users(self, count):
+        prefix = self.options['prefix']
+        password = make_password(self.options['password'])  # hashed once, shared
+        user_ids = []
+        for start in range(0, count, self.batch_size):
+            stop = min(start + self.batch_size, count)
+            users = []
+            for i in range(start, stop):
+                joined = self.now - timedelta(days=self.rng.uniform(0, self.options['days'] * 2))
+                users.append(User(
+                    username=f'{prefix}{i:07d}', password=password,
+                    first_name=self.rng.choice(WORDS).capitalize(),
+                    last_name=self.rng.choice(WORDS).capitalize(),
+                    email=f'{prefix}{i:07d}@example.com', date_joined=joined,
+                ))
+            with transaction.atomic():
+                User.objects.bulk_create(users)
+                insert_objects(UserProfile, [
+                    UserProfile(user_id=user.pk, created_at=user.date_joined, updated_at=user.date_joined,
+                                bio=' '.join(self.text.words(self.rng.randint(*BIO_WORDS)))[:500]
+                                if self.rng.random() < 0.6 else '')
+                    for user in users
+                ])
+                UserStats.objects.bulk_create(UserStats(user_id=user.pk) for user in users)
+            user_ids.extend(user.pk for user in users)
+        return user_ids
+
+    def create_posts(self, user_ids, started):
+        options = self.options
+        count = options['posts']
+        totals = {'posts': 0, 'comments': 0, 'likes': 0}
+        if not count:
+            return totals
+
+        rng = self.rng
+        adapt_datetime = connection.ops.adapt_datetimefield_value
+        popularity = zipf_cum_weights(count, options['zipf'], rng)
+        activity = zipf_cum_weights(len(user_ids), options['zipf'], rng)
+        comment_counts = zipf_counts(options['comments'], popularity, rng)
+        like_counts = zipf_counts(options['likes'], popularity, rng)
+        authors = zipf_counts(count, activity, rng)
+        author_ids = [user_ids[index] for index, n in sorted(authors.items()) for _ in range(n)]
+        rng.shuffle(author_ids)
+
+        # Sorted dates so ids follow created_at, as they do in production.
+        span = options['days'] * 86400
+        offsets = sorted((rng.uniform(0, span) for _ in range(count)), reverse=True)
+
+        for start in range(0, count, self.batch_size):
+            stop = min(start + self.batch_size, count)
+            posts = []
+            for i in range(start, stop):
+                created_at = self.now - timedelta(seconds=offsets[i])
+                content = self.text.paragraphs(self.text.lognormal_words(POST_WORDS, 5000))
+                excerpt, word_count = summarize(content)
+                edited = rng.random() < 0.1
+                posts.append(Post(
+                    title=self.text.title()[:200], content=content, author_id=author_ids[i],
+                    created_at=created_at,
+                    updated_at=created_at + timedelta(hours=rng.uniform(0, 48)) if edited else created_at,
+                    excerpt=excerpt, word_count=word_count,
+                    like_count=min(like_counts[i], len(user_ids)), comment_count=comment_counts[i],
+                ))
+
+            comments, likes = [], []
+            with transaction.atomic():
+                insert_objects(Post, posts)
+                for i, post in zip(range(start, stop), posts):
+                    age = max((self.now - post.created_at).total_seconds(), 1)
+                    for author in rng.choices(user_ids, cum_weights=activity, k=comment_counts[i]):
+                        # Most discussion happens soon after publishing.
+                        written = adapt_datetime(
+                            post.created_at + timedelta(seconds=min(rng.expovariate(1 / 86400), age))
+                        )
+                        text = ' '.join(self.text.lognormal_words(COMMENT_WORDS, 500)).capitalize()
+                        comments.append((post.pk, author, text, written, written))
+                    likes.extend((post.pk, user_id) for user_id in rng.sample(user_ids, post.like_count))
+                    if len(comments) >= self.batch_size:
+                        totals['comments'] += self.insert_comments(comments)
+                        comments = []
+                    if len(likes) >= self.batch_size:
+                        totals['likes'] += self.insert_likes(likes)
+                        likes = []
+                totals['comments'] += self.insert_comments(comments)
+                totals['likes'] += self.insert_likes(likes)
+                if not options['skip_search_index']:
+                    search.index_posts(post.pk for post in posts)
+
+            totals['posts'] += len(posts)
+            self.report('posts', totals['posts'], started)
+        return totals
+
+    # Comments and likes outnumber posts by orders of magnitude, so they skip
+    # the ORM and go through executemany().
+
+    def insert_comments(self, rows):
+        if rows:
+            insert_rows(Comment, ['post', 'author', 'text', 'created_at', 'updated_at'], rows)
+        return len(rows)
+
+    def insert_likes(self, rows):
+        if rows:
+            insert_rows(Post.likes.through, ['post', 'user'], rows)
+        return len(rows)
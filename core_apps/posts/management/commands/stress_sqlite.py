@@ -0,0 +1,210 @@
+import json
+import random
+import threading
+import time
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, connections
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from core_apps.comments.models import Comment
+from core_apps.posts.models import Post
+
+from .bench import percentiles
+
+
+def rollback_journal():
+    """SQLite's defaults: rollback journal, full syncs, deferred transactions"""
+    return {'journal_mode': 'delete', 'synchronous': 'full',
+            'busy_timeout': settings.SQLITE_PRAGMAS.get('busy_timeout', 5000)}, None
+
+
+def tuned():
+    """What settings configure: SQLITE_PRAGMAS and the DATABASES transaction_mode"""
+    return settings.SQLITE_PRAGMAS, connection.settings_dict['OPTIONS'].get('transaction_mode')
+
+
+MODES = {'rollback': rollback_journal, 'wal': tuned}
+
+
+class Command(BaseCommand):
+    help = (
+        "Run concurrent reads and writes (likes, comments) against the post and comment "
+        "endpoints from several threads, once with SQLite's default rollback journal and "
+        "once with the configured WAL setup, and report throughput and 'database is "
+        "locked' errors of each. Uses the current (seeded) SQLite database; comments and "
+        "likes it writes are removed afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8,
+                            help='Concurrent clients, each logged in as a different user (default: 8)')
+        parser.add_argument('--requests', type=int, default=100,
+                            help='Requests per thread and mode (default: 100)')
+        parser.add_argument('--write-ratio', type=float, default=0.3,
+                            help='Share of requests that write (default: 0.3)')
+        parser.add_argument('--mode', action='append', default=[], choices=sorted(MODES),
+                            help='Mode to run; repeatable (default: rollback, then wal)')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed (default: 0)')
+        parser.add_argument('--output', help='Write the results to this JSON file')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('stress_sqlite needs a SQLite database')
+        if not 0 <= options['write_ratio'] <= 1:
+            raise CommandError('--write-ratio must be between 0 and 1')
+        users = list(User.objects.order_by('pk')[:options['threads']])
+        post_ids = list(Post.objects.order_by('-created_at', '-id').values_list('pk', flat=True)[:20])
+        if len(users) < options['threads'] or not post_ids:
+            raise CommandError(f"Needs {options['threads']} users and some posts; run seed_data first")
+
+        results = {}
+        try:
+            for mode in options['mode'] or ['rollback', 'wal']:
+                pragmas, transaction_mode = MODES[mode]()
+                with override_settings(SQLITE_PRAGMAS=pragmas), \
+                        mock.patch.dict(connection.settings_dict['OPTIONS'], {'transaction_mode': transaction_mode}):
+                    results[mode] = self.run_mode(users, post_ids, options)
+                self.write_row(mode, results[mode])
+        finally:
+            # Reconnect with the configured pragmas, switching the journal back.
+            connections.close_all()
+            connection.ensure_connection()
+
+        if {'rollback', 'wal'} <= set(results):
+            before, after = results['rollback'], results['wal']
+            self.stdout.write(
+                f"wal vs rollback: {after['requests_per_second'] / max(before['requests_per_second'], 0.001):.2f}x "
+                f"throughput, lock errors {before['locked']} -> {after['locked']}"
+            )
+        if options['output']:
+            report = {
+                'meta': {key: options[key] for key in ('threads', 'requests', 'write_ratio', 'seed')},
+                'results': results,
+            }
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2, sort_keys=True)
+                f.write('\n')
+            self.stdout.write(f"Wrote {options['output']}")
+
+    def run_mode(self, users, post_ids, options):
+        # The first connection sets the journal mode, which needs no other
+        # connection open.
+        connections.close_all()
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            journal_mode = cursor.fetchone()[0]
+
+        lock = threading.Lock()
+        outcome = {'reads': [], 'writes': [], 'locked': 0, 'errors': 0}
+        comment_ids = []
+        toggled = set()
+        # Every thread starts together, after logging in.
+        start = threading.Barrier(len(users) + 1)
+
+        def worker(index, user):
+            rng = random.Random(options['seed'] * 1000 + index)
+            client = Client()
+            client.force_login(user)
+            mine = {'reads': [], 'writes': [], 'locked': 0, 'errors': 0}
+            try:
+                start.wait()
+                for i in range(options['requests']):
+                    post_id = rng.choice(post_ids)
+                    write = rng.random() < options['write_ratio']
+                    began = time.perf_counter()
+                    failure = self.request(client, rng, post_id, write, index, i, comment_ids, toggled, lock)
+                    elapsed = (time.perf_counter() - began) * 1000
+                    if failure is None:
+                        mine['writes' if write else 'reads'].append(elapsed)
+                    else:
+                        mine[failure] += 1
+            finally:
+                connections.close_all()
+                with lock:
+                    for key, value in mine.items():
+                        outcome[key] += value
+
+        threads = [threading.Thread(target=worker, args=(i, user)) for i, user in enumerate(users)]
+        for thread in threads:
+            thread.start()
+        start.wait()
+        began = time.perf_counter()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - began
+
+        self.clean_up(users, comment_ids, toggled)
+        completed = len(outcome['reads']) + len(outcome['writes'])
+        result = {
+            'journal_mode': journal_mode,
+            'requests': completed + outcome['locked'] + outcome['errors'],
+            'locked': outcome['locked'],
+            'errors': outcome['errors'],
+            'requests_per_second': round(completed / elapsed, 1),
+        }
+        for kind in ('reads', 'writes'):
+            if outcome[kind]:
+                p50, p95, _ = percentiles(outcome[kind])
+                result[f'{kind}_p50_ms'] = round(p50, 3)
+                result[f'{kind}_p95_ms'] = round(p95, 3)
+        return result
+
+    def request(self, client, rng, post_id, write, index, i, comment_ids, toggled, lock):
+        """Send one request; returns None, 'locked' or 'errors'"""
+        try:
+            if not write:
+                url = rng.choice([
+                    reverse('posts:home'),
+                    reverse('posts:post_detail', args=[post_id]),
+                    reverse('comments:load_comments_page', args=[post_id]),
+                    reverse('comments:comment_list_api', args=[post_id]),
+                ])
+                response = client.get(url)
+                return None if response.status_code == 200 else 'errors'
+
+            if rng.random() < 0.5:
+                response = client.post(reverse('posts:toggle_like', args=[post_id]))
+                key = (index, post_id)
+            else:
+                response = client.post(
+                    reverse('comments:create_comment_ajax', args=[post_id]),
+                    json.dumps({'text': f'Stress comment {index}-{i}'}),
+                    content_type='application/json',
+                )
+                key = None
+            data = response.json()
+            if response.status_code != 200 or not data.get('success'):
+                return 'locked' if 'locked' in data.get('message', '') else 'errors'
+            with lock:
+                if key is None:
+                    comment_ids.append(data['comment']['id'])
+                else:
+                    toggled.symmetric_difference_update({key})
+            return None
+        except OperationalError as exc:
+            return 'locked' if 'locked' in str(exc) else 'errors'
+        except Exception:
+            return 'errors'
+
+    def clean_up(self, users, comment_ids, toggled):
+        """Remove the written comments and undo the likes left toggled"""
+        Comment.objects.filter(pk__in=comment_ids).delete()
+        clients = {}
+        for index, post_id in sorted(toggled):
+            if index not in clients:
+                clients[index] = Client()
+                clients[index].force_login(users[index])
+            clients[index].post(reverse('posts:toggle_like', args=[post_id]))
+
+    def write_row(self, mode, result):
+        self.stdout.write(
+            f"{mode:<9} journal={result['journal_mode']:<7} {result['requests_per_second']:8.1f} req/s  "
+            f"reads p50 {result.get('reads_p50_ms', 0):7.2f}ms  writes p50 {result.get('writes_p50_ms', 0):7.2f}ms  "
+            f"locked {result['locked']:>4}  other errors {result['errors']:>3}"
+        )
@@ -0,0 +1,49 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "sqlite":
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS posts_post_fts USING fts5("
+            "title, content, tokenize = 'porter unicode61 remove_diacritics 2')"
+        )
+        schema_editor.execute(
+            "INSERT INTO posts_post_fts (rowid, title, content) "
+            "SELECT id, title, content FROM posts_post"
+        )
+    elif vendor == "postgresql":
+        schema_editor.execute(
+            "CREATE TABLE IF NOT EXISTS posts_post_search ("
+            "post_id bigint PRIMARY KEY REFERENCES posts_post (id) "
+            "ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, "
+            "document tsvector NOT NULL)"
+        )
+        schema_editor.execute(
+            "CREATE INDEX IF NOT EXISTS posts_post_search_document_idx "
+            "ON posts_post_search USING gin (document)"
+        )
+        schema_editor.execute(
+            "INSERT INTO posts_post_search (post_id, document) "
+            "SELECT id, setweight(to_tsvector('english', title), 'A') "
+            "|| setweight(to_tsvector('english', content), 'B') FROM posts_post"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "sqlite":
+        schema_editor.execute("DROP TABLE IF EXISTS posts_post_fts")
+    elif vendor == "postgresql":
+        schema_editor.execute("DROP TABLE IF EXISTS posts_post_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("posts", "0003_post_feed_index"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
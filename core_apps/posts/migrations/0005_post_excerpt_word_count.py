@@ -0,0 +1,39 @@
+# Generated by Django 5.2.4 on 2026-10-18 03:21
+
+from django.db import migrations, models
+
+from core_apps.posts.excerpts import summarize
+
+
+def fill_summaries(apps, schema_editor):
+    Post = apps.get_model("posts", "Post")
+    batch = []
+    for post in Post.objects.only("pk", "content").iterator(chunk_size=1000):
+        post.excerpt, post.word_count = summarize(post.content)
+        batch.append(post)
+        if len(batch) >= 1000:
+            Post.objects.bulk_update(batch, ["excerpt", "word_count"])
+            batch = []
+    if batch:
+        Post.objects.bulk_update(batch, ["excerpt", "word_count"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("posts", "0004_post_search_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="post",
+            name="excerpt",
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name="post",
+            name="word_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.4 on 2026-10-18 04:16
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("posts", "0005_post_excerpt_word_count"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="post",
+            index=models.Index(fields=["author", "-created_at", "-id"], name="posts_post_author_feed_idx"),
+        ),
+    ]
@@ -3,6 +3,8 @@ from django.contrib.auth.models import User
 from django.urls import reverse
 from django.utils import timezone
 
+from .excerpts import summarize
+
 class Post(models.Model):
     title = models.CharField(max_length=200)
     content = models.TextField()
@@ -11,18 +13,41 @@ class Post(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     likes = models.ManyToManyField(User, related_name='liked_posts', blank=True)
 
+    # Denormalized counters, kept in sync by the signals in posts/signals.py
+    # and comments/signals.py. Use `manage.py reconcile_post_counters` to repair drift.
+    like_count = models.PositiveIntegerField(default=0, editable=False)
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
+
+    # Derived from content on save so list pages can defer('content').
+    # `manage.py backfill_post_excerpts` fills rows written around save().
+    excerpt = models.TextField(blank=True, editable=False)
+    word_count = models.PositiveIntegerField(default=0, editable=False)
+
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Seek index for the keyset-paginated feed, see posts/pagination.py
+            models.Index(fields=['-created_at', '-id'], name='posts_post_feed_idx'),
+            # Cursor pages of one author's posts on the profile page
+            models.Index(fields=['author', '-created_at', '-id'], name='posts_post_author_feed_idx'),
+        ]
 
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        if 'content' not in self.get_deferred_fields():
+            self.excerpt, self.word_count = summarize(self.content)
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None and 'content' in update_fields:
+                kwargs['update_fields'] = {*update_fields, 'excerpt', 'word_count'}
+        super().save(*args, **kwargs)
+
     def get_absolute_url(self):
         return reverse('blog:post_detail', kwargs={'pk': self.pk})
 
     def total_likes(self):
-        return self.likes.count()
+        return self.like_count
 
     def total_comments(self):
-        return self.comments.count()
-
+        return self.comment_count
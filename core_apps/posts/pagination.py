@@ -0,0 +1,306 @@
+import base64
+import json
+from collections.abc import Sequence
+
+from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+PAGE_SIZE = 10
+
+# Page-number links are only offered for the first few pages of the feed;
+# anything deeper has to be reached through a cursor.
+MAX_PAGE_NUMBER = 5
+# Ranked search results are not in (created_at, id) order and have no
+# cursor, so they keep page numbers further down. Rank falls off quickly:
+# nobody reads 50 pages of search results.
+MAX_SEARCH_PAGE_NUMBER = 50
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(post, reverse=False):
+    """Opaque token pointing just past `post` (an instance or a values() row) in (created_at, id) order"""
+    if isinstance(post, dict):
+        created_at, pk = post['created_at'], post['id']
+    else:
+        created_at, pk = post.created_at, post.pk
+    payload = json.dumps([created_at.isoformat(), pk, int(reverse)], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        created_at, pk, reverse = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        created_at = parse_datetime(created_at)
+        pk = int(pk)
+    except (TypeError, ValueError, UnicodeDecodeError):
+        raise InvalidCursor(token)
+    if created_at is None:
+        raise InvalidCursor(token)
+    return created_at, pk, bool(reverse)
+
+
+class KeysetPage(Sequence):
+    """A page of posts with the same surface as django.core.paginator.Page, minus the totals"""
+
+    def __init__(self, object_list, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return f'<KeysetPage of {len(self)} posts>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginator:
+    """
+    Paginate posts newest first by seeking on (created_at, id) instead of
+    OFFSET, so every page costs one indexed range scan and no COUNT(*).
+    """
+
+    def __init__(self, queryset, per_page=PAGE_SIZE):
+        self.queryset = queryset
+        self.per_page = per_page
+
+    def page(self, cursor=None):
+        queryset, seek = self._seek(cursor)
+        return self._build(list(queryset[:self.per_page + 1]), *seek)
+
+    async def apage(self, cursor=None):
+        queryset, seek = self._seek(cursor)
+        return self._build([row async for row in queryset[:self.per_page + 1]], *seek)
+
+    def _seek(self, cursor):
+        if cursor:
+            created_at, pk, reverse = decode_cursor(cursor)
+        else:
+            created_at = pk = None
+            reverse = False
+
+        queryset = self.queryset
+        if created_at is None:
+            queryset = queryset.order_by('-created_at', '-id')
+        elif reverse:
+            queryset = queryset.filter(
+                Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=pk)
+            ).order_by('created_at', 'id')
+        else:
+            queryset = queryset.filter(
+                Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk)
+            ).order_by('-created_at', '-id')
+        return queryset, (created_at, reverse)
+
+    def _build(self, rows, created_at, reverse):
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if reverse:
+            rows.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, created_at is not None
+
+        return KeysetPage(
+            rows,
+            next_cursor=encode_cursor(rows[-1]) if rows and has_next else None,
+            previous_cursor=encode_cursor(rows[0], reverse=True) if rows and has_previous else None,
+        )
+
+
+async def aget_page(queryset, per_page, number):
+    """
+    Paginator(queryset, per_page).get_page(number) for async views: the
+    count and the page rows are read through the async ORM and the page's
+    object_list is a list.
+    """
+    paginator = Paginator(queryset, per_page)
+    paginator.count = await queryset.acount()  # fills the cached_property
+    try:
+        number = paginator.validate_number(number)
+    except PageNotAnInteger:
+        number = 1
+    except EmptyPage:
+        number = paginator.num_pages
+    page = paginator.page(number)
+    page.object_list = [row async for row in page.object_list]
+    return page
+
+
+def page_number_limit(ranked=False):
+    """The deepest page number served for a feed, ranked search results or not"""
+    return MAX_SEARCH_PAGE_NUMBER if ranked else MAX_PAGE_NUMBER
+
+
+def _clamp_page_number(page_number, ranked):
+    try:
+        return min(int(page_number or 1), page_number_limit(ranked))
+    except ValueError:
+        return 1
+
+
+def _link_numbered_page(page, ranked):
+    # The last numbered page of the feed hands over to cursor mode for the
+    # next step. Ranked results have no cursor: they just end.
+    page.next_cursor = None
+    if not ranked and page.number >= MAX_PAGE_NUMBER and page.has_next():
+        page.next_cursor = encode_cursor(page[len(page) - 1])
+    return page
+
+
+def get_feed_page(queryset, params, per_page=PAGE_SIZE, ranked=False):
+    """
+    Resolve the feed page for the query parameters of an HTML request.
+
+    `?page=N` keeps the numbered paginator for the first MAX_PAGE_NUMBER pages;
+    everything else, including the landing page, is served by cursor. Ranked
+    search results are not in (created_at, id) order, so they always use
+    page numbers, up to MAX_SEARCH_PAGE_NUMBER.
+    """
+    page_number = params.get('page')
+    if ranked or (page_number and not params.get('cursor')):
+        page = Paginator(queryset, per_page).get_page(_clamp_page_number(page_number, ranked))
+        return _link_numbered_page(page, ranked)
+
+    try:
+        return KeysetPaginator(queryset, per_page).page(params.get('cursor'))
+    except InvalidCursor:
+        return KeysetPaginator(queryset, per_page).page()
+
+
+async def aget_feed_page(queryset, params, per_page=PAGE_SIZE, ranked=False):
+    """get_feed_page for async views"""
+    page_number = params.get('page')
+    if ranked or (page_number and not params.get('cursor')):
+        page = await aget_page(queryset, per_page, _clamp_page_number(page_number, ranked))
+        return _link_numbered_page(page, ranked)
+
+    try:
+        return await KeysetPaginator(queryset, per_page).apage(params.get('cursor'))
+    except InvalidCursor:
+        return await KeysetPaginator(queryset, per_page).apage()
+
+
+class LimitedPageNumberPagination(PageNumberPagination):
+    page_size = PAGE_SIZE
+    max_page_number = MAX_PAGE_NUMBER
+    too_deep_message = f'Page numbers stop at {MAX_PAGE_NUMBER}; follow the cursor links to go deeper.'
+
+    def get_page_number(self, request, paginator):
+        page_number = super().get_page_number(request, paginator)
+        if page_number in self.last_page_strings:
+            page_number = paginator.num_pages
+        try:
+            too_deep = int(page_number) > self.max_page_number
+        except ValueError:
+            too_deep = False
+        if too_deep:
+            raise NotFound(self.too_deep_message)
+        return page_number
+
+
+class SearchPageNumberPagination(LimitedPageNumberPagination):
+    max_page_number = MAX_SEARCH_PAGE_NUMBER
+    too_deep_message = f'Search results stop at page {MAX_SEARCH_PAGE_NUMBER}; refine the search.'
+
+
+class PostFeedPagination(BasePagination):
+    """
+    Cursor pagination over (created_at, id) for the posts API.
+
+    Responses carry opaque `next`/`previous` links and no `count`. Clients
+    that still send `?page=N` get the classic page-number response for the
+    first MAX_PAGE_NUMBER pages, ranked `?search=` results for the first
+    MAX_SEARCH_PAGE_NUMBER.
+    """
+    cursor_query_param = 'cursor'
+    page_query_param = 'page'
+    search_query_param = 'search'
+    page_size = PAGE_SIZE
+
+    def uses_page_numbers(self, params):
+        return bool(params.get(self.search_query_param)) or (
+            self.page_query_param in params and self.cursor_query_param not in params
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_number_pagination = None
+
+        params = request.query_params
+        if self.uses_page_numbers(params):
+            if params.get(self.search_query_param):
+                self.page_number_pagination = SearchPageNumberPagination()
+            else:
+                self.page_number_pagination = LimitedPageNumberPagination()
+            return self.page_number_pagination.paginate_queryset(queryset, request, view)
+
+        try:
+            self.page = KeysetPaginator(queryset, self.page_size).page(
+                request.query_params.get(self.cursor_query_param)
+            )
+        except InvalidCursor:
+            raise NotFound('Invalid cursor')
+        return list(self.page)
+
+    async def apaginate_queryset(self, queryset, request):
+        """Cursor mode of paginate_queryset for async views, which check uses_page_numbers() first"""
+        self.request = request
+        self.page_number_pagination = None
+        try:
+            self.page = await KeysetPaginator(queryset, self.page_size).apage(
+                request.GET.get(self.cursor_query_param)
+            )
+        except InvalidCursor:
+            raise NotFound('Invalid cursor')
+        return list(self.page)
+
+    def get_link(self, cursor):
+        if cursor is None:
+            return None
+        url = remove_query_param(self.request.build_absolute_uri(), self.page_query_param)
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def get_paginated_response(self, data):
+        if self.page_number_pagination is not None:
+            return self.page_number_pagination.get_paginated_response(data)
+        return Response(self.get_paginated_data(data))
+
+    def get_paginated_data(self, data):
+        return {
+            'next': self.get_link(self.page.next_cursor),
+            'previous': self.get_link(self.page.previous_cursor),
+            'results': data,
+        }
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
@@ -0,0 +1,152 @@
+"""
+Full-text search over post titles and bodies.
+
+Each database keeps a side table keyed by post id: an FTS5 table on SQLite
+and a weighted tsvector column with a GIN index on PostgreSQL. Both tables
+are created by migration 0004, kept in sync by the Post signals and can be
+rebuilt with `manage.py rebuild_search_index`. Other databases fall back to
+icontains matching.
+
+Views should only ever call `full_text_search(queryset, query)`.
+"""
+import re
+
+from django.db import connection
+from django.db.models import Q
+
+SQLITE_TABLE = 'posts_post_fts'
+POSTGRES_TABLE = 'posts_post_search'
+POSTGRES_CONFIG = 'english'
+
+# Title matches count this many times more than body matches (FTS5 bm25 weights).
+TITLE_WEIGHT = 10.0
+
+TERM_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def search_terms(query):
+    """Split raw user input into plain word tokens, so it can't break the match syntax"""
+    return TERM_RE.findall(query or '')[:16]
+
+
+class FallbackSearchBackend:
+    """LIKE matching for databases without a full-text index"""
+
+    def filter(self, queryset, terms):
+        for term in terms:
+            queryset = queryset.filter(Q(title__icontains=term) | Q(content__icontains=term))
+        return queryset.order_by('-created_at', '-id')
+
+    def index_posts(self, post_ids):
+        pass
+
+    def remove_posts(self, post_ids):
+        pass
+
+    def remove_orphans(self):
+        return 0
+
+
+class SQLiteSearchBackend:
+    def match_expression(self, terms):
+        # Every term must match; the last one also matches as a prefix so
+        # live search works while the user is still typing.
+        quoted = [f'"{term}"' for term in terms]
+        quoted[-1] += '*'
+        return ' '.join(quoted)
+
+    def filter(self, queryset, terms):
+        return queryset.extra(
+            select={'search_rank': f'-bm25({SQLITE_TABLE}, %s, 1.0)'},
+            select_params=[TITLE_WEIGHT],
+            tables=[SQLITE_TABLE],
+            where=[f'{SQLITE_TABLE}.rowid = posts_post.id', f'{SQLITE_TABLE} MATCH %s'],
+            params=[self.match_expression(terms)],
+        ).order_by('-search_rank', '-created_at', '-id')
+
+    def index_posts(self, post_ids):
+        placeholders = ', '.join(['%s'] * len(post_ids))
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {SQLITE_TABLE} WHERE rowid IN ({placeholders})', post_ids)
+            cursor.execute(
+                f'INSERT INTO {SQLITE_TABLE} (rowid, title, content) '
+                f'SELECT id, title, content FROM posts_post WHERE id IN ({placeholders})',
+                post_ids,
+            )
+
+    def remove_posts(self, post_ids):
+        placeholders = ', '.join(['%s'] * len(post_ids))
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {SQLITE_TABLE} WHERE rowid IN ({placeholders})', post_ids)
+
+    def remove_orphans(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {SQLITE_TABLE} WHERE rowid NOT IN (SELECT id FROM posts_post)'
+            )
+            return cursor.rowcount
+
+
+class PostgresSearchBackend:
+    def tsquery(self, terms):
+        return ' & '.join(terms[:-1] + [f'{terms[-1]}:*'])
+
+    def filter(self, queryset, terms):
+        tsquery = f"to_tsquery('{POSTGRES_CONFIG}', %s)"
+        expression = self.tsquery(terms)
+        return queryset.extra(
+            select={'search_rank': f'ts_rank({POSTGRES_TABLE}.document, {tsquery})'},
+            select_params=[expression],
+            tables=[POSTGRES_TABLE],
+            where=[f'{POSTGRES_TABLE}.post_id = posts_post.id', f'{POSTGRES_TABLE}.document @@ {tsquery}'],
+            params=[expression],
+        ).order_by('-search_rank', '-created_at', '-id')
+
+    def index_posts(self, post_ids):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {POSTGRES_TABLE} (post_id, document) "
+                f"SELECT id, setweight(to_tsvector('{POSTGRES_CONFIG}', title), 'A') "
+                f"|| setweight(to_tsvector('{POSTGRES_CONFIG}', content), 'B') "
+                f"FROM posts_post WHERE id = ANY(%s) "
+                f"ON CONFLICT (post_id) DO UPDATE SET document = EXCLUDED.document",
+                [list(post_ids)],
+            )
+
+    def remove_posts(self, post_ids):
+        # Rows also go away through the ON DELETE CASCADE foreign key.
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {POSTGRES_TABLE} WHERE post_id = ANY(%s)', [list(post_ids)])
+
+    def remove_orphans(self):
+        return 0
+
+
+BACKENDS = {
+    'sqlite': SQLiteSearchBackend,
+    'postgresql': PostgresSearchBackend,
+}
+
+
+def get_backend():
+    return BACKENDS.get(connection.vendor, FallbackSearchBackend)()
+
+
+def full_text_search(queryset, query):
+    """Restrict a Post queryset to matches for `query`, best matches first"""
+    terms = search_terms(query)
+    if not terms:
+        return queryset.none()
+    return get_backend().filter(queryset, terms)
+
+
+def index_posts(post_ids):
+    post_ids = list(post_ids)
+    if post_ids:
+        get_backend().index_posts(post_ids)
+
+
+def remove_posts(post_ids):
+    post_ids = list(post_ids)
+    if post_ids:
+        get_backend().remove_posts(post_ids)
@@ -1,8 +1,14 @@
 # blog/serializers.py
 from rest_framework import serializers
 from django.contrib.auth.models import User
+from django.urls import reverse
+from rest_framework.utils.urls import replace_query_param
+from .fieldsets import SparseFieldsetMixin
 from .models import Post
+from .likes import liked_ids_among, liked_post_ids
+from .values_serializers import ValuesSerializer, datetime_field
 from core_apps.accounts.serializers import UserSerializer
+from core_apps.comments.pagination import EMBEDDED_COMMENTS, comments_after
 from core_apps.comments.serializers import CommentSerializer
 
 class UserSerializer(serializers.ModelSerializer):
@@ -12,13 +18,35 @@ class UserSerializer(serializers.ModelSerializer):
 
 
 
-class PostSerializer(serializers.ModelSerializer):
+def is_liked_by_requester(serializer, obj):
+    liked = serializer.context.get('liked_post_ids')
+    if liked is not None:
+        return obj.pk in liked
+    request = serializer.context.get('request')
+    if request and request.user.is_authenticated:
+        return obj.likes.filter(id=request.user.id).exists()
+    return False
+
+
+class LikedPostsListSerializer(serializers.ListSerializer):
+    """Resolve is_liked for the whole page with one query before rendering rows"""
+
+    def to_representation(self, data):
+        posts = list(data.all() if hasattr(data, 'all') else data)
+        request = self.context.get('request')
+        if request is not None and 'liked_post_ids' not in self.context and 'is_liked' in self.child.fields:
+            self.context['liked_post_ids'] = liked_post_ids(request.user, posts)
+        return super().to_representation(posts)
+
+
+class PostSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     author = UserSerializer(read_only=True)
     author_name = serializers.CharField(source='author.username', read_only=True)
-    total_likes = serializers.IntegerField(read_only=True)
-    total_comments = serializers.IntegerField(read_only=True)
+    total_likes = serializers.IntegerField(source='like_count', read_only=True)
+    total_comments = serializers.IntegerField(source='comment_count', read_only=True)
     is_liked = serializers.SerializerMethodField()
-    comments = CommentSerializer(many=True, read_only=True)
+    comments = serializers.SerializerMethodField()
+    comments_next = serializers.SerializerMethodField()
     created_at_formatted = serializers.SerializerMethodField()
     updated_at_formatted = serializers.SerializerMethodField()
 
@@ -27,15 +55,36 @@ class PostSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'title', 'content', 'author', 'author_name',
             'created_at', 'updated_at', 'created_at_formatted', 'updated_at_formatted',
-            'total_likes', 'total_comments', 'is_liked', 'comments'
+            'total_likes', 'total_comments', 'is_liked', 'comments', 'comments_next'
         ]
         read_only_fields = ['author', 'created_at', 'updated_at']
+        list_serializer_class = LikedPostsListSerializer
 
     def get_is_liked(self, obj):
+        return is_liked_by_requester(self, obj)
+
+    def embedded_comments(self, obj):
+        # Only the first EMBEDDED_COMMENTS are inlined; comments_next points
+        # at the comment list endpoint for the rest.
+        cache = self.__dict__.setdefault('_embedded_comments', {})
+        if obj.pk not in cache:
+            cache[obj.pk] = comments_after(obj.comments.select_related('author'), limit=EMBEDDED_COMMENTS)
+        return cache[obj.pk]
+
+    def get_comments(self, obj):
+        comments, _ = self.embedded_comments(obj)
+        context = {**self.context, 'sparse_fieldsets': False}
+        return CommentSerializer(comments, many=True, context=context).data
+
+    def get_comments_next(self, obj):
+        _, cursor = self.embedded_comments(obj)
+        if cursor is None:
+            return None
+        url = reverse('comments:comment_list_api', args=[obj.pk])
         request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            return obj.likes.filter(id=request.user.id).exists()
-        return False
+        if request is not None:
+            url = request.build_absolute_uri(url)
+        return replace_query_param(url, 'cursor', cursor)
 
     def get_created_at_formatted(self, obj):
         return obj.created_at.strftime('%B %d, %Y at %I:%M %p')
@@ -47,14 +96,14 @@ class PostSerializer(serializers.ModelSerializer):
         validated_data['author'] = self.context['request'].user
         return super().create(validated_data)
 
-class PostListSerializer(serializers.ModelSerializer):
+class PostListSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     author_name = serializers.CharField(source='author.username', read_only=True)
     author_full_name = serializers.SerializerMethodField()
-    total_likes = serializers.IntegerField(read_only=True)
-    total_comments = serializers.IntegerField(read_only=True)
+    total_likes = serializers.IntegerField(source='like_count', read_only=True)
+    total_comments = serializers.IntegerField(source='comment_count', read_only=True)
     is_liked = serializers.SerializerMethodField()
     created_at_formatted = serializers.SerializerMethodField()
-    content_preview = serializers.SerializerMethodField()
+    content_preview = serializers.CharField(source='excerpt', read_only=True)
 
     class Meta:
         model = Post
@@ -62,6 +111,7 @@ class PostListSerializer(serializers.ModelSerializer):
             'id', 'title', 'content_preview', 'author_name', 'author_full_name',
             'created_at', 'created_at_formatted', 'total_likes', 'total_comments', 'is_liked'
         ]
+        list_serializer_class = LikedPostsListSerializer
 
     def get_author_full_name(self, obj):
         if obj.author.first_name or obj.author.last_name:
@@ -69,16 +119,42 @@ class PostListSerializer(serializers.ModelSerializer):
         return obj.author.username
 
     def get_is_liked(self, obj):
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            return obj.likes.filter(id=request.user.id).exists()
-        return False
+        return is_liked_by_requester(self, obj)
 
     def get_created_at_formatted(self, obj):
         return obj.created_at.strftime('%B %d, %Y')
 
-    def get_content_preview(self, obj):
-        words = obj.content.split()
-        if len(words) > 30:
-            return ' '.join(words[:30]) + '...'
-        return obj.content
\ No newline at end of file
+
+class PostListValuesSerializer(ValuesSerializer):
+    """PostListSerializer over values() rows, for the list and search endpoints"""
+    fields = (
+        ('id', 'id', None),
+        ('title', 'title', None),
+        ('content_preview', 'excerpt', None),
+        ('author_name', 'author__username', None),
+        ('author_full_name', None, None),
+        ('created_at', 'created_at', datetime_field.to_representation),
+        ('created_at_formatted', 'created_at', lambda value: value.strftime('%B %d, %Y')),
+        ('total_likes', 'like_count', None),
+        ('total_comments', 'comment_count', None),
+        ('is_liked', None, None),
+    )
+    extra_lookups = ('author__first_name', 'author__last_name')
+
+    def prepare(self, rows):
+        if 'is_liked' not in self.field_names:
+            return
+        liked = self.context.get('liked_post_ids')
+        if liked is None:
+            request = self.context.get('request')
+            liked = liked_ids_among(request.user if request else None, [row['id'] for row in rows])
+        self.liked = liked
+
+    def get_author_full_name(self, row):
+        first_name, last_name = row['author__first_name'], row['author__last_name']
+        if first_name or last_name:
+            return f"{first_name} {last_name}".strip()
+        return row['author__username']
+
+    def get_is_liked(self, row):
+        return row['id'] in self.liked
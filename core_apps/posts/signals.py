@@ -0,0 +1,98 @@
+from collections import Counter, defaultdict
+
+from django.contrib.auth.models import User
+from django.db.models import F, QuerySet, Value
+from django.db.models.functions import Greatest
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from core_apps.accounts.stats import credit_likes
+from . import search
+from .counters import adjust_counter
+from .feed_cache import bump_feed_version
+from .models import Post
+
+PostLike = Post.likes.through
+
+
+def deleting_posts(origin):
+    """True when a delete was started from Post rows, so their counters are going away anyway"""
+    if isinstance(origin, QuerySet):
+        return origin.model is Post
+    return isinstance(origin, Post)
+
+
+@receiver(m2m_changed, sender=PostLike)
+def count_like_changes(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Keep Post.like_count, and the authors' UserStats.likes_received, in
+    step with post.likes / user.liked_posts.
+
+    pk_set on post_add only holds the rows that were actually inserted. For
+    removals the through rows that really exist are looked up before the
+    delete runs, since pk_set may name users or posts that were never linked.
+    """
+    if action == 'post_add' and pk_set:
+        if reverse:
+            adjust_counter(pk_set, 'like_count', 1)
+            credit_likes(dict.fromkeys(pk_set, 1))
+        else:
+            adjust_counter([instance.pk], 'like_count', len(pk_set))
+            credit_likes({instance.pk: len(pk_set)})
+
+    elif action in ('pre_remove', 'pre_clear'):
+        rows = PostLike.objects.filter(**{'user_id' if reverse else 'post_id': instance.pk})
+        if action == 'pre_remove':
+            rows = rows.filter(**{'post_id__in' if reverse else 'user_id__in': pk_set})
+        instance._removed_likes = Counter(rows.values_list('post_id', flat=True))
+
+    elif action in ('post_remove', 'post_clear'):
+        removed = instance.__dict__.pop('_removed_likes', Counter())
+        posts_by_count = defaultdict(list)
+        for post_id, count in removed.items():
+            posts_by_count[count].append(post_id)
+        for count, post_ids in posts_by_count.items():
+            adjust_counter(post_ids, 'like_count', -count)
+        credit_likes({post_id: -count for post_id, count in removed.items()})
+
+
+@receiver(pre_delete, sender=User)
+def drop_likes_of_deleted_user(sender, instance, **kwargs):
+    # The cascade removes the user's through rows without any m2m signal,
+    # so release their likes here, in one UPDATE, before the rows go.
+    Post.objects.filter(likes=instance).update(like_count=Greatest(F('like_count') - 1, Value(0)))
+
+
+@receiver(post_save, sender=Post)
+def index_saved_post(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not {'title', 'content'} & set(update_fields):
+        return
+    search.index_posts([instance.pk])
+
+
+@receiver(post_delete, sender=Post)
+def unindex_deleted_post(sender, instance, **kwargs):
+    search.remove_posts([instance.pk])
+
+
+@receiver([post_save, post_delete], sender=Post)
+def invalidate_feed_on_post_change(sender, **kwargs):
+    bump_feed_version()
+
+
+@receiver(m2m_changed, sender=PostLike)
+def invalidate_feed_on_like_change(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        bump_feed_version()
+
+
+@receiver(post_save, sender=User)
+def invalidate_feed_on_author_rename(sender, update_fields=None, **kwargs):
+    # Logins only touch last_login; anything else may change a displayed name.
+    if update_fields is None or {'username', 'first_name', 'last_name'} & set(update_fields):
+        bump_feed_version()
+
+
+@receiver(pre_delete, sender=User)
+def invalidate_feed_on_user_delete(sender, **kwargs):
+    bump_feed_version()
@@ -1,3 +1,877 @@
-from django.test import TestCase
+import json
+import os
+import tempfile
+import threading
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+from urllib.parse import parse_qs, urlsplit
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection, connections
+from django.test import Client, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import get_resolver, reverse
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from core_apps.accounts.models import UserProfile, UserStats
+from core_apps.comments.models import Comment
+from core_apps.comments.pagination import EMBEDDED_COMMENTS
+from . import search
+from .bulk import insert_objects
+from .counters import actual_counts
+from .excerpts import summarize
+from .likes import like_post, toggle_like
+from .models import Post
+from .search import full_text_search
+from .serializers import PostListSerializer, PostListValuesSerializer
+
+
+class PostCounterTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user('author', password='pass12345')
+        self.reader = User.objects.create_user('reader', password='pass12345')
+        self.post = Post.objects.create(title='Hello', content='First post body', author=self.author)
+
+    def assertCounts(self, likes, comments):
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.like_count, likes)
+        self.assertEqual(self.post.comment_count, comments)
+
+    def test_like_add_remove_and_clear(self):
+        self.post.likes.add(self.reader, self.author)
+        self.post.likes.add(self.reader)
+        self.assertCounts(2, 0)
+        self.post.likes.remove(self.reader)
+        self.assertCounts(1, 0)
+        self.post.likes.clear()
+        self.assertCounts(0, 0)
+
+    def test_reverse_like_and_user_cascade(self):
+        self.reader.liked_posts.add(self.post)
+        Comment.objects.create(post=self.post, author=self.reader, text='Nice')
+        self.assertCounts(1, 1)
+        self.reader.delete()
+        self.assertCounts(0, 0)
+
+    def test_comment_create_and_delete(self):
+        comment = Comment.objects.create(post=self.post, author=self.reader, text='Nice')
+        Comment.objects.create(post=self.post, author=self.author, text='Thanks')
+        self.assertCounts(0, 2)
+        comment.delete()
+        self.assertCounts(0, 1)
+
+    def test_toggle_like_returns_stored_count(self):
+        self.client.force_login(self.reader)
+        response = self.client.post(f'/ajax/posts/{self.post.id}/like/')
+        self.assertEqual(response.json()['total_likes'], 1)
+        response = self.client.post(f'/ajax/posts/{self.post.id}/like/')
+        self.assertEqual(response.json()['total_likes'], 0)
+
+    def test_toggle_like_uses_one_transaction(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(toggle_like(self.post.id, self.reader.id), (True, 1))
+        # Inside the test's transaction, atomic() opens a savepoint.
+        self.assertEqual(sum(query['sql'].startswith('SAVEPOINT') for query in ctx), 1)
+        self.assertEqual(toggle_like(self.post.id, self.reader.id), (False, 0))
+        with self.assertRaises(Post.DoesNotExist):
+            toggle_like(999, self.reader.id)
+
+    def test_list_api_reads_stored_counters(self):
+        self.post.likes.add(self.reader)
+        Comment.objects.create(post=self.post, author=self.reader, text='Nice')
+        Comment.objects.create(post=self.post, author=self.reader, text='Again')
+        row = self.client.get('/api/posts/').json()['results'][0]
+        self.assertEqual((row['total_likes'], row['total_comments']), (1, 2))
+
+    def test_reconcile_command_repairs_drift(self):
+        self.post.likes.add(self.reader)
+        Comment.objects.create(post=self.post, author=self.reader, text='Nice')
+        Post.objects.filter(pk=self.post.pk).update(like_count=7, comment_count=0)
+        out = StringIO()
+        call_command('reconcile_post_counters', batch_size=1, stdout=out)
+        self.assertIn('1 fixed', out.getvalue())
+        self.assertCounts(1, 1)
+
+
+class FeedPaginationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user('author', password='pass12345')
+        Post.objects.bulk_create(
+            Post(title=f'Post {i}', content='Body', author=self.author) for i in range(25)
+        )
+        # Force ties on created_at so the id tie-breaker is exercised.
+        first_ids = Post.objects.order_by('id').values_list('id', flat=True)[:12]
+        stamp = Post.objects.get(pk=first_ids[0]).created_at
+        Post.objects.filter(pk__in=list(first_ids)).update(created_at=stamp)
+        self.expected = list(Post.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+
+    def test_api_cursor_walk_forward_and_back(self):
+        seen, pages = [], []
+        url = '/api/posts/'
+        while url:
+            data = self.client.get(url).json()
+            self.assertNotIn('count', data)
+            pages.append(data)
+            seen.extend(row['id'] for row in data['results'])
+            url = data['next']
+        self.assertEqual(seen, self.expected)
+        self.assertEqual(len(pages), 3)
+
+        previous = self.client.get(pages[-1]['previous']).json()
+        self.assertEqual([row['id'] for row in previous['results']], self.expected[10:20])
+
+    def test_api_page_numbers_are_capped(self):
+        data = self.client.get('/api/posts/?page=2').json()
+        self.assertEqual(data['count'], 25)
+        self.assertEqual([row['id'] for row in data['results']], self.expected[10:20])
+        self.assertEqual(self.client.get('/api/posts/?page=6').status_code, 404)
+        self.assertEqual(self.client.get('/api/posts/?cursor=garbage').status_code, 404)
+
+    def test_home_follows_cursor_links(self):
+        response = self.client.get('/')
+        page = response.context['posts']
+        self.assertEqual([post.id for post in page], self.expected[:10])
+        response = self.client.get('/', {'cursor': page.next_cursor})
+        self.assertEqual([post.id for post in response.context['posts']], self.expected[10:20])
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user('author', password='pass12345')
+        self.body_hit = Post.objects.create(title='Cooking notes', content='A quick guide to django testing', author=self.author)
+        self.title_hit = Post.objects.create(title='Django tips', content='Some advice for beginners', author=self.author)
+        self.miss = Post.objects.create(title='Gardening', content='Tomatoes and basil', author=self.author)
+
+    def result_ids(self, query):
+        return [post.id for post in full_text_search(Post.objects.all(), query)]
+
+    def test_title_matches_rank_first(self):
+        self.assertEqual(self.result_ids('django'), [self.title_hit.id, self.body_hit.id])
+
+    def test_index_follows_saves_and_deletes(self):
+        self.miss.title = 'Django gardening'
+        self.miss.save()
+        self.assertIn(self.miss.id, self.result_ids('djan'))
+        self.title_hit.delete()
+        self.assertNotIn(self.title_hit.id, self.result_ids('django'))
+
+    def test_query_syntax_is_neutralised(self):
+        self.assertEqual(self.result_ids('"django -('), [self.title_hit.id, self.body_hit.id])
+        self.assertEqual(self.result_ids('***'), [])
+
+    def test_entry_points_share_search(self):
+        api = self.client.get('/api/search/', {'q': 'django'}).json()['results']
+        listing = self.client.get('/api/posts/', {'search': 'django'}).json()['results']
+        home = self.client.get('/', {'search': 'django'}).context['posts']
+        expected = [self.title_hit.id, self.body_hit.id]
+        self.assertEqual([row['id'] for row in api], expected)
+        self.assertEqual([row['id'] for row in listing], expected)
+        self.assertEqual([post.id for post in home], expected)
+
+    def test_ranked_results_page_past_the_feed_limit(self):
+        posts = Post.objects.bulk_create(
+            Post(title=f'Django part {i}', content='Body', author=self.author) for i in range(70)
+        )
+        search.index_posts(post.pk for post in posts)
+
+        response = self.client.get('/', {'search': 'django', 'page': '6'})
+        page = response.context['posts']
+        self.assertEqual(page.number, 6)
+        self.assertIsNone(page.next_cursor)
+        self.assertContains(response, '?page=7&search=django')
+        self.assertNotContains(response, '?cursor=')
+
+        data = self.client.get('/api/posts/', {'search': 'django', 'page': '8'}).json()
+        self.assertEqual(data['count'], 72)
+        self.assertEqual(len(data['results']), 2)
+        self.assertIsNone(data['next'])
+        self.assertEqual(self.client.get('/api/posts/', {'search': 'django', 'page': '51'}).status_code, 404)
+
+    def test_rebuild_command(self):
+        search.remove_posts(Post.objects.values_list('pk', flat=True))
+        self.assertEqual(self.result_ids('django'), [])
+        call_command('rebuild_search_index', batch_size=2, stdout=StringIO())
+        self.assertEqual(self.result_ids('django'), [self.title_hit.id, self.body_hit.id])
+
+
+class LikedFlagQueryTests(TestCase):
+    def setUp(self):
+        self.reader = User.objects.create_user('reader', password='pass12345')
+        self.client.force_login(self.reader)
+
+    def make_posts(self, count):
+        author = User.objects.create_user(f'author{count}', password='pass12345')
+        posts = [Post.objects.create(title=f'Post {i}', content='Body', author=author) for i in range(count)]
+        for post in posts[::2]:
+            post.likes.add(self.reader)
+        return posts
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx), response
+
+    def test_list_endpoints_use_constant_queries(self):
+        self.make_posts(2)
+        small = [self.count_queries(url)[0] for url in ('/', '/api/posts/', '/api/search/?q=post')]
+        self.make_posts(8)
+        large = [self.count_queries(url)[0] for url in ('/', '/api/posts/', '/api/search/?q=post')]
+        self.assertEqual(small, large)
+
+    def test_liked_flags_are_correct(self):
+        posts = self.make_posts(4)
+        liked = {post.id for post in posts[::2]}
+        rows = self.client.get('/api/posts/').json()['results']
+        self.assertEqual({row['id'] for row in rows if row['is_liked']}, liked)
+        _, response = self.count_queries('/')
+        self.assertEqual(response.context['liked_post_ids'], liked)
+
+
+class LikeEndpointTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user('author', password='pass12345')
+        self.reader = User.objects.create_user('reader', password='pass12345')
+        self.post = Post.objects.create(title='Hello', content='Body', author=self.author)
+        self.client.force_login(self.reader)
+        self.url = f'/api/posts/{self.post.id}/like/'
+
+    def test_put_and_delete_are_idempotent(self):
+        first = self.client.put(self.url).json()
+        second = self.client.put(self.url).json()
+        self.assertEqual((first['changed'], first['total_likes']), (True, 1))
+        self.assertEqual((second['changed'], second['total_likes']), (False, 1))
+        self.assertTrue(self.post.likes.filter(pk=self.reader.pk).exists())
+
+        first = self.client.delete(self.url).json()
+        second = self.client.delete(self.url).json()
+        self.assertEqual((first['changed'], first['total_likes']), (True, 0))
+        self.assertEqual((second['changed'], second['total_likes']), (False, 0))
+
+    def test_missing_post(self):
+        self.assertEqual(self.client.put('/api/posts/999/like/').status_code, 404)
+        self.assertEqual(self.client.post('/ajax/posts/999/like/').status_code, 404)
+        self.assertFalse(Post.likes.through.objects.exists())
+
+    def test_anonymous_is_rejected(self):
+        self.client.logout()
+        self.assertEqual(self.client.put(self.url).status_code, 403)
+
+
+class ConcurrentLikeTests(TransactionTestCase):
+    def test_parallel_likes_from_many_users(self):
+        author = User.objects.create_user('author', password='pass12345')
+        post = Post.objects.create(title='Popular', content='Body', author=author)
+        users = [User.objects.create_user(f'fan{i}', password='pass12345') for i in range(16)]
+        errors = []
+
+        def like_twice(user):
+            client = Client()
+            client.force_login(user)
+            try:
+                for _ in range(2):
+                    response = client.put(f'/api/posts/{post.id}/like/')
+                    if response.status_code != 200:
+                        errors.append(response.status_code)
+            except Exception as e:
+                errors.append(repr(e))
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=like_twice, args=(user,)) for user in users]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        post.refresh_from_db()
+        self.assertEqual(post.like_count, len(users))
+        self.assertEqual(post.likes.count(), len(users))
+
+
+class FeedCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user('author', password='pass12345')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post = Post.objects.create(title='Cached post', content='Body', author=self.author)
+
+    def get_home(self, **params):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/', params)
+        return response, len(ctx)
+
+    def test_anonymous_pages_are_served_from_cache(self):
+        first, cold = self.get_home()
+        second, warm = self.get_home()
+        self.assertContains(second, 'Cached post')
+        self.assertEqual(warm, 0)
+        self.assertGreater(cold, warm)
+
+    def test_writes_invalidate_cached_pages(self):
+        self.get_home()
+        with self.captureOnCommitCallbacks(execute=True):
+            Post.objects.create(title='Fresh post', content='Body', author=self.author)
+        self.assertContains(self.get_home()[0], 'Fresh post')
+
+        reader = User.objects.create_user('reader', password='pass12345')
+        with self.captureOnCommitCallbacks(execute=True):
+            Comment.objects.create(post=self.post, author=reader, text='Nice')
+        response, queries = self.get_home()
+        self.assertGreater(queries, 0)
+
+        self.get_home()
+        with self.captureOnCommitCallbacks(execute=True):
+            like_post(self.post.id, reader.id)
+        self.assertGreater(self.get_home()[1], 0)
+
+    def test_authenticated_pages_are_not_cached(self):
+        self.client.force_login(self.author)
+        self.get_home()
+        self.assertGreater(self.get_home()[1], 0)
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user('author', password='pass12345')
+        self.reader = User.objects.create_user('reader', password='pass12345')
+        self.post = Post.objects.create(title='Hello', content='Body', author=self.author)
+        Comment.objects.create(post=self.post, author=self.reader, text='First')
+
+    def revalidate(self, url, etag):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        return response, len(ctx)
+
+    def test_unchanged_post_returns_304_with_one_query(self):
+        for url in (f'/post/{self.post.id}/', f'/api/posts/{self.post.id}/'):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response.has_header('Last-Modified'))
+            cached, queries = self.revalidate(url, response['ETag'])
+            self.assertEqual(cached.status_code, 304)
+            self.assertEqual(queries, 1)
+
+    def test_comments_and_likes_change_the_etag(self):
+        url = f'/post/{self.post.id}/'
+        etag = self.client.get(url)['ETag']
+        Comment.objects.create(post=self.post, author=self.author, text='Second')
+        response, _ = self.revalidate(url, etag)
+        self.assertEqual(response.status_code, 200)
+
+        etag = response['ETag']
+        self.post.likes.add(self.reader)
+        self.assertEqual(self.revalidate(url, etag)[0].status_code, 200)
+
+    def test_author_profile_edits_change_the_validators(self):
+        url = f'/post/{self.post.id}/'
+        # Last-Modified has one second resolution.
+        earlier = timezone.now() - timedelta(hours=1)
+        Post.objects.filter(pk=self.post.pk).update(updated_at=earlier)
+        Comment.objects.update(updated_at=earlier)
+        UserProfile.objects.filter(user=self.author).update(updated_at=earlier)
+        response = self.client.get(url)
+        etag, last_modified = response['ETag'], response['Last-Modified']
+
+        self.client.force_login(self.author)
+        self.client.post(reverse('accounts:ajax_edit_profile'), {'first_name': 'Ada', 'bio': 'New'})
+        self.client.logout()
+        response, _ = self.revalidate(url, etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Ada')
+        self.assertNotEqual(response['Last-Modified'], last_modified)
+
+        # A rename alone, e.g. from the admin, also changes the ETag.
+        etag = response['ETag']
+        User.objects.filter(pk=self.author.pk).update(first_name='Grace')
+        self.assertEqual(self.revalidate(url, etag)[0].status_code, 200)
+
+    def test_etag_depends_on_viewer(self):
+        url = f'/post/{self.post.id}/'
+        anonymous = self.client.get(url)['ETag']
+        self.client.force_login(self.reader)
+        self.assertEqual(self.revalidate(url, anonymous)[0].status_code, 200)
+
+    def test_missing_post_is_still_404(self):
+        self.assertEqual(self.client.get('/post/999/').status_code, 404)
+        self.assertEqual(self.client.get('/api/posts/999/').status_code, 404)
+
+
+class ExcerptTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user('author', password='pass12345')
+        self.long_body = ' '.join(f'word{i}' for i in range(50))
+
+    def test_excerpt_is_maintained_on_save(self):
+        post = Post.objects.create(title='Long', content=self.long_body, author=self.author)
+        self.assertEqual(post.word_count, 50)
+        self.assertEqual(post.excerpt, ' '.join(f'word{i}' for i in range(30)) + '...')
+        post.content = 'Short  body'
+        post.save(update_fields=['content'])
+        post.refresh_from_db()
+        self.assertEqual((post.excerpt, post.word_count), ('Short  body', 2))
+
+    def test_list_queries_do_not_load_content(self):
+        Post.objects.create(title='Long', content=self.long_body, author=self.author)
+        for url in ('/', '/api/posts/', '/api/search/?q=long'):
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertFalse([q for q in ctx.captured_queries if '"posts_post"."content"' in q['sql']], url)
+        row = self.client.get('/api/posts/').json()['results'][0]
+        self.assertTrue(row['content_preview'].endswith('word29...'))
+
+    def test_backfill_command(self):
+        Post.objects.bulk_create([Post(title='Imported', content=self.long_body, author=self.author)])
+        call_command('backfill_post_excerpts', stdout=StringIO())
+        post = Post.objects.get(title='Imported')
+        self.assertEqual(post.word_count, 50)
+        self.assertTrue(post.excerpt.endswith('...'))
+
+
+class ValuesSerializerParityTests(TestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.named = User.objects.create_user('named', first_name='Zoë', last_name='Ng', password='pass12345')
+        self.plain = User.objects.create_user('plain', password='pass12345')
+        self.half = User.objects.create_user('half', last_name='Solo', password='pass12345')
+        long_body = ' '.join(f'wörd{i}' for i in range(40))
+        for author, content in ((self.named, long_body), (self.plain, 'Short "quoted" body'), (self.half, '  spaced\n body ')):
+            post = Post.objects.create(title=f'Title by {author.username} <b>', content=content, author=author)
+            Comment.objects.create(post=post, author=self.plain, text='Nice')
+        Post.objects.first().likes.add(self.plain)
+
+    def render_both(self, user):
+        request = Request(self.factory.get('/api/posts/'))
+        request.user = user
+        queryset = Post.objects.select_related('author').order_by('-created_at', '-id')
+        old = PostListSerializer(queryset, many=True, context={'request': request}).data
+        fast = PostListValuesSerializer(context={'request': request})
+        new = fast.to_representation(fast.values(queryset))
+        return JSONRenderer().render(old), JSONRenderer().render(new)
+
+    def test_byte_identical_for_anonymous_and_signed_in(self):
+        for user in (AnonymousUser(), self.plain, self.named):
+            old, new = self.render_both(user)
+            self.assertEqual(old, new)
+
+    def test_endpoints_match_model_serializer(self):
+        self.client.force_login(self.plain)
+        request = Request(self.factory.get('/api/posts/'))
+        request.user = self.plain
+        expected = PostListSerializer(
+            Post.objects.order_by('-created_at', '-id'), many=True, context={'request': request}
+        ).data
+        listing = self.client.get('/api/posts/').json()['results']
+        self.assertEqual(listing, json.loads(JSONRenderer().render(expected)))
+        found = self.client.get('/api/search/', {'q': 'title'}).json()['results']
+        self.assertEqual(sorted(found, key=lambda row: row['id']), sorted(listing, key=lambda row: row['id']))
+
+
+class PostDetailPayloadTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user('author', password='pass12345')
+        self.post = Post.objects.create(title='Viral', content='Body', author=self.author)
+        self.url = f'/api/posts/{self.post.id}/'
+
+    def add_comments(self, count):
+        Comment.objects.bulk_create(
+            Comment(post=self.post, author=self.author, text=f'Comment {i}') for i in range(count)
+        )
+
+    def fetch(self, url, **params):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.json(), len(ctx)
+
+    def test_embedded_comments_are_bounded(self):
+        self.add_comments(3)
+        small, small_queries = self.fetch(self.url)
+        self.assertEqual(len(small['comments']), 3)
+        self.assertIsNone(small['comments_next'])
+
+        self.add_comments(40)
+        large, large_queries = self.fetch(self.url)
+        self.assertEqual(len(large['comments']), EMBEDDED_COMMENTS)
+        self.assertEqual(large_queries, small_queries)
+
+    def test_comments_next_walks_the_remaining_comments(self):
+        self.add_comments(12)
+        data, _ = self.fetch(self.url)
+        seen = [comment['id'] for comment in data['comments']]
+        url = data['comments_next']
+        while url:
+            page, _ = self.fetch(url)
+            seen += [comment['id'] for comment in page['comments']]
+            url = page['pagination']['next']
+        expected = list(Comment.objects.filter(post=self.post).order_by('created_at', 'id').values_list('id', flat=True))
+        self.assertEqual(seen, expected)
+
+    def test_invalid_comment_cursor_is_404(self):
+        response = self.client.get(f'/api/posts/{self.post.id}/comments/', {'cursor': 'nope'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_sparse_fieldsets(self):
+        self.add_comments(2)
+        full, full_queries = self.fetch(self.url)
+        data, queries = self.fetch(self.url, fields='id,title')
+        self.assertEqual(list(data), ['id', 'title'])
+        self.assertLess(queries, full_queries)
+
+        data, _ = self.fetch(self.url, exclude='content,comments,created_at_formatted,updated_at_formatted')
+        self.assertEqual(set(full) - set(data), {'content', 'comments', 'created_at_formatted', 'updated_at_formatted'})
+
+        listing, _ = self.fetch('/api/posts/', fields='id,is_liked,bogus')
+        self.assertEqual(listing['results'], [{'id': self.post.id, 'is_liked': False}])
+        comments, _ = self.fetch(f'/api/posts/{self.post.id}/comments/', exclude='author')
+        self.assertNotIn('author', comments['comments'][0])
+        self.assertIn('author_name', comments['comments'][0])
+
+    def test_writes_ignore_sparse_fieldsets(self):
+        self.client.force_login(self.author)
+        response = self.client.post('/api/posts/?fields=id', {'title': 'New', 'content': 'Text'})
+        self.assertEqual(response.status_code, 201)
+        self.assertIn('content', response.json())
+
+
+class ImportPostsTests(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user('alice', password='pass12345')
+        self.bob = User.objects.create_user('bob', password='pass12345')
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def write(self, name, text):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        return path
+
+    def ndjson(self, *records):
+        return self.write('archive.ndjson', ''.join(json.dumps(record) + '\n' for record in records))
+
+    def run_import(self, *args):
+        out = StringIO()
+        call_command('import_posts', *args, stdout=out, stderr=StringIO())
+        return out.getvalue()
+
+    def test_imports_posts_comments_and_likes_in_bulk(self):
+        path = self.ndjson(
+            {'title': 'Archived zebra', 'content': 'word ' * 50, 'author': 'alice',
+             'created_at': '2019-03-01T10:00:00Z', 'likes': ['bob', 'alice', 'bob', 'ghost'],
+             'comments': [{'author': 'bob', 'text': 'Old news', 'created_at': '2019-03-02T10:00:00Z'},
+                          {'author': 'ghost', 'text': 'Dropped'}]},
+            {'title': 'By nobody', 'content': 'x', 'author': 'ghost'},
+            {'title': 'Second', 'content': 'Short', 'author': 'bob'},
+        )
+        with CaptureQueriesContext(connection) as ctx:
+            output = self.run_import(path, '--batch-size', '2')
+        self.assertIn('Imported 2 posts, 1 comments and 2 likes', output)
+        self.assertIn('skipped 1 records', output)
+        self.assertLess(len(ctx), 30)
+
+        post = Post.objects.get(title='Archived zebra')
+        self.assertEqual(post.created_at.year, 2019)
+        self.assertEqual((post.like_count, post.comment_count, post.word_count), (2, 1, 50))
+        self.assertTrue(post.excerpt.startswith('word word'))
+        self.assertEqual(post.comments.get().created_at.day, 2)
+        self.assertEqual(set(post.likes.values_list('username', flat=True)), {'alice', 'bob'})
+        self.assertEqual(list(full_text_search(Post.objects.all(), 'zebra')), [post])
+
+        call_command('reconcile_post_counters', stdout=StringIO())
+        post.refresh_from_db()
+        self.assertEqual((post.like_count, post.comment_count), (2, 1))
+        out = StringIO()
+        call_command('reconcile_user_stats', stdout=out)
+        self.assertIn('0 fixed', out.getvalue())
+
+    def test_batches_add_to_user_stats(self):
+        # Deltas, not a recount: an existing drift is left to reconcile_user_stats.
+        UserStats.objects.filter(user=self.alice).update(post_count=10)
+        path = self.ndjson(
+            {'title': 'One', 'content': 'x', 'author': 'alice', 'created_at': '2019-03-01T10:00:00Z',
+             'likes': ['bob'], 'comments': [{'author': 'bob', 'text': 'Hi', 'created_at': '2019-03-05T10:00:00Z'}]},
+            {'title': 'Two', 'content': 'x', 'author': 'alice', 'created_at': '2019-02-01T10:00:00Z'},
+            {'title': 'Three', 'content': 'x', 'author': 'alice', 'created_at': '2018-01-01T10:00:00Z',
+             'likes': ['bob']},
+        )
+        with CaptureQueriesContext(connection) as ctx:
+            self.run_import(path, '--batch-size', '2')
+        updates = [query for query in ctx if query['sql'].startswith('UPDATE "accounts_userstats"')]
+        self.assertEqual(len(updates), 2)
+
+        alice = UserStats.objects.get(user=self.alice)
+        self.assertEqual((alice.post_count, alice.likes_received, alice.comment_count), (13, 2, 0))
+        self.assertEqual(alice.last_active_at.date().isoformat(), '2019-03-01')
+        bob = UserStats.objects.get(user=self.bob)
+        self.assertEqual((bob.post_count, bob.comment_count), (0, 1))
+        self.assertEqual(bob.last_active_at.date().isoformat(), '2019-03-05')
+
+    def test_insert_objects_keeps_timestamps_without_patching_fields(self):
+        post = insert_objects(Post, [Post(title='Old', content='x', author=self.alice,
+                                          created_at=timezone.now() - timedelta(days=400),
+                                          updated_at=timezone.now() - timedelta(days=300))])[0]
+        written = timezone.now() - timedelta(days=200)
+        # More rows than one INSERT takes on SQLite.
+        comments = insert_objects(Comment, [
+            Comment(post=post, author=self.bob, text=f'Hi {i}', created_at=written, updated_at=written)
+            for i in range(500)
+        ])
+        self.assertEqual([comment.pk for comment in comments],
+                         list(Comment.objects.order_by('pk').values_list('pk', flat=True)))
+        self.assertEqual(Comment.objects.get(pk=comments[-1].pk).text, 'Hi 499')
+        self.assertEqual(Post.objects.get(pk=post.pk).updated_at, post.updated_at)
+        self.assertEqual(set(Comment.objects.values_list('updated_at', flat=True)), {written})
+        self.assertTrue(Post._meta.get_field('updated_at').auto_now)
+
+    def test_create_users_and_csv(self):
+        path = self.write('archive.csv', 'title,content,author,likes\nHello,Body text,carol,alice carol\n')
+        self.run_import(path, '--create-users')
+        post = Post.objects.get()
+        self.assertEqual(post.author.username, 'carol')
+        self.assertFalse(post.author.has_usable_password())
+        self.assertEqual(post.like_count, 2)
+        self.assertTrue(UserProfile.objects.filter(user=post.author).exists())
+        self.assertEqual(UserStats.objects.get(user=post.author).likes_received, 2)
+
+    def test_resume_from_checkpoint(self):
+        path = self.ndjson(*({'title': f'Post {i}', 'content': 'Body', 'author': 'alice'} for i in range(5)))
+        checkpoint = os.path.join(self.tmp.name, 'import.checkpoint')
+        self.run_import(path, '--batch-size', '2', '--checkpoint', checkpoint)
+        self.assertEqual(Post.objects.count(), 5)
+
+        Post.objects.filter(title__in=['Post 3', 'Post 4']).delete()
+        with open(checkpoint, 'w') as f:
+            json.dump({'source': os.path.abspath(path), 'records': 3}, f)
+        self.run_import(path, '--checkpoint', checkpoint, '--resume')
+        self.assertEqual(sorted(Post.objects.values_list('title', flat=True)), [f'Post {i}' for i in range(5)])
+
+        other = self.write('other.ndjson', '')
+        with self.assertRaises(CommandError):
+            self.run_import(other, '--checkpoint', checkpoint, '--resume')
+
+
+class SeedDataTests(TestCase):
+    def seed(self, *args):
+        call_command('seed_data', '--users', '30', '--posts', '60', '--comments', '600',
+                     '--likes', '400', '--batch-size', '25', *args, stdout=StringIO())
+
+    def test_generates_consistent_skewed_data(self):
+        self.seed()
+        self.assertEqual(User.objects.count(), 30)
+        self.assertEqual(UserProfile.objects.count(), 30)
+        self.assertEqual(Post.objects.count(), 60)
+        self.assertEqual(Comment.objects.count(), 600)
+
+        posts = Post.objects.annotate(**actual_counts())
+        for post in posts:
+            self.assertEqual(post.like_count, post.actual_like_count)
+            self.assertEqual(post.comment_count, post.actual_comment_count)
+            self.assertEqual((post.excerpt, post.word_count), summarize(post.content))
+        counts = sorted(post.comment_count for post in posts)
+        self.assertGreater(counts[-1], 10 * max(counts[len(counts) // 2], 1))
+
+        out = StringIO()
+        call_command('reconcile_user_stats', stdout=out)
+        self.assertIn('Checked 30 users, 0 fixed.', out.getvalue())
+
+        self.assertTrue(self.client.login(username='seed0000000', password='password'))
+        comment = Comment.objects.select_related('post').first()
+        self.assertGreaterEqual(comment.created_at, comment.post.created_at)
+
+    def test_same_seed_same_data(self):
+        self.seed('--seed', '7')
+        first = list(Post.objects.order_by('pk').values_list('title', 'word_count', 'comment_count'))
+        self.seed('--seed', '7', '--prefix', 'again')
+        second = list(Post.objects.order_by('pk').values_list('title', 'word_count', 'comment_count'))[60:]
+        self.assertEqual(first, second)
+
+        with self.assertRaises(CommandError):
+            self.seed()
+
+
+class BenchCommandTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        call_command('seed_data', '--users', '10', '--posts', '20', '--comments', '60', '--likes', '30',
+                     stdout=StringIO())
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def bench(self, *args):
+        out = StringIO()
+        call_command('bench', '--iterations', '3', '--warmup', '1', *args, stdout=out)
+        return out.getvalue()
+
+    def test_writes_results_and_flags_regressions(self):
+        post = Post.objects.order_by('-comment_count', '-like_count', 'pk').first()
+        likes_before = post.like_count
+        output_path = os.path.join(self.tmp.name, 'bench.json')
+        self.bench('--output', output_path)
+
+        with open(output_path) as f:
+            report = json.load(f)
+        results = report['results']
+        self.assertIn('toggle_like:auth', results)
+        self.assertNotIn('toggle_like:anon', results)
+        self.assertEqual(results['api_post_list:anon']['status'], 200)
+        self.assertGreater(results['post_detail:auth']['queries'], 0)
+        self.assertLessEqual(results['home:auth']['p50_ms'], results['home:auth']['p99_ms'])
+        post.refresh_from_db()
+        self.assertEqual(post.like_count, likes_before)
+
+        for result in results.values():
+            result['queries'] = 0
+        with open(output_path, 'w') as f:
+            json.dump(report, f)
+        self.assertIn('REGRESSION post_detail:auth: queries 0', self.bench('--only', 'detail', '--baseline', output_path))
+        with self.assertRaises(CommandError):
+            self.bench('--only', 'detail', '--baseline', output_path, '--fail-on-regression')
+
+    def test_search_query_is_url_encoded(self):
+        with mock.patch.object(Client, 'get', autospec=True, side_effect=Client.get) as get:
+            self.bench('--only', 'search', '--query', 'café & tips #2')
+        url = urlsplit(get.call_args.args[1])
+        self.assertEqual(parse_qs(url.query), {'q': ['café & tips #2']})
+        self.assertEqual(url.fragment, '')
+
+
+class AsyncReadViewTests(TestCase):
+    """The async views served over ASGI return what the sync views return over WSGI"""
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user('author', password='pass12345', first_name='Ada')
+        self.reader = User.objects.create_user('reader', password='pass12345')
+        self.posts = [
+            Post.objects.create(title=f'Async story {i}', content=f'Body {i}', author=self.author)
+            for i in range(13)
+        ]
+        self.posts[-1].likes.add(self.reader)
+        Comment.objects.create(post=self.posts[-1], author=self.reader, text='First!')
+
+    def fetch(self, url, **extra):
+        sync_response = self.client.get(url, **extra)
+        async_response = async_to_sync(self.async_client.get)(url, **extra)
+        self.assertEqual(sync_response.status_code, async_response.status_code)
+        return sync_response, async_response
+
+    def test_urls_resolve_to_async_views(self):
+        resolver = get_resolver(settings.ASYNC_ROOT_URLCONF)
+        for path in ('/', f'/post/{self.posts[0].pk}/', '/api/posts/', '/api/search/'):
+            self.assertTrue(iscoroutinefunction(resolver.resolve(path).func), path)
+        self.assertFalse(iscoroutinefunction(get_resolver().resolve('/').func))
+
+    def test_api_payloads_match(self):
+        self.client.force_login(self.reader)
+        self.async_client.force_login(self.reader)
+        sync_page, async_page = self.fetch('/api/posts/')
+        self.assertEqual(sync_page.json(), async_page.json())
+        self.assertTrue(async_page.json()['results'][0]['is_liked'])
+
+        next_url = async_page.json()['next']
+        sync_page, async_page = self.fetch(next_url)
+        self.assertEqual(sync_page.json(), async_page.json())
+        self.assertEqual(len(async_page.json()['results']), 3)
+
+        # Page numbers and bad cursors
+        for url in ('/api/posts/?page=2', '/api/posts/?cursor=nonsense'):
+            sync_page, async_page = self.fetch(url)
+            self.assertEqual(sync_page.json(), async_page.json())
+
+        sync_results, async_results = self.fetch('/api/search/?q=async')
+        self.assertEqual(sync_results.json(), async_results.json())
+        self.assertEqual(len(async_results.json()['results']), 10)
+
+    def test_html_pages(self):
+        self.async_client.force_login(self.reader)
+        response = async_to_sync(self.async_client.get)('/')
+        self.assertContains(response, 'Async story 12')
+        cursor_page = async_to_sync(self.async_client.get)('/', {'page': 2})
+        self.assertContains(cursor_page, 'Async story 2')
+
+        post = self.posts[-1]
+        response = async_to_sync(self.async_client.get)(f'/post/{post.pk}/')
+        self.assertContains(response, 'First!')
+        self.assertTrue(response.context['is_liked'])
+        again = async_to_sync(self.async_client.get)(f'/post/{post.pk}/', headers={'If-None-Match': response['ETag']})
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(async_to_sync(self.async_client.get)('/post/999999/').status_code, 404)
+
+    def test_query_budgets_apply_to_async_views(self):
+        from core_apps.common.query_budget import QueryBudget, QueryBudgetExceeded
+        from . import async_views
+        with mock.patch.object(async_views.home, 'query_budget', QueryBudget(1)):
+            with self.assertRaises(QueryBudgetExceeded):
+                async_to_sync(self.async_client.get)('/', {'search': 'async'})
+
+    def test_writes_fall_through_to_the_sync_view(self):
+        self.async_client.force_login(self.author)
+        response = async_to_sync(self.async_client.post)(
+            '/api/posts/', {'title': 'Written over ASGI', 'content': 'Body'}, content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(Post.objects.filter(title='Written over ASGI').exists())
+
+
+class BenchConcurrencyCommandTests(TransactionTestCase):
+    # Requests are served from other threads, which need committed data.
+
+    def test_runs_both_modes(self):
+        author = User.objects.create_user('author', password='pass12345')
+        post = Post.objects.create(title='Benchmarked post', content='Body', author=author)
+        for i in range(20):
+            Comment.objects.create(post=post, author=author, text=f'Comment {i}')
+
+        with tempfile.TemporaryDirectory() as tmp:
+            output_path = os.path.join(tmp, 'concurrency.json')
+            call_command('bench_concurrency', '--requests', '4', '--workers', '2', '--concurrency', '3',
+                         '--only', 'api', '--db-latency', '1', '--output', output_path, stdout=StringIO())
+            with open(output_path) as f:
+                results = json.load(f)['results']
+
+        self.assertEqual(set(results), {
+            'api_post_list:wsgi:c3', 'api_post_list:asgi:c3',
+            'api_comment_list:wsgi:c3', 'api_comment_list:asgi:c3',
+        })
+        for result in results.values():
+            self.assertEqual(result['errors'], 0)
+            self.assertGreater(result['requests_per_second'], 0)
+
+
+class StressSQLiteCommandTests(TransactionTestCase):
+    def test_both_journal_modes_and_cleans_up(self):
+        call_command('seed_data', '--users', '4', '--posts', '6', '--comments', '12', '--likes', '8',
+                     stdout=StringIO())
+        before = (Comment.objects.count(), list(Post.objects.order_by('pk').values_list('like_count', 'comment_count')))
+
+        with tempfile.TemporaryDirectory() as tmp:
+            output_path = os.path.join(tmp, 'stress.json')
+            call_command('stress_sqlite', '--threads', '4', '--requests', '12', '--write-ratio', '0.5',
+                         '--output', output_path, stdout=StringIO())
+            with open(output_path) as f:
+                results = json.load(f)['results']
+
+        self.assertEqual(results['rollback']['journal_mode'], 'delete')
+        self.assertEqual(results['wal']['journal_mode'], 'wal')
+        self.assertEqual((results['wal']['locked'], results['wal']['errors']), (0, 0))
+        self.assertLessEqual(results['wal']['locked'], results['rollback']['locked'])
+        self.assertEqual(results['wal']['requests'], 48)
+        after = (Comment.objects.count(), list(Post.objects.order_by('pk').values_list('like_count', 'comment_count')))
+        self.assertEqual(after, before)
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            self.assertEqual(cursor.fetchone()[0], 'wal')
@@ -11,6 +11,7 @@ urlpatterns = [
     path('api/posts/', views.PostListCreateView.as_view(), name='post_list_api'),
     path('api/posts/<int:pk>/', views.PostDetailView.as_view(), name='post_detail_api'),    
     path('api/search/', views.search_posts, name='search_posts'),
+    path('api/posts/<int:post_id>/like/', views.post_like, name='post_like_api'),
 
     
     # AJAX endpoints
@@ -0,0 +1,88 @@
+"""
+Lean read-only serializers over QuerySet.values() rows.
+
+The list endpoints spend more time in DRF field machinery (nested
+serializers, SerializerMethodFields, per-field to_representation) than in
+SQL. A ValuesSerializer produces the same JSON shape as its ModelSerializer
+twin from plain dict rows: the columns it needs are fetched with
+.values(), and each output key maps to an extractor that is built once per
+class instead of once per row. No model instances are created.
+
+Views opt in through ValuesListModelMixin.values_serializer_class. Sparse
+fieldsets (?fields= / ?exclude=) drop extractors up front. The parity tests
+check that the output is byte-identical to the ModelSerializer it stands in
+for.
+"""
+from operator import itemgetter
+
+from rest_framework import serializers
+from rest_framework.response import Response
+
+from .fieldsets import sparse_field_names
+
+# Shared instance so timestamps are rendered exactly like DRF would.
+datetime_field = serializers.DateTimeField()
+
+
+class ValuesSerializer:
+    """
+    Subclasses declare `fields` as (output key, lookup, transform) triples,
+    in output order. `lookup` is read from the row and passed through
+    `transform` if given. A `None` lookup means the subclass implements
+    `get_<key>(row)`. Lookups that only those methods read go in
+    `extra_lookups`.
+    """
+    fields = ()
+    extra_lookups = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        lookups, extractors = [], []
+        for key, lookup, transform in cls.fields:
+            if lookup is None:
+                extractors.append((key, None))
+                continue
+            if lookup not in lookups:
+                lookups.append(lookup)
+            getter = itemgetter(lookup)
+            if transform is not None:
+                getter = (lambda get, fn: lambda row: fn(get(row)))(getter, transform)
+            extractors.append((key, getter))
+        cls.lookups = tuple(lookups + [lookup for lookup in cls.extra_lookups if lookup not in lookups])
+        cls.extractors = tuple(extractors)
+
+    def __init__(self, context=None):
+        self.context = context or {}
+        extractors = dict(self.extractors)
+        self.field_names = sparse_field_names(self.context, extractors)
+        self._extractors = [
+            (key, extractors[key] or getattr(self, f'get_{key}')) for key in self.field_names
+        ]
+
+    def values(self, queryset):
+        return queryset.values(*self.lookups)
+
+    def prepare(self, rows):
+        """Hook for per-page lookups, run once before the rows are rendered"""
+
+    def to_representation(self, rows):
+        rows = list(rows)
+        self.prepare(rows)
+        extractors = self._extractors
+        return [{key: extract(row) for key, extract in extractors} for row in rows]
+
+
+class ValuesListModelMixin:
+    """ListModelMixin.list, but rendered through `values_serializer_class` when a view sets one"""
+    values_serializer_class = None
+
+    def list(self, request, *args, **kwargs):
+        if self.values_serializer_class is None:
+            return super().list(request, *args, **kwargs)
+
+        serializer = self.values_serializer_class(context=self.get_serializer_context())
+        queryset = serializer.values(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(serializer.to_representation(page))
+        return Response(serializer.to_representation(queryset))
@@ -1,10 +1,11 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse
+from django.template.loader import render_to_string
+from django.utils.decorators import method_decorator
+from django.utils.safestring import mark_safe
 from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import csrf_exempt
-from django.core.paginator import Paginator
-from django.db.models import Q, Count
 from rest_framework import generics, status, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
@@ -12,41 +13,68 @@ from rest_framework.permissions import IsAuthenticated, IsAuthenticatedOrReadOnl
 import json
 
 from .models import Post
+from .conditional import post_conditional
+from .feed_cache import get_cached_feed, set_cached_feed
+from .likes import like_post, liked_post_ids, toggle_like as toggle_post_like, unlike_post
+from .pagination import PostFeedPagination, get_feed_page, page_number_limit
+from .search import full_text_search
 from core_apps.comments.models import Comment
 from core_apps.comments.serializers import CommentSerializer
-from .serializers import PostSerializer, PostListSerializer
+from .serializers import PostSerializer, PostListSerializer, PostListValuesSerializer
+from .values_serializers import ValuesListModelMixin
+from core_apps.common.query_budget import query_budget
 
+@query_budget(6)
 def home(request):
     """Home page with post listing"""
-    posts = Post.objects.select_related('author').prefetch_related('likes', 'comments').annotate(
-        total_likes=Count('likes'),
-        total_comments=Count('comments')
-    ).order_by('-created_at')
-    
-    # Search functionality
     search_query = request.GET.get('search', '')
-    if search_query:
-        posts = posts.filter(Q(title__icontains=search_query) | Q(content__icontains=search_query))
-    
-    # Pagination
-    paginator = Paginator(posts, 10)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+
+    # Anonymous visitors share one rendering of each feed page
+    cacheable = not request.user.is_authenticated
+    feed = None
+    if cacheable:
+        cache_key, feed = get_cached_feed(request.GET)
+
+    if feed is None:
+        posts = Post.objects.select_related('author__userprofile').defer('content').order_by('-created_at')
+        
+        # Search functionality
+        if search_query:
+            posts = full_text_search(posts, search_query)
+        
+        # Pagination: keyset cursors, with page numbers for the first few pages
+        page_obj = get_feed_page(posts, request.GET, ranked=bool(search_query))
+        
+        feed_context = {
+            'posts': page_obj,
+            'search_query': search_query,
+            'is_paginated': page_obj.has_other_pages(),
+            'max_page_number': page_number_limit(ranked=bool(search_query)),
+            'liked_post_ids': liked_post_ids(request.user, page_obj),
+        }
+        feed = {
+            'html': render_to_string('blog/components/feed.html', feed_context, request=request),
+            'post_count': page_obj.paginator.count if hasattr(page_obj, 'paginator') else None,
+        }
+        if cacheable:
+            set_cached_feed(cache_key, feed)
     
     context = {
-        'posts': page_obj,
+        'feed_html': mark_safe(feed['html']),
+        'post_count': feed['post_count'],
         'search_query': search_query,
-        'is_paginated': page_obj.has_other_pages(),
     }
     return render(request, 'user/home.html', context)
 
+@query_budget(8)
+@post_conditional
 def post_detail(request, pk):
     """Post detail page"""
     post = get_object_or_404(
-        Post.objects.select_related('author').prefetch_related('likes', 'comments__author'),
+        Post.objects.select_related('author__userprofile'),
         pk=pk
     )
-    comments = post.comments.select_related('author').order_by('created_at')
+    comments = post.comments.select_related('author__userprofile').order_by('created_at')
     
     context = {
         'post': post,
@@ -58,13 +86,13 @@ def post_detail(request, pk):
     return render(request, 'blog/post_details.html', context)
 
 # API Views
-class PostListCreateView(generics.ListCreateAPIView):
+@query_budget(10)
+class PostListCreateView(ValuesListModelMixin, generics.ListCreateAPIView):
     """List all posts or create a new post"""
-    queryset = Post.objects.select_related('author').prefetch_related('likes', 'comments').annotate(
-        total_likes=Count('likes'),
-        total_comments=Count('comments')
-    ).order_by('-created_at')
+    queryset = Post.objects.select_related('author').order_by('-created_at')
     permission_classes = [IsAuthenticatedOrReadOnly]
+    pagination_class = PostFeedPagination
+    values_serializer_class = PostListValuesSerializer
 
     def get_serializer_class(self):
         if self.request.method == 'GET':
@@ -73,14 +101,18 @@ class PostListCreateView(generics.ListCreateAPIView):
 
     def get_queryset(self):
         queryset = super().get_queryset()
+        if self.request.method == 'GET':
+            queryset = queryset.defer('content')
         search = self.request.query_params.get('search', None)
         if search:
-            queryset = queryset.filter(Q(title__icontains=search) | Q(content__icontains=search))
+            queryset = full_text_search(queryset, search)
         return queryset
 
+@query_budget(12)
+@method_decorator(post_conditional, name='get')
 class PostDetailView(generics.RetrieveUpdateDestroyAPIView):
     """Retrieve, update or delete a post"""
-    queryset = Post.objects.select_related('author').prefetch_related('likes', 'comments__author')
+    queryset = Post.objects.select_related('author')
     serializer_class = PostSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
 
@@ -236,6 +268,7 @@ def delete_post_ajax(request, post_id):
 
 
 # Search API
+@query_budget(6)
 @api_view(['GET'])
 def search_posts(request):
     """Search posts API endpoint"""
@@ -243,44 +276,58 @@ def search_posts(request):
     if not query:
         return Response({'results': []})
     
-    posts = Post.objects.filter(
-        Q(title__icontains=query) | Q(content__icontains=query)
-    ).select_related('author').annotate(
-        total_likes=Count('likes'),
-        total_comments=Count('comments')
-    ).order_by('-created_at')[:10]
-    
-    serializer = PostListSerializer(posts, many=True, context={'request': request})
-    return Response({'results': serializer.data})
+    serializer = PostListValuesSerializer(context={'request': request})
+    posts = serializer.values(full_text_search(Post.objects.all(), query))[:10]
+    return Response({'results': serializer.to_representation(posts)})
 
 
 
 # Api for like
+@query_budget(8)
+@api_view(['PUT', 'DELETE'])
+@permission_classes([IsAuthenticated])
+def post_like(request, post_id):
+    """Like (PUT) or unlike (DELETE) a post. Repeating a request is a no-op."""
+    try:
+        if request.method == 'PUT':
+            changed, total_likes = like_post(post_id, request.user.id)
+        else:
+            changed, total_likes = unlike_post(post_id, request.user.id)
+    except Post.DoesNotExist:
+        return Response({
+            'success': False,
+            'message': 'Post not found.'
+        }, status=status.HTTP_404_NOT_FOUND)
+
+    return Response({
+        'success': True,
+        'is_liked': request.method == 'PUT',
+        'changed': changed,
+        'total_likes': total_likes,
+    })
+
+
+@query_budget(8)
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def toggle_like(request, post_id):
-    """Toggle like/unlike for a post"""
+    """Toggle like/unlike for a post (kept for older clients, prefer post_like)"""
     try:
-        post = get_object_or_404(Post, id=post_id)
-        user = request.user
-        
-        if post.likes.filter(id=user.id).exists():
-            post.likes.remove(user)
-            is_liked = False
-            message = "Post unliked"
-        else:
-            post.likes.add(user)
-            is_liked = True
-            message = "Post liked"
-        
+        is_liked, total_likes = toggle_post_like(post_id, request.user.id)
+    except Post.DoesNotExist:
         return Response({
-            'success': True,
-            'is_liked': is_liked,
-            'total_likes': post.total_likes(),
-            'message': message
-        })
+            'success': False,
+            'message': 'Post not found.'
+        }, status=status.HTTP_404_NOT_FOUND)
     except Exception as e:
         return Response({
             'success': False,
             'message': str(e)
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    return Response({
+        'success': True,
+        'is_liked': is_liked,
+        'total_likes': total_likes,
+        'message': "Post liked" if is_liked else "Post unliked"
+    })